@@ -1,11 +1,21 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import numpy as np
+import pandas as pd
+import json
 import os
-
-# Optional imports – use what you actually have
-import pickle
-import tensorflow as tf
+import sys
+import threading
+import time
+from concurrent.futures import wait as futures_wait
+
+# Make the project root importable when started as `python app/app.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.batching import MicroBatcher
+from utils.model_registry import registry, MODEL_BACKEND
+from utils.image_pipeline import decode_image, prepare_xray
+from utils.xray_inference import build_xray_inference, XRAY_MODE
+from utils.summary_service import SummaryService, SqliteSummaryStore, stub_backend, openai_backend
 
 # If you want X-ray image support, you also need:
 import cv2
@@ -23,72 +33,99 @@ app = Flask(__name__)
 CORS(app)  # allow calls from your HTML/JS
 
 # -----------------------------
-# Load your existing models
+# Models (lazy, shared with the Streamlit app)
 # -----------------------------
-MODELS = {
-    "xray": None,
-    "diabetes_model": None,
-    "diabetes_scaler": None,
-    "heart_model": None,
-    "heart_scaler": None,
-    "cancer_model": None,
-    "cancer_scaler": None,
-}
+# Each model is loaded on first request and cached process-wide; see
+# utils/model_registry.py. MODELS["name"] returns None if loading failed.
+MODELS = registry
 
-def load_all_models():
-    """Load Keras / sklearn models from your models/ folder."""
-    base = "models"
-
-    # Chest X-ray TF model (same as in your Streamlit app)
-    try:
-        MODELS["xray"] = tf.keras.models.load_model(os.path.join(base, "chest_xray_model.h5"))
-        print("Loaded chest_xray_model.h5")
-    except Exception as e:
-        print("X-ray model load failed:", e)
+def served_models(xray_mode=XRAY_MODE):
+    """Models this backend uses; the X-ray detector only runs in fused mode."""
+    return [n for n in registry.keys() if n != "xray_detector" or xray_mode == "fused"]
 
-    # Diabetes
-    try:
-        MODELS["diabetes_model"] = pickle.load(open(os.path.join(base, "diabetes_model.pkl"), "rb"))
-        MODELS["diabetes_scaler"] = pickle.load(open(os.path.join(base, "diabetes_scaler.pkl"), "rb"))
-        print("Loaded diabetes model + scaler.")
-    except Exception as e:
-        print("Diabetes model load failed:", e)
+REQUIRED_MODELS = served_models()
 
-    # Heart
-    try:
-        MODELS["heart_model"] = pickle.load(open(os.path.join(base, "heart_model.pkl"), "rb"))
-        MODELS["heart_scaler"] = pickle.load(open(os.path.join(base, "heart_scaler.pkl"), "rb"))
-        print("Loaded heart model + scaler.")
-    except Exception as e:
-        print("Heart model load failed:", e)
+def load_all_models():
+    """Eagerly load (and warm up) the models this backend serves."""
+    print(f"Loading models (backend: {MODEL_BACKEND}): {', '.join(REQUIRED_MODELS)}")
+    registry.preload(REQUIRED_MODELS)
 
-    # Cancer
+# -----------------------------
+# Readiness
+# -----------------------------
+# "starting" -> "warming" -> "ready" (or "degraded" if a required model
+# failed to load). /api/health answers 503 until every required model is
+# loaded and warm, so a load balancer only routes traffic to a process
+# that can serve every endpoint.
+READINESS = {"state": "starting", "started_at": None, "seconds": None}
+
+def warm_up():
+    READINESS["state"] = "warming"
+    READINESS["started_at"] = time.time()
     try:
-        MODELS["cancer_model"] = pickle.load(open(os.path.join(base, "cancer_model.pkl"), "rb"))
-        MODELS["cancer_scaler"] = pickle.load(open(os.path.join(base, "cancer_scaler.pkl"), "rb"))
-        print("Loaded cancer model + scaler.")
-    except Exception as e:
-        print("Cancer model load failed:", e)
+        load_all_models()
+    finally:
+        READINESS["seconds"] = round(time.time() - READINESS["started_at"], 2)
+        READINESS["state"] = "ready" if registry.ready(REQUIRED_MODELS) else "degraded"
+        print(f"Model warm-up finished: {READINESS['state']} in {READINESS['seconds']}s")
+
+def start_warm_up(background=True):
+    if background:
+        threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    else:
+        warm_up()
+
+# LIFELEN_PRELOAD_MODELS=1 blocks startup until warm; otherwise warm-up
+# runs in the background (LIFELEN_WARMUP_ON_START=0 disables it)
+if os.getenv("LIFELEN_PRELOAD_MODELS") == "1":
+    start_warm_up(background=False)
+elif os.getenv("LIFELEN_WARMUP_ON_START", "1") == "1":
+    start_warm_up()
 
-load_all_models()
+# -----------------------------
+# X-ray micro-batching
+# -----------------------------
+XRAY_MAX_BATCH_SIZE = int(os.getenv("XRAY_MAX_BATCH_SIZE", "8"))
+XRAY_MAX_WAIT_MS = float(os.getenv("XRAY_MAX_WAIT_MS", "15"))
+
+_xray_batcher = None
+_xray_batcher_lock = threading.Lock()
+
+def get_xray_batcher():
+    """Create the shared X-ray batcher on first use (model must be loaded)."""
+    global _xray_batcher
+    if _xray_batcher is None:
+        with _xray_batcher_lock:
+            if _xray_batcher is None:
+                _xray_batcher = MicroBatcher(
+                    lambda batch: MODELS["xray"].predict(batch, verbose=0),
+                    max_batch_size=XRAY_MAX_BATCH_SIZE,
+                    max_wait_ms=XRAY_MAX_WAIT_MS,
+                    name="xray",
+                )
+    return _xray_batcher
+
+def classify_xray_batch(batch):
+    """Keras stage of the X-ray engine, routed through the micro-batcher."""
+    futures = [get_xray_batcher().submit(x) for x in batch]
+    return np.array([float(f.result()[0]) for f in futures], dtype=np.float32)
+
+# LIFELEN_XRAY_MODE=fused answers confident cases from the ResNet detector
+xray_engine = build_xray_inference(MODELS, classifier_fn=classify_xray_batch)
 
 # -----------------------------
 # Optional AI summary helper
 # -----------------------------
-def make_summary(condition: str, label: str, score: float) -> str:
-    """
-    Try to use OpenAI for a short medical summary.
-    If not available, return a fallback string.
-    """
-    if client is None:
-        return (
-            f"Condition: {condition}\n"
-            f"Result: {label} ({score:.1f}% confidence).\n"
-            "This is an AI-based prediction. Please consult a qualified doctor "
-            "for clinical interpretation and next steps."
-        )
-
-    prompt = f"""
+def fallback_summary(condition: str, label: str, score: float) -> str:
+    return (
+        f"Condition: {condition}\n"
+        f"Result: {label} ({score:.1f}% confidence).\n"
+        "This is an AI-based prediction. Please consult a qualified doctor "
+        "for clinical interpretation and next steps."
+    )
+
+def summary_prompt(condition: str, label: str, score: float) -> str:
+    return f"""
 You are a senior doctor AI.
 
 Condition: {condition}
@@ -102,14 +139,72 @@ Explain in simple language:
 4. Which specialist to consult
     """
 
+def build_summary_service():
+    """LIFELEN_SUMMARY_BACKEND=stub forces the local stub (for tests)."""
+    if os.getenv("LIFELEN_SUMMARY_BACKEND") == "stub":
+        return SummaryService(stub_backend, name="api-stub")
+    if client is None:
+        return SummaryService(fallback_summary, name="api-offline")
+    return SummaryService(
+        openai_backend(client, summary_prompt),
+        name="api",
+        store=SqliteSummaryStore(),
+    )
+
+summaries = build_summary_service()
+# How long a prediction response may wait for a fresh summary before
+# returning a summary_id instead (covers the offline/stub backends)
+SUMMARY_INLINE_WAIT_MS = float(os.getenv("SUMMARY_INLINE_WAIT_MS", "50"))
+
+def make_summary(condition: str, label: str, score: float) -> dict:
+    """
+    Summary fields for a prediction response.
+
+    Cached summaries are returned inline. Otherwise generation starts in
+    the background and the response carries a `summary_id` to poll at
+    /api/summary/<id>; `?summary=sync` waits for the text instead.
+    """
+    future = summaries.submit(condition, label, score)
+    summary_id = summaries.key_id(summaries.key(condition, label, score))
+
+    if request.args.get("summary") == "sync":
+        try:
+            return {"summary": future.result(timeout=60)}
+        except Exception as e:
+            return {"summary": f"AI summary failed: {e}"}
+
+    futures_wait([future], timeout=SUMMARY_INLINE_WAIT_MS / 1000.0)
+    if future.done() and future.exception() is None:
+        return {"summary": future.result()}
+    return {
+        "summary": None,
+        "summary_id": summary_id,
+        "summary_url": f"/api/summary/{summary_id}",
+    }
+
+@app.route("/api/summary/<summary_id>", methods=["GET"])
+def api_summary(summary_id):
+    """Poll a background summary; `?wait=<seconds>` long-polls up to 30s."""
     try:
-        res = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return res.choices[0].message.content.strip()
-    except Exception as e:
-        return f"AI summary failed: {e}"
+        wait = min(float(request.args.get("wait", 0)), 30.0)
+    except ValueError:
+        wait = 0.0
+
+    status, text = summaries.lookup(summary_id)
+    deadline = time.monotonic() + wait
+    while status == "pending" and time.monotonic() < deadline:
+        time.sleep(0.1)
+        status, text = summaries.lookup(summary_id)
+
+    if status == "unknown":
+        return jsonify({"status": "error", "message": "Unknown summary id"}), 404
+    if status == "error":
+        return jsonify({"status": "error", "message": f"AI summary failed: {text}"}), 502
+    return jsonify({"status": status, "summary_id": summary_id, "summary": text})
+
+@app.route("/api/summary/stats", methods=["GET"])
+def api_summary_stats():
+    return jsonify({"status": "ok", "summaries": summaries.stats()})
 
 # -----------------------------
 # API: Chest X-ray
@@ -124,163 +219,248 @@ def api_xray():
 
     f = request.files["file"]
     try:
-        # Read image with OpenCV-like pipeline
-        file_bytes = np.frombuffer(f.read(), np.uint8)
-        img_bgr = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-        if img_bgr is None:
+        img = decode_image(f.read())
+        if img is None:
             raise ValueError("Cannot decode image")
 
-        img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-        resized = cv2.resize(img_gray, (224, 224)) / 255.0
-        inp = np.expand_dims(resized, (0, -1)).astype(np.float32)
+        use_detector = xray_engine.mode == "fused" and MODELS["xray_detector"] is not None
+        inp, det = prepare_xray(img, detector=use_detector)
+        det_probs = xray_engine.detect(det[np.newaxis]) if use_detector else None
 
-        pred = MODELS["xray"].predict(inp)
-        prob = float(pred[0][0])
+        probs, stages = xray_engine.classify(inp[np.newaxis], det_probs)
+        prob = float(probs[0])
         label = "PNEUMONIA" if prob > 0.5 else "NORMAL"
         conf = prob if label == "PNEUMONIA" else 1 - prob
         conf_pct = conf * 100.0
 
-        summary = make_summary("Chest X-Ray / Pneumonia Detection", label, conf_pct)
-
         return jsonify({
             "status": "ok",
             "label": label,
             "confidence": conf_pct,
-            "summary": summary,
+            "stage": stages[0],
+            **make_summary("Chest X-Ray / Pneumonia Detection", label, conf_pct),
         })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route("/api/xray/stats", methods=["GET"])
+def api_xray_stats():
+    return jsonify({
+        "status": "ok",
+        "batcher": _xray_batcher.stats() if _xray_batcher is not None else None,
+        "inference": xray_engine.stats(),
+    })
+
 # -----------------------------
-# API: Diabetes
+# Tabular models (diabetes / heart / cancer)
 # -----------------------------
-@app.route("/api/diabetes", methods=["POST"])
-def api_diabetes():
-    if MODELS["diabetes_model"] is None or MODELS["diabetes_scaler"] is None:
-        return jsonify({"status": "error", "message": "Diabetes model/scaler not loaded"}), 500
+TABULAR_SPECS = {
+    "diabetes": {
+        "fields": ["pregnancies", "glucose", "bp", "skin", "insulin", "bmi", "dpf", "age"],
+        "labels": ("NON-DIABETIC", "DIABETIC"),
+        "score_key": "risk",
+        "summary_name": "Diabetes Risk",
+        "display_name": "Diabetes",
+    },
+    "heart": {
+        "fields": ["age", "sex", "cp", "bp", "chol", "fbs", "restecg",
+                   "thalach", "exang", "oldpeak", "slope", "ca", "thal"],
+        "labels": ("HEALTHY HEART", "HEART DISEASE DETECTED"),
+        "score_key": "risk",
+        "summary_name": "Heart Disease Risk",
+        "display_name": "Heart",
+    },
+    "cancer": {
+        "fields": ["radius", "texture", "perimeter", "area", "smooth"],
+        "labels": ("BENIGN", "MALIGNANT"),
+        "score_key": "confidence",
+        "summary_name": "Breast Cancer Prediction",
+        "display_name": "Cancer",
+    },
+}
+
+TABULAR_BATCH_CHUNK = int(os.getenv("TABULAR_BATCH_CHUNK", "4096"))
+
+def predict_tabular(condition: str, X: np.ndarray):
+    """
+    Scale + classify a 2-D feature matrix in one pass.
+    Returns (labels, positive-class probabilities); the label is derived
+    from predict_proba so the model is only evaluated once.
+    """
+    spec = TABULAR_SPECS[condition]
+    scaler = MODELS[f"{condition}_scaler"]
+    model = MODELS[f"{condition}_model"]
+
+    proba = model.predict_proba(scaler.transform(X))
+    classes = list(model.classes_)
+    pos = proba[:, classes.index(1)]
+    is_pos = np.asarray(model.classes_)[proba.argmax(axis=1)] == 1
+
+    labels = np.where(is_pos, spec["labels"][1], spec["labels"][0])
+    return labels, pos
+
+def tabular_models_loaded(condition: str) -> bool:
+    return (
+        MODELS[f"{condition}_model"] is not None
+        and MODELS[f"{condition}_scaler"] is not None
+    )
+
+def single_tabular_prediction(condition: str):
+    spec = TABULAR_SPECS[condition]
+    if not tabular_models_loaded(condition):
+        return jsonify({
+            "status": "error",
+            "message": f"{spec['display_name']} model/scaler not loaded",
+        }), 500
 
     data = request.get_json(force=True, silent=True) or {}
     try:
-        X = np.array([[ 
-            float(data["pregnancies"]),
-            float(data["glucose"]),
-            float(data["bp"]),
-            float(data["skin"]),
-            float(data["insulin"]),
-            float(data["bmi"]),
-            float(data["dpf"]),
-            float(data["age"]),
-        ]])
+        X = np.array([[float(data[field]) for field in spec["fields"]]])
     except KeyError as e:
         return jsonify({"status": "error", "message": f"Missing field {e}"}), 400
-    except ValueError:
+    except (TypeError, ValueError):
         return jsonify({"status": "error", "message": "Invalid numeric values"}), 400
 
     try:
-        scaler = MODELS["diabetes_scaler"]
-        model = MODELS["diabetes_model"]
-        Xs = scaler.transform(X)
-        pred = model.predict(Xs)[0]
-        prob = float(model.predict_proba(Xs)[0][1])
-        label = "DIABETIC" if pred == 1 else "NON-DIABETIC"
-        risk_pct = prob * 100.0
-        summary = make_summary("Diabetes Risk", label, risk_pct)
+        labels, probs = predict_tabular(condition, X)
+        label = str(labels[0])
+        score_pct = float(probs[0]) * 100.0
         return jsonify({
             "status": "ok",
             "label": label,
-            "risk": risk_pct,
-            "summary": summary,
+            spec["score_key"]: score_pct,
+            **make_summary(spec["summary_name"], label, score_pct),
         })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# -----------------------------
+# API: Diabetes
+# -----------------------------
+@app.route("/api/diabetes", methods=["POST"])
+def api_diabetes():
+    return single_tabular_prediction("diabetes")
+
 # -----------------------------
 # API: Heart Disease
 # -----------------------------
 @app.route("/api/heart", methods=["POST"])
 def api_heart():
-    if MODELS["heart_model"] is None or MODELS["heart_scaler"] is None:
-        return jsonify({"status": "error", "message": "Heart model/scaler not loaded"}), 500
-
-    data = request.get_json(force=True, silent=True) or {}
-    try:
-        X = np.array([[ 
-            float(data["age"]),
-            float(data["sex"]),
-            float(data["cp"]),
-            float(data["bp"]),
-            float(data["chol"]),
-            float(data["fbs"]),
-            float(data["restecg"]),
-            float(data["thalach"]),
-            float(data["exang"]),
-            float(data["oldpeak"]),
-            float(data["slope"]),
-            float(data["ca"]),
-            float(data["thal"]),
-        ]])
-    except KeyError as e:
-        return jsonify({"status": "error", "message": f"Missing field {e}"}), 400
-    except ValueError:
-        return jsonify({"status": "error", "message": "Invalid numeric values"}), 400
-
-    try:
-        scaler = MODELS["heart_scaler"]
-        model = MODELS["heart_model"]
-        Xs = scaler.transform(X)
-        pred = model.predict(Xs)[0]
-        prob = float(model.predict_proba(Xs)[0][1])
-        label = "HEART DISEASE DETECTED" if pred == 1 else "HEALTHY HEART"
-        risk_pct = prob * 100.0
-        summary = make_summary("Heart Disease Risk", label, risk_pct)
-        return jsonify({
-            "status": "ok",
-            "label": label,
-            "risk": risk_pct,
-            "summary": summary,
-        })
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return single_tabular_prediction("heart")
 
 # -----------------------------
 # API: Cancer (Breast)
 # -----------------------------
 @app.route("/api/cancer", methods=["POST"])
 def api_cancer():
-    if MODELS["cancer_model"] is None or MODELS["cancer_scaler"] is None:
-        return jsonify({"status": "error", "message": "Cancer model/scaler not loaded"}), 500
+    return single_tabular_prediction("cancer")
 
-    data = request.get_json(force=True, silent=True) or {}
-    try:
-        X = np.array([[ 
-            float(data["radius"]),
-            float(data["texture"]),
-            float(data["perimeter"]),
-            float(data["area"]),
-            float(data["smooth"]),
-        ]])
-    except KeyError as e:
-        return jsonify({"status": "error", "message": f"Missing field {e}"}), 400
-    except ValueError:
-        return jsonify({"status": "error", "message": "Invalid numeric values"}), 400
+# -----------------------------
+# API: Batch (JSON array / CSV / Parquet)
+# -----------------------------
+def read_batch_frame() -> pd.DataFrame:
+    """Parse the request body (or an uploaded `file`) into a DataFrame."""
+    if "file" in request.files:
+        f = request.files["file"]
+        name = (f.filename or "").lower()
+        if name.endswith(".parquet"):
+            return pd.read_parquet(io.BytesIO(f.read()))
+        if name.endswith(".csv"):
+            return pd.read_csv(f.stream)
+        raise ValueError("Unsupported file type (use .csv or .parquet)")
+
+    ctype = (request.mimetype or "").lower()
+    if "parquet" in ctype:
+        return pd.read_parquet(io.BytesIO(request.get_data()))
+    if "csv" in ctype:
+        return pd.read_csv(io.BytesIO(request.get_data()))
+
+    data = request.get_json(force=True, silent=True)
+    if isinstance(data, dict):
+        data = data.get("rows")
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of rows")
+    return pd.DataFrame.from_records(data)
+
+@app.route("/api/<condition>/batch", methods=["POST"])
+def api_tabular_batch(condition):
+    spec = TABULAR_SPECS.get(condition)
+    if spec is None:
+        return jsonify({"status": "error", "message": f"Unknown condition '{condition}'"}), 404
+
+    if not tabular_models_loaded(condition):
+        return jsonify({
+            "status": "error",
+            "message": f"{spec['display_name']} model/scaler not loaded",
+        }), 500
 
     try:
-        scaler = MODELS["cancer_scaler"]
-        model = MODELS["cancer_model"]
-        Xs = scaler.transform(X)
-        pred = model.predict(Xs)[0]
-        prob = float(model.predict_proba(Xs)[0][1])
-        label = "MALIGNANT" if pred == 1 else "BENIGN"
-        conf_pct = prob * 100.0
-        summary = make_summary("Breast Cancer Prediction", label, conf_pct)
-        return jsonify({
-            "status": "ok",
-            "label": label,
-            "confidence": conf_pct,
-            "summary": summary,
-        })
+        df = read_batch_frame()
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return jsonify({"status": "error", "message": f"Could not parse batch: {e}"}), 400
+
+    missing = [field for field in spec["fields"] if field not in df.columns]
+    if missing:
+        return jsonify({"status": "error", "message": f"Missing fields {missing}"}), 400
+
+    # Vectorized validation: anything non-numeric becomes NaN; inf is rejected too
+    X_all = df[spec["fields"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    valid = np.isfinite(X_all).all(axis=1)
+    score_key = spec["score_key"]
+
+    def generate():
+        for start in range(0, len(X_all), TABULAR_BATCH_CHUNK):
+            stop = min(start + TABULAR_BATCH_CHUNK, len(X_all))
+            chunk_valid = valid[start:stop]
+            out = [None] * (stop - start)
+
+            if chunk_valid.any():
+                # The 200 status is already sent: a failing chunk becomes
+                # per-row errors instead of cutting the stream off
+                try:
+                    labels, probs = predict_tabular(condition, X_all[start:stop][chunk_valid])
+                except Exception as e:
+                    print(f"Batch {condition} rows {start}-{stop - 1} failed: {e}")
+                    labels, probs, error = None, None, f"Prediction failed: {e}"
+                for n, i in enumerate(np.flatnonzero(chunk_valid)):
+                    if labels is None:
+                        out[i] = {"row": start + int(i), "status": "error", "message": error}
+                        continue
+                    out[i] = {
+                        "row": start + int(i),
+                        "status": "ok",
+                        "label": str(labels[n]),
+                        score_key: float(probs[n]) * 100.0,
+                    }
+
+            for i in np.flatnonzero(~chunk_valid):
+                out[i] = {
+                    "row": start + int(i),
+                    "status": "error",
+                    "message": "Invalid numeric values",
+                }
+
+            yield "".join(json.dumps(rec) + "\n" for rec in out)
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+# -----------------------------
+# Health / readiness
+# -----------------------------
+@app.route("/api/health", methods=["GET"])
+def api_health():
+    # Re-checked per call: a model that failed at warm-up may load later
+    ready = READINESS["state"] in ("ready", "degraded") and registry.ready(REQUIRED_MODELS)
+    if ready:
+        READINESS["state"] = "ready"
+    missing = [n for n in REQUIRED_MODELS if not registry.ready([n])]
+    return jsonify({
+        "status": READINESS["state"],
+        "warmup_seconds": READINESS["seconds"],
+        "required": REQUIRED_MODELS,
+        "missing": missing,
+        "models": registry.status(),
+    }), 200 if ready else 503
 
 # -----------------------------
 # Root test
@@ -1,39 +1,49 @@
 import streamlit as st
-import tensorflow as tf
 import numpy as np
 import cv2
-import pickle
 import os
 import time
 import base64
-from gtts import gTTS
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 import pandas as pd
 from datetime import datetime
 import streamlit.components.v1 as components
-import torch
-from torchvision import transforms, models
-import pdfplumber
-import pytesseract
-from PIL import Image as PILImage
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.colors import HexColor
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from datetime import datetime
 import uuid
-import qrcode
 import tempfile
-from utils.database import create_table, insert_prediction, fetch_predictions
 import requests
+from utils.lazy_imports import lazy_import, import_report, profile_cold_imports
+
+# Heavy libraries are imported on first use by the page that needs them
+rl_canvas = lazy_import("reportlab.pdfgen.canvas")
+rl_pagesizes = lazy_import("reportlab.lib.pagesizes")
+rl_colors = lazy_import("reportlab.lib.colors")
+PILImage = lazy_import("PIL.Image")
+qrcode = lazy_import("qrcode")
+
+HEAVY_MODULES = [
+    "tensorflow", "torch", "torchvision", "pdfplumber", "pytesseract",
+    "gtts", "reportlab", "qrcode",
+]
+
+from utils.database import create_table, insert_prediction, update_prediction_summary
 
 from utils.database import validate_user, create_user
-from utils.database import fetch_all_predictions, fetch_all_users
+from utils.database import fetch_all_users
+from utils.database import fetch_predictions_page, count_predictions
+from utils.database import fetch_recent_activity
+from utils.database import condition_counts, user_counts, daily_confidence, confidence_histogram
 from utils.database import fetch_messages
 from utils.database import insert_message
+from utils.database import has_lab_report, insert_lab_values, latest_lab_values
+from utils.model_registry import registry, XRAY_DETECTOR_CLASSES
+from utils.artifact_cache import artifact_cache
+from utils.image_pipeline import decode_image, to_rgb, prepare_xray
+from utils.xray_inference import build_xray_inference
+from utils.inference_pool import InferencePool
+from utils.summary_service import SummaryService, SqliteSummaryStore, stub_backend
+from utils.tts import build_tts_service
+from utils.ocr_reader import ocr_pipeline, join_pages
+from utils.lab_parser import parse_lab_values, parse_report_date, describe_lab_values
+from utils.pdf_preview import document_digest, pdf_page_count, pdf_thumbnails, PREVIEW_PAGES, THUMB_WIDTH
 
 
 
@@ -611,43 +621,46 @@ div[data-page="Home"] .stButton > button:hover {
 # -----------------------------
 # Voice Output
 # -----------------------------
-def speak_text(text: str):
-    """Convert text to speech using gTTS and play inside Streamlit."""
+@st.cache_resource
+def get_tts_service():
+    return build_tts_service()
+
+def _audio_html(audio) -> str:
+    data, mime = audio
+    audio_b64 = base64.b64encode(data).decode()
+    return f"<audio autoplay><source src='data:{mime};base64,{audio_b64}' type='{mime}'></audio>"
+
+def _fill_audio(placeholder, future, warn, timeout=None):
     try:
-        tts = gTTS(text, lang="en")
-        audio_file = "voice_output.mp3"
-        tts.save(audio_file)
-
-        with open(audio_file, "rb") as f:
-            audio_bytes = f.read()
-
-        audio_base64 = base64.b64encode(audio_bytes).decode()
-
-        st.markdown(
-            f"""
-            <audio autoplay>
-                <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
-            </audio>
-            """,
-            unsafe_allow_html=True
-        )
+        audio = future.result(timeout=timeout)
     except Exception as e:
-        st.warning(f"Voice output unavailable: {e}")
+        if warn:
+            placeholder.warning(f"Voice output unavailable: {e}")
+        return
+    placeholder.markdown(_audio_html(audio), unsafe_allow_html=True)
+
+def _queue_speech(text: str, lang: str, warn: bool):
+    """Reserve a slot for the audio now; synthesis finishes in the background."""
+    future = get_tts_service().submit(text, lang)
+    placeholder = st.empty()
+    if future.done():
+        _fill_audio(placeholder, future, warn)
+    else:
+        st.session_state.pending_audio.append((placeholder, future, warn))
+
+def flush_pending_audio(timeout: float = 15.0):
+    """Attach audio that was still being synthesized (called at the end of the page)."""
+    pending, st.session_state.pending_audio = st.session_state.pending_audio, []
+    for placeholder, future, warn in pending:
+        _fill_audio(placeholder, future, warn, timeout)
+
+def speak_text(text: str, lang: str = "en"):
+    """Convert text to speech and play inside Streamlit."""
+    _queue_speech(text, lang, warn=True)
 
 def speak_text_autoplay(text: str):
-    """Generate TTS audio (gTTS) and embed it with autoplay. Silent fail."""
-    try:
-        tts = gTTS(text, lang="en")
-        tpath = "voice.mp3"
-        tts.save(tpath)
-        with open(tpath, "rb") as f:
-            audio_b64 = base64.b64encode(f.read()).decode()
-        st.markdown(
-            f"<audio autoplay><source src='data:audio/mp3;base64,{audio_b64}' type='audio/mp3'></audio>",
-            unsafe_allow_html=True
-        )
-    except Exception:
-        pass
+    """Generate TTS audio and embed it with autoplay. Silent fail."""
+    _queue_speech(text, "en", warn=False)
 
 # Optional OpenAI client (place API key in Streamlit secrets under OPENAI_API_KEY)
 try:
@@ -662,6 +675,11 @@ except Exception:
 if "history" not in st.session_state:
     st.session_state.history = []
 
+# Speech and AI summaries started during this run; filled in at the end
+# by flush_pending_audio() / flush_pending_summaries()
+st.session_state.pending_audio = []
+st.session_state.pending_summaries = []
+
 # Navigation state already created above as st.session_state["Navigation"]
 
 # -----------------------------
@@ -670,8 +688,29 @@ if "history" not in st.session_state:
 SAMPLES_DIR = "samples"
 os.makedirs(SAMPLES_DIR, exist_ok=True)
 
-def create_pdf(lines, filename="report.pdf", title="AI Report"):
-    c = canvas.Canvas(filename, pagesize=letter)
+# Bump when the layout of the matching renderer changes (invalidates cached PDFs)
+PDF_TEMPLATE_VERSION = "1"
+XRAY_PDF_TEMPLATE_VERSION = "1"
+
+def create_pdf(lines, filename=None, title="AI Report"):
+    """
+    Render a simple report PDF, or reuse an identical one from the artifact
+    cache. Returns the cached path, or `filename` if a copy was requested.
+    """
+    lines = [str(line) for line in lines]
+    path = artifact_cache.get_or_build(
+        "report",
+        PDF_TEMPLATE_VERSION,
+        {"title": title, "lines": lines},
+        lambda out: _render_pdf(lines, out, title),
+    )
+    if filename:
+        return artifact_cache.materialize(path, filename)
+    return path
+
+def _render_pdf(lines, filename, title):
+    letter = rl_pagesizes.letter
+    c = rl_canvas.Canvas(filename, pagesize=letter)
     w, h = letter
 
     c.setFillColorRGB(0.0/255, 198/255, 169/255)
@@ -836,7 +875,13 @@ def generate_sample_reports():
         "cancer": cancer_file
     }
 
-SAMPLE_PATHS = generate_sample_reports()
+@st.cache_resource
+def sample_report_paths():
+    """Sample PDFs are built once per process (and once ever, via the artifact cache)."""
+    return generate_sample_reports()
+
+SAMPLE_PATHS = sample_report_paths()
+
 def create_professional_xray_pdf(
     patient_name,
     age,
@@ -845,9 +890,35 @@ def create_professional_xray_pdf(
     severity,
     confidence,
     ai_summary,
-    filename="xray_report.pdf"
+    filename=None
 ):
-    c = canvas.Canvas(filename, pagesize=A4)
+    report_date = datetime.now().strftime('%d %b %Y')
+    args = (patient_name, age, gender, result, severity, confidence, ai_summary, report_date)
+
+    path = artifact_cache.get_or_build(
+        "xray",
+        XRAY_PDF_TEMPLATE_VERSION,
+        [str(a) for a in args],
+        lambda out: _render_professional_xray_pdf(*args, out),
+    )
+    if filename:
+        return artifact_cache.materialize(path, filename)
+    return path
+
+def _render_professional_xray_pdf(
+    patient_name,
+    age,
+    gender,
+    result,
+    severity,
+    confidence,
+    ai_summary,
+    report_date,
+    filename
+):
+    A4 = rl_pagesizes.A4
+    HexColor = rl_colors.HexColor
+    c = rl_canvas.Canvas(filename, pagesize=A4)
     width, height = A4
 
     # ===== COLORS =====
@@ -880,7 +951,7 @@ def create_professional_xray_pdf(
 
     y -= 15
     c.drawString(40, y, f"Age: {age}")
-    c.drawString(320, y, f"Report Date: {datetime.now().strftime('%d %b %Y')}")
+    c.drawString(320, y, f"Report Date: {report_date}")
 
     # ===== DIVIDER =====
     y -= 15
@@ -943,7 +1014,8 @@ def create_professional_xray_pdf(
 # -----------------------------
 # AI summary (OpenAI / fallback)
 # -----------------------------
-def ai_summary_prompt(label: str, confidence: float, condition_name: str) -> str:
+def _generate_ai_summary(condition_name: str, label: str, confidence: float) -> str:
+    """Summary backend; raises on OpenAI errors so failures are not cached."""
     confidence = float(confidence)
 
     # ================= OFFLINE MODE =================
@@ -1120,78 +1192,147 @@ Give patient-friendly advice including:
 - Precautions
 - Next steps
 """
+    res = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return res.choices[0].message.content.strip()
+
+@st.cache_resource
+def get_summary_service():
+    # Summaries are keyed on (condition, label, confidence rounded to 1%)
+    if os.getenv("LIFELEN_SUMMARY_BACKEND") == "stub":
+        return SummaryService(stub_backend, name="streamlit-stub")
+    return SummaryService(
+        _generate_ai_summary,
+        name="streamlit" if client is not None else "streamlit-offline",
+        store=SqliteSummaryStore() if client is not None else None,
+    )
+
+def ai_summary_prompt(label: str, confidence: float, condition_name: str) -> str:
     try:
-        res = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return res.choices[0].message.content.strip()
+        return get_summary_service().get(condition_name, label, confidence)
     except Exception as e:
         return f"AI summary failed: {e}"
 
-# -----------------------------
-# X-Ray Detector (PyTorch)
-# -----------------------------
-CLASS_NAMES_DETECTOR = ["NORMAL", "PNEUMONIA", "NON_XRAY"]
-
-@st.cache_resource
-def load_xray_detector():
-    device = "cpu"
+def _summary_text(future, timeout=None):
+    try:
+        return future.result(timeout=timeout)
+    except Exception as e:
+        return f"AI summary failed: {e}"
 
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    WEIGHTS_PATH = os.path.join(BASE_DIR, "models", "xray_detector_best.pth")
+def record_prediction(condition, result, confidence, history_type=None):
+    """
+    Save the prediction (and its session history entry) right away: a
+    widget click reruns the script and can cut this run off before the
+    summary arrives. Returns a callback that attaches the summary later;
+    pass it to show_ai_summary() as `on_done`.
+    """
+    prediction_id = insert_prediction(
+        username=st.session_state.user,
+        condition=condition,
+        result=result,
+        confidence=confidence,
+        summary=None
+    )
+    rec = None
+    if history_type:
+        rec = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "type": history_type,
+            "result": result,
+            "score": confidence,
+            "summary": "",
+        }
+        st.session_state.history.insert(0, rec)
 
-    if not os.path.exists(WEIGHTS_PATH):
-        st.warning("⚠️ X-ray detector weights not found. Validation disabled.")
-        return None
+    def attach_summary(ai_text):
+        update_prediction_summary(prediction_id, ai_text)
+        if rec is not None:
+            rec["summary"] = ai_text
+    return attach_summary
 
-    model = models.resnet18(weights=None)
-    model.fc = torch.nn.Linear(model.fc.in_features, len(CLASS_NAMES_DETECTOR))
+def _run_on_done(future, on_done):
+    # Runs on the summary worker thread, whether or not this script run is still alive
+    try:
+        on_done(_summary_text(future))
+    except Exception as e:
+        print(f"Saving AI summary failed: {e}")
 
-    state_dict = torch.load(WEIGHTS_PATH, map_location=device)
-    model.load_state_dict(state_dict)
-    model.eval()
+def show_ai_summary(label: str, confidence: float, condition_name: str, on_done=None, on_ready=None):
+    """
+    Render the AI summary without holding up the rest of the page: cached
+    text is shown at once, otherwise a placeholder is filled in by
+    flush_pending_summaries() at the end of the run.
+
+    `on_done(ai_text)` runs as soon as the summary exists, even if a rerun
+    has replaced this run, so it must not touch `st` (storing the summary).
+    `on_ready(ai_text)` runs in flush_pending_summaries() and can write
+    into slots the caller reserves after this call (PDF downloads); it is
+    skipped when the run is interrupted.
+    """
+    future = get_summary_service().submit(condition_name, label, confidence)
+    if on_done is not None:
+        future.add_done_callback(lambda f: _run_on_done(f, on_done))
+    placeholder = st.empty()
+    if future.done():
+        placeholder.info(_summary_text(future))
+    else:
+        placeholder.info("🧠 Generating AI summary…")
+    st.session_state.pending_summaries.append((placeholder, future, on_ready))
+
+def flush_pending_summaries(timeout: float = 60.0):
+    """Fill summaries still being generated and run their callbacks (end of the page)."""
+    pending, st.session_state.pending_summaries = st.session_state.pending_summaries, []
+    for placeholder, future, on_ready in pending:
+        ai_text = _summary_text(future, timeout)
+        placeholder.info(ai_text)
+        if on_ready is not None:
+            on_ready(ai_text)
 
-    return model
+# -----------------------------
+# X-Ray Detector (PyTorch)
+# -----------------------------
+CLASS_NAMES_DETECTOR = XRAY_DETECTOR_CLASSES
 
-xray_detector = load_xray_detector()
+@st.cache_resource
+def get_inference_pool():
+    """
+    Model calls run in worker processes instead of on the script thread.
+    LIFELEN_INFERENCE_WORKERS=N sets the count (default 1; 0 = inline).
+    """
+    return InferencePool(registry=registry)
 
-xray_det_tfms = transforms.Compose([
-    transforms.ToPILImage(),
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
+@st.cache_resource
+def get_xray_engine():
+    """Detector + classifier cascade (LIFELEN_XRAY_MODE=fused skips confident cases)."""
+    pool = get_inference_pool()
+    return build_xray_inference(
+        registry,
+        detector_fn=lambda batch: pool.run("xray_detect", batch),
+        classifier_fn=lambda batch: pool.run("xray_classify", batch),
     )
-])
-
 
-def predict_is_xray(img_bgr: np.ndarray):
+def predict_is_xray(detector_input: np.ndarray):
     """
+    `detector_input` is the (3, 224, 224) array from prepare_xray().
+
     Returns:
         is_xray (bool)
         confidence (float)
         predicted_label (str)
+        detector probabilities (None without a detector)
     """
-    if xray_detector is None:
+    engine = get_xray_engine()
+    probs = engine.detect(detector_input[np.newaxis])
+    if probs is None:
+        st.warning("⚠️ X-ray detector weights not found. Validation disabled.")
         # Fail-open for safety
-        return True, 0.0, "UNKNOWN"
-
-    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    tensor = xray_det_tfms(img_rgb).unsqueeze(0)
+        return True, 0.0, "UNKNOWN", None
 
-    with torch.no_grad():
-        logits = xray_detector(tensor)
-        probs = torch.softmax(logits, dim=1)[0].cpu().numpy()
-
-    non_xray_idx = CLASS_NAMES_DETECTOR.index("NON_XRAY")
-    non_xray_prob = float(probs[non_xray_idx])
-
-    if non_xray_prob >= 0.75:
-        return False, non_xray_prob, "NON_XRAY"
-
-    return True, 1.0 - non_xray_prob, "XRAY"
+    probs = probs[0]
+    is_xray, confidence, label = engine.is_xray(probs)
+    return is_xray, confidence, label, probs
 
 
 # -----------------------------
@@ -1199,34 +1340,11 @@ def predict_is_xray(img_bgr: np.ndarray):
 # -----------------------------
 @st.cache_resource
 def load_models():
-    models_dict = {}
-    try:
-        models_dict["xray"] = tf.keras.models.load_model("models/chest_xray_model.h5")
-    except Exception:
-        models_dict["xray"] = None
-
-    try:
-        models_dict["diabetes_model"] = pickle.load(open("models/diabetes_model.pkl", "rb"))
-        models_dict["diabetes_scaler"] = pickle.load(open("models/diabetes_scaler.pkl", "rb"))
-    except Exception:
-        models_dict["diabetes_model"] = None
-        models_dict["diabetes_scaler"] = None
-
-    try:
-        models_dict["heart_model"] = pickle.load(open("models/heart_model.pkl", "rb"))
-        models_dict["heart_scaler"] = pickle.load(open("models/heart_scaler.pkl", "rb"))
-    except Exception:
-        models_dict["heart_model"] = None
-        models_dict["heart_scaler"] = None
-
-    try:
-        models_dict["cancer_model"] = pickle.load(open("models/cancer_model.pkl", "rb"))
-        models_dict["cancer_scaler"] = pickle.load(open("models/cancer_scaler.pkl", "rb"))
-    except Exception:
-        models_dict["cancer_model"] = None
-        models_dict["cancer_scaler"] = None
-
-    return models_dict
+    """
+    Shared lazy registry: each model is loaded on first use, not at startup.
+    LIFELEN_MODEL_BACKEND=onnx serves the X-ray models with ONNX Runtime.
+    """
+    return registry
 
 ensure_xray_model()
 models = load_models()
@@ -1258,15 +1376,71 @@ def render_report_prediction_block(result_label, score_value, condition_name, ai
     st.info(ai_text)
 
     try:
-        with open(pdf_filename, "rb") as f:
-            st.download_button(
-                "📄 Download Prediction Report (PDF)",
-                f,
-                file_name=os.path.basename(pdf_filename)
-            )
+        st.download_button(
+            "📄 Download Prediction Report (PDF)",
+            artifact_cache.read_bytes(pdf_filename),
+            file_name=os.path.basename(pdf_filename)
+        )
     except Exception:
         st.warning("PDF report not available for download.")
 # -----------------------------
+# UI Helper: Paginated prediction history
+# -----------------------------
+HISTORY_PAGE_SIZE = 25
+
+def render_prediction_history(username, key, columns, page_size=HISTORY_PAGE_SIZE):
+    """
+    Keyset-paginated history table: only one page of rows is queried and
+    rendered per run. Cursors for earlier pages are kept in session state.
+    """
+    state_key = f"{key}_cursors"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+
+    rows, next_cursor = fetch_predictions_page(username, limit=page_size, cursor=cursors[-1])
+
+    st.dataframe(
+        pd.DataFrame(rows, columns=columns),
+        use_container_width=True,
+        height=min(38 + 35 * max(len(rows), 1), 420),
+    )
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Newer", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    info_col.caption(f"Page {len(cursors)}")
+    if next_col.button("Older ▶", key=f"{key}_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+    return rows
+
+# -----------------------------
+# UI Helper: Analytics frames (server-side aggregates)
+# -----------------------------
+def condition_counts_frame(username):
+    return pd.DataFrame(
+        condition_counts(username),
+        columns=["Condition", "Count", "Avg Confidence (%)"]
+    ).set_index("Condition")
+
+def confidence_histogram_frame(username):
+    return pd.DataFrame(
+        confidence_histogram(username),
+        columns=["Confidence", "Count"]
+    ).set_index("Confidence")["Count"]
+
+def daily_confidence_frame(username):
+    df = pd.DataFrame(
+        daily_confidence(username, window=7),
+        columns=["Date", "Count", "Daily Avg (%)", "7-Day Avg (%)"]
+    )
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.set_index("Date")
+
+# -----------------------------
 # UI Helper: Card
 # ----------------------------
 def card_html(title, desc):
@@ -1522,7 +1696,7 @@ def home_page():
 def chest_xray_page():
     st.header("🫁 Chest X-Ray Analyzer")
 
-    if models["xray"] is None:
+    if not get_inference_pool().has_models("xray"):
         st.error("Chest X-Ray model not available.")
         return
 
@@ -1531,21 +1705,24 @@ def chest_xray_page():
         st.info("Please upload a chest X-ray image.")
         return
 
-    file_bytes = np.frombuffer(file.read(), np.uint8)
-    img_bgr = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+    img = decode_image(file.getvalue())
 
-    if img_bgr is None:
+    if img is None:
         st.error("Invalid image file.")
         return
 
     st.image(
-        cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB),
+        to_rgb(img),
         caption="Uploaded Image",
         width=520
     )
 
+    # ---------- PREPROCESS ----------
+    # One decode feeds both the detector and the classifier
+    cls_input, det_input = prepare_xray(img)
+
     # ---------- X-RAY VALIDATION ----------
-    is_xray, det_conf, _ = predict_is_xray(img_bgr)
+    is_xray, det_conf, _, det_probs = predict_is_xray(det_input)
 
     if not is_xray and det_conf >= 0.75:
         st.error("❌ Uploaded image is NOT a chest X-ray.")
@@ -1554,15 +1731,13 @@ def chest_xray_page():
     if not is_xray:
         st.warning("⚠️ Atypical chest X-ray detected. Accuracy may be reduced.")
 
-    # ---------- PREPROCESS ----------
-    img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-    resized = cv2.resize(img_gray, (224, 224)) / 255.0
-    inp = np.expand_dims(resized, (0, -1)).astype(np.float32)
-
     if st.button("🔍 Analyze X-Ray"):
         with st.spinner("Analyzing chest radiograph..."):
-            pred = models["xray"].predict(inp)
-            prob = float(pred[0][0])
+            probs, stages = get_xray_engine().classify(
+                cls_input[np.newaxis],
+                det_probs[np.newaxis] if det_probs is not None else None,
+            )
+            prob = float(probs[0])
 
         label = "PNEUMONIA" if prob > 0.5 else "NORMAL"
         conf = prob if label == "PNEUMONIA" else 1 - prob
@@ -1576,46 +1751,57 @@ def chest_xray_page():
         )
 
         st.success(f"🩺 Result: {label} ({conf*100:.2f}%)")
+        attach_summary = record_prediction("Chest X-Ray", label, round(conf * 100, 2))
+
+        def xray_report(ai_text):
+            pdf_path = create_pdf(
+                [
+                    "Chest X-Ray Analysis Report",
+                    f"Result: {label}",
+                    f"Severity: {severity}",
+                    f"Confidence: {conf*100:.2f}%",
+                    "",
+                    ai_text,
+                ],
+                title="Chest X-Ray Report"
+            )
 
-        ai_text = ai_summary_prompt(
-            label=label,
-            confidence=conf * 100,
-            condition_name="Chest X-Ray / Pneumonia Detection"
-        )
-        st.info(ai_text)
-
-        insert_prediction(
-            username=st.session_state.user,
-            condition="Chest X-Ray",
-            result=label,
-            confidence=round(conf * 100, 2),
-            summary=ai_text
-        )
-
-        pdf_path = create_pdf(
-            [
-                "Chest X-Ray Analysis Report",
-                f"Result: {label}",
-                f"Severity: {severity}",
-                f"Confidence: {conf*100:.2f}%",
-                "",
-                ai_text,
-            ],
-            "xray_report.pdf",
-            "Chest X-Ray Report"
-        )
-
-        with open(pdf_path, "rb") as f:
-            st.download_button(
+            download_slot.download_button(
                 "📄 Download Report (PDF)",
-                f,
+                artifact_cache.read_bytes(pdf_path),
                 file_name="xray_report.pdf"
             )
 
+        show_ai_summary(
+            label=label,
+            confidence=conf * 100,
+            condition_name="Chest X-Ray / Pneumonia Detection",
+            on_done=attach_summary,
+            on_ready=xray_report,
+        )
+        download_slot = st.empty()
+
 #-------------------------------
 #----------------------------- Diabetes Page -----------------------------
 #-----------------------------
 
+def lab_prefill(fields):
+    """
+    Input defaults from the user's latest parsed lab values.
+    `fields` maps input name -> (analyte, min, max, default).
+    """
+    latest = latest_lab_values(st.session_state.user, [a for a, *_ in fields.values()])
+    values, used = {}, set()
+    for name, (analyte, low, high, default) in fields.items():
+        values[name] = default
+        if analyte in latest:
+            value = min(max(latest[analyte][0], low), high)
+            values[name] = type(default)(round(value) if isinstance(default, int) else value)
+            used.add(latest[analyte][2][:10])
+    if used:
+        st.caption(f"📑 Pre-filled from your uploaded lab reports ({', '.join(sorted(used))})")
+    return values
+
 def diabetes_page():
     st.header("💉 Diabetes Risk Assessment")
     st.markdown("""
@@ -1634,31 +1820,37 @@ def diabetes_page():
 """, unsafe_allow_html=True)
 
 
-    if models["diabetes_model"] is None or models["diabetes_scaler"] is None:
+    if not get_inference_pool().has_models("diabetes_model", "diabetes_scaler"):
         st.error("Diabetes model or scaler missing.")
         return
 
     st.subheader("🧾 Patient Metabolic Parameters")
 
+    lab = lab_prefill({
+        "bp": ("diastolic_bp", 0, 200, 70),
+        "insulin": ("insulin", 0, 900, 85),
+        "glucose": ("glucose", 0, 300, 120),
+        "bmi": ("bmi", 1.0, 70.0, 25.0),
+        "age": ("age", 1, 120, 30),
+    })
+
     col1, col2 = st.columns(2)
 
     with col1:
         pregnancies = st.number_input("Pregnancies", 0, 20, 1)
-        bp = st.number_input("Blood Pressure", 0, 200, 70)
-        insulin = st.number_input("Insulin", 0, 900, 85)
+        bp = st.number_input("Blood Pressure", 0, 200, lab["bp"])
+        insulin = st.number_input("Insulin", 0, 900, lab["insulin"])
         dpf = st.number_input("Diabetes Pedigree Function", 0.0, 5.0, 0.5)
 
     with col2:
-        glucose = st.number_input("Glucose", 0, 300, 120)
+        glucose = st.number_input("Glucose", 0, 300, lab["glucose"])
         skin = st.number_input("Skin Thickness", 0, 100, 20)
-        bmi = st.number_input("BMI", 1.0, 70.0, 25.0)
-        age = st.number_input("Age", 1, 120, 30)
+        bmi = st.number_input("BMI", 1.0, 70.0, lab["bmi"])
+        age = st.number_input("Age", 1, 120, lab["age"])
 
     if st.button("🔍 Analyze Diabetes Risk", key="diabetes_btn"):
         X = np.array([[pregnancies, glucose, bp, skin, insulin, bmi, dpf, age]])
-        Xs = models["diabetes_scaler"].transform(X)
-
-        prob = models["diabetes_model"].predict_proba(Xs)[0][1]
+        prob = get_inference_pool().run("tabular_proba", X, "diabetes")[0][1]
 
         if prob < 0.30:
             stage = "Non-Diabetic"
@@ -1685,33 +1877,16 @@ def diabetes_page():
 ⚠️ *Confirm with HbA1c and fasting glucose tests.*
 """)
 
-        ai_text = ai_summary_prompt(stage, prob * 100, "Diabetes Risk Assessment")
-        st.info(ai_text)
-        speak_text_autoplay(f"Diabetes status {stage}, risk {prob*100:.0f} percent.")
-
-        insert_prediction(
-    username=st.session_state.user,
-    condition="Diabetes",
-    result=stage,
-    confidence=round(prob * 100, 2),
-    summary=ai_text
-)
+        attach_summary = record_prediction("Diabetes", stage, round(prob * 100, 2), history_type="Diabetes")
 
-        rec = {
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "type": "Diabetes",
-            "result": stage,
-            "score": round(prob * 100, 2),
-            "summary": ai_text,
-        }
-        st.session_state.history.insert(0, rec)
+        def diabetes_report(ai_text):
+            create_pdf(
+                ["Diabetes Report", f"Status: {stage}", f"Risk: {prob*100:.2f}%", "", ai_text],
+                title="Diabetes Report",
+            )
 
-        pdf_path = f"diabetes_report_{int(time.time())}.pdf"
-        create_pdf(
-            ["Diabetes Report", f"Status: {stage}", f"Risk: {prob*100:.2f}%", "", ai_text],
-            pdf_path,
-            "Diabetes Report",
-        )
+        show_ai_summary(stage, prob * 100, "Diabetes Risk Assessment", on_done=attach_summary, on_ready=diabetes_report)
+        speak_text_autoplay(f"Diabetes status {stage}, risk {prob*100:.0f} percent.")
 #------------------------------
 #----------------------------- Heart Disease Page -----------------------------
 #-----------------------------
@@ -1733,19 +1908,25 @@ def heart_page():
 """, unsafe_allow_html=True)
 
 
-    if models["heart_model"] is None or models["heart_scaler"] is None:
+    if not get_inference_pool().has_models("heart_model", "heart_scaler"):
         st.error("Heart model or scaler missing.")
         return
 
     st.subheader("🫀 Cardiac Health Parameters")
 
+    lab = lab_prefill({
+        "age": ("age", 1, 120, 45),
+        "bp": ("systolic_bp", 60, 200, 130),
+        "chol": ("cholesterol", 100, 600, 240),
+    })
+
     c1, c2, c3 = st.columns(3)
 
-    age = c1.number_input("Age", 1, 120, 45)
+    age = c1.number_input("Age", 1, 120, lab["age"])
     sex = c2.selectbox("Sex", ["Male", "Female"])
-    bp = c3.number_input("Resting Blood Pressure", 60, 200, 130)
+    bp = c3.number_input("Resting Blood Pressure", 60, 200, lab["bp"])
 
-    chol = c1.number_input("Cholesterol", 100, 600, 240)
+    chol = c1.number_input("Cholesterol", 100, 600, lab["chol"])
     thalach = c2.number_input("Max Heart Rate", 60, 220, 150)
     oldpeak = c3.number_input("ST Depression", 0.0, 10.0, 1.0)
 
@@ -1753,9 +1934,7 @@ def heart_page():
 
     if st.button("🔍 Analyze Heart Risk", key="heart_btn"):
         X = np.array([[age, sex_val, 0, bp, chol, 0, 0, thalach, 0, oldpeak, 1, 0, 2]])
-        Xs = models["heart_scaler"].transform(X)
-
-        prob = models["heart_model"].predict_proba(Xs)[0][1]
+        prob = get_inference_pool().run("tabular_proba", X, "heart")[0][1]
 
         if prob < 0.30:
             stage = "Low Risk"
@@ -1782,32 +1961,16 @@ def heart_page():
 ⚠️ *ECG / ECHO / Stress tests recommended.*
 """)
 
-        ai_text = ai_summary_prompt(stage, prob * 100, "Heart Disease Risk")
-        st.info(ai_text)
-        speak_text_autoplay(f"Heart disease risk {stage}, probability {prob*100:.0f} percent.")
-        insert_prediction(
-    username=st.session_state.user,
-    condition="Heart Disease",
-    result=stage,
-    confidence=round(prob * 100, 2),
-    summary=ai_text
-)
+        attach_summary = record_prediction("Heart Disease", stage, round(prob * 100, 2), history_type="Heart")
 
-        rec = {
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "type": "Heart",
-            "result": stage,
-            "score": round(prob * 100, 2),
-            "summary": ai_text,
-        }
-        st.session_state.history.insert(0, rec)
+        def heart_report(ai_text):
+            create_pdf(
+                ["Heart Disease Report", f"Risk: {stage}", f"Probability: {prob*100:.2f}%", "", ai_text],
+                title="Heart Report",
+            )
 
-        pdf_path = f"heart_report_{int(time.time())}.pdf"
-        create_pdf(
-            ["Heart Disease Report", f"Risk: {stage}", f"Probability: {prob*100:.2f}%", "", ai_text],
-            pdf_path,
-            "Heart Report",
-        )
+        show_ai_summary(stage, prob * 100, "Heart Disease Risk", on_done=attach_summary, on_ready=heart_report)
+        speak_text_autoplay(f"Heart disease risk {stage}, probability {prob*100:.0f} percent.")
 #------------------------------
 #----------------------------- Cancer Page -----------------------------
 #-----------------------------
@@ -1828,7 +1991,7 @@ def cancer_page():
 </div>
 """, unsafe_allow_html=True)
 
-    if models["cancer_model"] is None or models["cancer_scaler"] is None:
+    if not get_inference_pool().has_models("cancer_model", "cancer_scaler"):
         st.error("Cancer model or scaler missing.")
         return
 
@@ -1843,9 +2006,7 @@ def cancer_page():
 
     if st.button("🔍 Analyze Cancer Risk", key="cancer_btn"):
         X = np.array([[radius, texture, perimeter, area, smooth]])
-        Xs = models["cancer_scaler"].transform(X)
-
-        prob = models["cancer_model"].predict_proba(Xs)[0][1]
+        prob = get_inference_pool().run("tabular_proba", X, "cancer")[0][1]
         malignant = prob >= 0.5
 
         presence = "Cancer Detected" if malignant else "No Cancer Detected"
@@ -1877,37 +2038,80 @@ def cancer_page():
 ⚠️ *Biopsy & imaging required for confirmation.*
 """)
 
-        ai_text = ai_summary_prompt(presence, prob * 100, "Breast Cancer Risk")
-        st.info(ai_text)
-        speak_text_autoplay(f"Cancer assessment {presence}, probability {prob*100:.0f} percent.")
-        insert_prediction(
-    username=st.session_state.user,
-    condition="Cancer",
-    result=presence,
-    confidence=round(prob * 100, 2),
-    summary=ai_text
-)
+        attach_summary = record_prediction("Cancer", presence, round(prob * 100, 2), history_type="Cancer")
 
+        def cancer_report(ai_text):
+            create_pdf(
+                ["Cancer Report", f"Presence: {presence}", f"Risk: {risk}", f"Stage: {stage}", "", ai_text],
+                title="Cancer Report",
+            )
 
-        rec = {
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "type": "Cancer",
-            "result": presence,
-            "score": round(prob * 100, 2),
-            "summary": ai_text,
-        }
-        st.session_state.history.insert(0, rec)
-
-        pdf_path = f"cancer_report_{int(time.time())}.pdf"
-        create_pdf(
-            ["Cancer Report", f"Presence: {presence}", f"Risk: {risk}", f"Stage: {stage}", "", ai_text],
-            pdf_path,
-            "Cancer Report",
-        )
+        show_ai_summary(presence, prob * 100, "Breast Cancer Risk", on_done=attach_summary, on_ready=cancer_report)
+        speak_text_autoplay(f"Cancer assessment {presence}, probability {prob*100:.0f} percent.")
 
 # -----------------------------
 # REPORT ANALYZER PAGE
 # -----------------------------
+def render_pdf_preview(data: bytes, file_name: str):
+    """Page thumbnails (a few at a time) plus a download of the original file."""
+    digest = document_digest(data)
+    shown_key = f"pdf_preview_pages_{digest[:16]}"
+    shown = st.session_state.get(shown_key, PREVIEW_PAGES)
+
+    try:
+        total = pdf_page_count(data, digest)
+        paths = pdf_thumbnails(data, 0, shown, digest=digest)
+    except Exception as e:
+        st.warning(f"Preview unavailable: {e}")
+        total, paths = 0, []
+
+    if paths:
+        st.image(paths, width=THUMB_WIDTH // 2, caption=[f"Page {i + 1}" for i in range(len(paths))])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(paths) < total and st.button(
+            f"Show more pages ({len(paths)}/{total})", key=f"{shown_key}_more"
+        ):
+            st.session_state[shown_key] = shown + PREVIEW_PAGES
+            st.rerun()
+    with col2:
+        st.download_button(
+            "⬇️ Download original PDF",
+            data=data,
+            file_name=file_name,
+            mime="application/pdf",
+            key=f"{shown_key}_download",
+        )
+
+def stream_report_text(data: bytes, is_pdf: bool) -> str:
+    """
+    Extract report text page-parallel (text layer first, OCR only for
+    image-only pages), showing partial text as pages finish.
+    """
+    progress = st.progress(0.0, text="Reading report…")
+    preview = st.empty()
+    pages = {}
+    ocr_pages = 0
+
+    try:
+        for page in ocr_pipeline.iter_pages(data, is_pdf):
+            pages[page["index"]] = page
+            ocr_pages += page["method"] == "ocr"
+            progress.progress(
+                len(pages) / page["count"],
+                text=f"Extracted {len(pages)}/{page['count']} pages"
+                     + (" (cached)" if page["cached"] else f" ({ocr_pages} via OCR)"),
+            )
+            if not page["cached"]:
+                preview.text(join_pages(pages[i] for i in sorted(pages)))
+    except Exception as e:
+        st.error(f"Text extraction failed: {e}")
+
+    extracted_text = join_pages(pages[i] for i in sorted(pages))
+    preview.text_area("Report Content", extracted_text, height=300)
+    return extracted_text
+
 def report_page():
     st.header("📑 Medical Report Analyzer")
 
@@ -1920,68 +2124,66 @@ def report_page():
         st.info("Upload a medical report (lab report, prescription, scan, etc.)")
         return
 
-    extracted_text = ""
-
     # ---------- PDF ----------
     if file.type == "application/pdf":
         st.subheader("📄 PDF Preview")
 
-        pdf_bytes = file.read()
-        base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
-        st.markdown(
-            f"""
-            <embed src="data:application/pdf;base64,{base64_pdf}"
-                   width="100%" height="600px" />
-            """,
-            unsafe_allow_html=True,
-        )
-
-        file.seek(0)
-        with pdfplumber.open(file) as pdf:
-            for page in pdf.pages:
-                txt = page.extract_text()
-                if txt:
-                    extracted_text += txt + "\n"
+        data = file.read()
+        render_pdf_preview(data, file.name)
 
     # ---------- IMAGE ----------
     else:
         st.subheader("🖼 Image Preview")
+        data = file.read()
+        file.seek(0)
         img = PILImage.open(file)
         st.image(img, use_column_width=True)
 
-        extracted_text = pytesseract.image_to_string(img)
-
     # ---------- TEXT ----------
     st.subheader("📝 Extracted Text")
-    st.text_area("Report Content", extracted_text, height=300)
+    extracted_text = stream_report_text(data, is_pdf=file.type == "application/pdf")
 
     if not extracted_text.strip():
         st.warning("No readable medical text found.")
         return
 
+    # ---------- LAB VALUES ----------
+    lab_values = parse_lab_values(extracted_text)
+    if lab_values:
+        st.subheader("🧪 Detected Lab Values")
+        st.dataframe(
+            pd.DataFrame(
+                [(k, v["value"], v["unit"], v["raw"]) for k, v in lab_values.items()],
+                columns=["Analyte", "Value", "Unit", "Source Text"],
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+        report_sha = document_digest(data)
+        if not has_lab_report(st.session_state.user, report_sha):
+            insert_lab_values(
+                st.session_state.user,
+                report_sha,
+                lab_values,
+                measured_at=parse_report_date(extracted_text),
+            )
+        st.caption("These values pre-fill the Diabetes and Heart assessments.")
+
     # ---------- AI ANALYSIS ----------
     st.subheader("🧠 AI Medical Interpretation")
 
-    ai_text = ai_summary_prompt(
-        label="Medical Report Analysis",
-        confidence=100,
-        condition_name="Medical Report / Prescription Analysis"
-    )
-
-    st.info(ai_text)
-
-    speak_text_autoplay("Medical report analysis completed.")
-
     # ---------- STORE IN DB ----------
-    insert_prediction(
-        username=st.session_state.user,
-        condition="Medical Report",
-        result="Analyzed",
+    attach_summary = record_prediction("Medical Report", "Analyzed", 100)
+    st.success("✅ Report analyzed and saved to your dashboard")
+
+    show_ai_summary(
+        label=describe_lab_values(lab_values) or "Medical Report Analysis",
         confidence=100,
-        summary=ai_text
+        condition_name="Medical Report / Prescription Analysis",
+        on_done=attach_summary,
     )
 
-    st.success("✅ Report analyzed and saved to your dashboard")
+    speak_text_autoplay("Medical report analysis completed.")
 # -----------------------------
 # DASHBOARD PAGE
 # -----------------------------
@@ -1989,30 +2191,28 @@ def dashboard_page():
     st.header("📊 My Prediction History")
 
     username = st.session_state.user
-    rows = fetch_predictions(username)
 
-    if not rows:
+    if count_predictions(username) == 0:
         st.info("No predictions yet. Run any model to see results here.")
         return
 
-    df = pd.DataFrame(
-        rows,
-        columns=["Condition", "Result", "Confidence (%)", "Date"]
+    render_prediction_history(
+        username,
+        key="dashboard_history",
+        columns=["Condition", "Result", "Confidence (%)", "Date"],
     )
 
-    st.dataframe(df, use_container_width=True)
-
     st.subheader("📈 My Analytics")
 
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("### Predictions by Condition")
-        st.bar_chart(df["Condition"].value_counts())
+        st.bar_chart(condition_counts_frame(username)["Count"])
 
     with col2:
         st.markdown("### Confidence Distribution")
-        st.line_chart(df["Confidence (%)"])
+        st.bar_chart(confidence_histogram_frame(username))
 # -----------------------------
 # PROFILE PAGE (Medical Style)
 # -----------------------------
@@ -2051,10 +2251,9 @@ def profile_page():
         st.write("**Platform:** LIFE-LEN AI Clinical System")
 
     # ---------- FETCH USER DATA ----------
-    rows = fetch_predictions(username)
-
-    total_predictions = len(rows)
-    last_activity = rows[0][-1] if rows else None
+    total_predictions = count_predictions(username)
+    recent_rows, _ = fetch_predictions_page(username, limit=10)
+    last_activity = recent_rows[0][-1] if recent_rows else None
 
     with col2:
         st.markdown("### 📊 Clinical Usage Summary")
@@ -2071,17 +2270,15 @@ def profile_page():
     # =========================
     st.markdown("### 🕒 Recent Clinical Assessments")
 
-    if not rows:
+    if not recent_rows:
         st.info("No clinical assessments recorded yet.")
         return
 
-    df = pd.DataFrame(
-        rows,
-        columns=["Condition", "Result", "Confidence (%)", "Date"]
-    )
-
     st.dataframe(
-        df.head(10),
+        pd.DataFrame(
+            recent_rows,
+            columns=["Condition", "Result", "Confidence (%)", "Date"]
+        ),
         use_container_width=True
     )
 
@@ -2096,15 +2293,12 @@ def profile_page():
 
     with col3:
         st.markdown("**Assessments by Condition**")
-        st.bar_chart(df["Condition"].value_counts())
+        st.bar_chart(condition_counts_frame(username)["Count"])
 
     with col4:
         st.markdown("**AI Confidence Trend Over Time**")
-        df_sorted = df.copy()
-        df_sorted["Date"] = pd.to_datetime(df_sorted["Date"])
-        df_sorted = df_sorted.sort_values("Date")
         st.line_chart(
-            df_sorted.set_index("Date")["Confidence (%)"]
+            daily_confidence_frame(username)[["Daily Avg (%)", "7-Day Avg (%)"]]
         )
 
     # =========================
@@ -2126,9 +2320,9 @@ def patient_profile_view():
 
     username = st.session_state.user
 
-    rows = fetch_predictions(username)
-    total = len(rows)
-    last = rows[0][-1] if rows else "No activity"
+    total = count_predictions(username)
+    latest, _ = fetch_predictions_page(username, limit=1)
+    last = latest[0][-1] if latest else "No activity"
 
     col1, col2 = st.columns(2)
     col1.metric("Total AI Assessments", total)
@@ -2136,17 +2330,16 @@ def patient_profile_view():
 
     st.markdown("---")
 
-    if not rows:
+    if not total:
         st.info("No assessments yet.")
         return
 
-    df = pd.DataFrame(
-        rows,
-        columns=["Condition", "Result", "Confidence (%)", "Date"]
+    render_prediction_history(
+        username,
+        key="patient_profile_history",
+        columns=["Condition", "Result", "Confidence (%)", "Date"],
     )
 
-    st.dataframe(df, use_container_width=True)
-
     st.warning(
         "⚠️ AI-assisted decision support only. Not a medical record."
     )
@@ -2155,11 +2348,10 @@ def doctor_profile_view():
     st.header("👨‍⚕️ Doctor Dashboard")
 
     users = fetch_all_users()
-    predictions = fetch_all_predictions()
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Registered Patients", len(users))
-    col2.metric("Total Assessments", len(predictions))
+    col2.metric("Total Assessments", count_predictions())
     col3.metric("Role", st.session_state.role.capitalize())
 
     st.markdown("---")
@@ -2183,13 +2375,13 @@ def doctor_profile_view():
 # -----------------------------
 def selected_patient_profile():
     patient = st.session_state.selected_patient
-    rows = fetch_predictions(patient)
 
     st.header(f"🧾 Patient Record: {patient}")
-    st.dataframe(pd.DataFrame(
-        rows,
-        columns=["Condition", "Result", "Confidence", "Date"]
-    ))
+    render_prediction_history(
+        patient,
+        key=f"patient_record_{patient}",
+        columns=["Condition", "Result", "Confidence", "Date"],
+    )
 
 # -----------------------------
 # SETTINGS PAGE
@@ -2670,23 +2862,28 @@ def admin_page():
 
     # ================= PREDICTIONS =================
     st.subheader("📊 All Predictions")
-    records = fetch_all_predictions()
 
-    if records:
-        df = pd.DataFrame(
-            records,
-            columns=["User", "Condition", "Result", "Confidence (%)", "Date"]
+    if count_predictions() > 0:
+        render_prediction_history(
+            None,
+            key="admin_history",
+            columns=["User", "Condition", "Result", "Confidence (%)", "Date"],
         )
-        st.dataframe(df, use_container_width=True)
 
         st.subheader("📈 Analytics")
         col1, col2 = st.columns(2)
 
         with col1:
-            st.bar_chart(df["Condition"].value_counts())
+            st.bar_chart(condition_counts_frame(None)["Count"])
 
         with col2:
-            st.bar_chart(df["User"].value_counts())
+            df_users_count = pd.DataFrame(user_counts(limit=50), columns=["User", "Count"])
+            st.bar_chart(df_users_count.set_index("User")["Count"])
+
+        st.markdown("**Platform Confidence Trend**")
+        st.line_chart(
+            daily_confidence_frame(None)[["Daily Avg (%)", "7-Day Avg (%)"]]
+        )
     else:
         st.info("No prediction records available.")
 
@@ -2706,6 +2903,41 @@ def admin_page():
     else:
         st.info("No support messages received yet.")
 
+    st.markdown("---")
+
+    # ================= DIAGNOSTICS =================
+    st.subheader("🩺 System Diagnostics")
+
+    st.markdown("**Deferred imports (this process)**")
+    st.dataframe(pd.DataFrame(import_report()), use_container_width=True)
+
+    st.markdown("**Model registry**")
+    st.dataframe(pd.DataFrame(models.status()), use_container_width=True)
+
+    st.markdown("**X-ray inference** (second-stage calls saved in fused mode)")
+    st.json(get_xray_engine().stats())
+
+    st.markdown("**Inference workers** (queue depth, utilisation, per-job latency)")
+    pool_stats = get_inference_pool().stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Workers ready", f"{pool_stats['workers_ready']}/{pool_stats['workers']}" if pool_stats["workers"] else "inline")
+    c2.metric("Queue depth", pool_stats["queue_depth"])
+    c3.metric("Latency p50", f"{pool_stats['latency_ms_p50']} ms" if pool_stats["latency_ms_p50"] is not None else "-")
+    c4.metric("Latency p95", f"{pool_stats['latency_ms_p95']} ms" if pool_stats["latency_ms_p95"] is not None else "-")
+    st.json(pool_stats)
+
+    st.markdown("**Cold import profile** (`python -X importtime`, fresh interpreter)")
+    if st.button("⏱️ Profile heavy imports"):
+        with st.spinner("Importing each library in a fresh interpreter..."):
+            profile = profile_cold_imports(HEAVY_MODULES, top=10)
+        df_prof = pd.DataFrame(profile)
+        if not df_prof.empty:
+            df_prof["cumulative_ms"] = df_prof["cumulative_us"] / 1000.0
+            st.bar_chart(
+                df_prof[df_prof["module"] == df_prof["requested"]].set_index("requested")["cumulative_ms"]
+            )
+        st.dataframe(df_prof, use_container_width=True)
+
 
 # -----------------------------
 # Page Routing
@@ -2754,17 +2986,24 @@ elif current_page == "Admin" and st.session_state.role == "admin":
 
 
 st.divider()
-st.subheader("📊 X-Ray Analysis History")
+st.subheader("🕒 Recent Activity")
 
-history = fetch_predictions()
+# Doctors/admins see the latest platform-wide activity, patients their own
+if st.session_state.get("role") in ["doctor", "admin"]:
+    recent = fetch_recent_activity(None)
+    recent_columns = ["User", "Condition", "Result", "Confidence (%)", "Date"]
+else:
+    recent = fetch_recent_activity(st.session_state.user)
+    recent_columns = ["Condition", "Result", "Confidence (%)", "Date"]
 
-if history:
-    for row in history:
-        st.write(
-            f"🩻 {row[1]} | Severity: {row[2]} | Confidence: {row[3]} | ⏰ {row[4]}"
-        )
+if recent:
+    st.dataframe(
+        pd.DataFrame(recent, columns=recent_columns),
+        use_container_width=True,
+        hide_index=True,
+    )
 else:
-    st.info("No X-ray analyses recorded yet.")
+    st.info("No analyses recorded yet.")
 
 # -----------------------------
 # Footer (website-style)
@@ -2785,3 +3024,6 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+flush_pending_audio()
+flush_pending_summaries()
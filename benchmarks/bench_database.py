@@ -0,0 +1,130 @@
+"""
+Concurrent-session benchmark for utils/database.py.
+
+Simulates N Streamlit sessions (threads) that each insert predictions and
+read their own history, and compares the pooled/WAL connection manager
+with the old connect-per-call pattern.
+
+    python benchmarks/bench_database.py --sessions 8 --ops 200
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import database
+
+
+# -----------------------------
+# Legacy pattern (baseline)
+# -----------------------------
+def legacy_insert(path, username):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(
+        "INSERT INTO predictions (username, condition, result, confidence, summary, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (username, "Diabetes", "Pre-Diabetic", 42.0, "bench",
+         datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    )
+    conn.commit()
+    conn.close()
+
+def legacy_fetch(path, username):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    rows = conn.execute(
+        "SELECT condition, result, confidence, created_at FROM predictions "
+        "WHERE username = ? ORDER BY created_at DESC",
+        (username,),
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+def run(mode, sessions, ops):
+    tmp_dir = tempfile.mkdtemp(prefix="lifelen-bench-")
+    path = os.path.join(tmp_dir, "bench.db")
+
+    database.DB_PATH = path
+    database.create_table()
+    database.close_connection()
+    if mode == "legacy":
+        # The old code never enabled WAL; reset to the default rollback journal
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+    insert_times, read_times, errors = [], [], []
+    lock = threading.Lock()
+
+    def session(idx):
+        username = f"bench_user_{idx}"
+        ins, rd = [], []
+        try:
+            for _ in range(ops):
+                t0 = time.perf_counter()
+                if mode == "legacy":
+                    legacy_insert(path, username)
+                else:
+                    database.insert_prediction(username, "Diabetes", "Pre-Diabetic", 42.0, "bench")
+                t1 = time.perf_counter()
+                if mode == "legacy":
+                    legacy_fetch(path, username)
+                else:
+                    database.fetch_predictions(username)
+                t2 = time.perf_counter()
+                ins.append(t1 - t0)
+                rd.append(t2 - t1)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        finally:
+            database.close_connection()
+        with lock:
+            insert_times.extend(ins)
+            read_times.extend(rd)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    def p99(xs):
+        return statistics.quantiles(xs, n=100)[98] * 1000.0 if len(xs) >= 2 else float("nan")
+
+    return {
+        "mode": mode,
+        "inserts_per_sec": len(insert_times) / wall if wall else 0.0,
+        "insert_p99_ms": p99(insert_times),
+        "read_p99_ms": p99(read_times),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.ops} insert+read ops")
+    print(f"{'mode':<8} {'inserts/s':>10} {'insert p99':>11} {'read p99':>10} {'errors':>7}")
+    for mode in ("legacy", "pooled"):
+        r = run(mode, args.sessions, args.ops)
+        print(f"{r['mode']:<8} {r['inserts_per_sec']:>10.0f} {r['insert_p99_ms']:>9.2f}ms "
+              f"{r['read_p99_ms']:>8.2f}ms {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Folder loading benchmark for src/preprocessing.load_images_from_folder.
+
+Times the loader at several decode-thread counts on a real dataset folder
+(--data) or a synthetic one (NORMAL/ and PNEUMONIA/ JPEGs, plus one
+corrupt file), and checks every run returns the same array as workers=1.
+
+    python benchmarks/bench_load_images.py --workers 1 2 4 8 16 32
+    python benchmarks/bench_load_images.py --data "data/chest x-ray/train" --repeat 1
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.preprocessing import load_images_from_folder
+
+
+def synthetic_folder(root, count, size, seed=0):
+    rng = np.random.default_rng(seed)
+    for label in ("NORMAL", "PNEUMONIA"):
+        os.makedirs(os.path.join(root, label), exist_ok=True)
+    for i in range(count):
+        img = cv2.GaussianBlur(rng.integers(0, 256, (size, size), dtype=np.uint8), (9, 9), 0)
+        label = "NORMAL" if i % 2 else "PNEUMONIA"
+        cv2.imwrite(os.path.join(root, label, f"{i:05d}.jpeg"), img)
+    with open(os.path.join(root, "NORMAL", "corrupt.jpeg"), "wb") as f:
+        f.write(b"not an image")
+    return root
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", help="folder with one sub-folder per label (default: synthetic)")
+    parser.add_argument("--count", type=int, default=400, help="synthetic images")
+    parser.add_argument("--size", type=int, default=1024, help="synthetic image side")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dtype", choices=["float64", "float32", "uint8"], default="float64")
+    args = parser.parse_args()
+
+    tmp = None
+    data = args.data
+    if not data:
+        tmp = tempfile.mkdtemp(prefix="bench_load_")
+        data = synthetic_folder(tmp, args.count, args.size)
+
+    try:
+        dtype = np.dtype(args.dtype)
+        reference = None
+        print(f"{'workers':>7} {'median':>9} {'img/s':>8} {'speedup':>8} {'skipped':>8} {'same':>5}")
+        base = None
+        for workers in args.workers:
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                images, labels, summary = load_images_from_folder(
+                    data, workers=workers, dtype=dtype, return_summary=True
+                )
+                times.append(time.perf_counter() - t0)
+            if reference is None:
+                reference = (images, labels)
+            same = np.array_equal(images, reference[0]) and np.array_equal(labels, reference[1])
+            med = statistics.median(times)
+            base = base or med
+            print(f"{workers:>7} {med:>8.2f}s {summary['loaded'] / med:>8.1f} {base / med:>7.2f}x "
+                  f"{len(summary['skipped']):>8} {'yes' if same else 'NO':>5}")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
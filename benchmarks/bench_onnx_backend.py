@@ -0,0 +1,93 @@
+"""
+Parity and latency benchmark: native frameworks vs ONNX Runtime.
+
+For each X-ray model with both a native file and an ONNX export
+(models/export_onnx.py), measures load + first-call time, warm per-batch
+latency and the largest output difference on random inputs.
+
+    python benchmarks/bench_onnx_backend.py --batch 1 8 --iters 30 --intra-op 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model_registry import MODELS_DIR, XRAY_MODEL_FILES, OnnxModel, onnx_path
+
+INPUT_SHAPES = {
+    "xray": (224, 224, 1),
+    "xray_detector": (3, 224, 224),
+}
+
+
+def native_runner(name, model):
+    if name == "xray":
+        return lambda x: np.asarray(model.predict(x, verbose=0))
+
+    import torch
+    def run(x):
+        with torch.no_grad():
+            return model(torch.from_numpy(x)).numpy()
+    return run
+
+def cold_start(load, shape):
+    """Seconds to load the model and answer the first request."""
+    t0 = time.perf_counter()
+    run = load()
+    run(np.zeros((1,) + shape, dtype=np.float32))
+    return run, time.perf_counter() - t0
+
+def latency_ms(run, x, iters):
+    run(x)
+    times = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        run(x)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--iters", type=int, default=30)
+    parser.add_argument("--intra-op", type=int, default=0, help="ONNX Runtime intra-op threads (0 = auto)")
+    parser.add_argument("--inter-op", type=int, default=0, help="ONNX Runtime inter-op threads (0 = auto)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'model':<14} {'backend':<7} {'cold start':>10} "
+          + " ".join(f"{f'b={b}':>9}" for b in args.batch) + f" {'max |diff|':>11}")
+
+    for name, (filename, loader) in XRAY_MODEL_FILES.items():
+        native_file = os.path.join(args.models_dir, filename)
+        onnx_file = onnx_path(native_file)
+        if not (os.path.exists(native_file) and os.path.exists(onnx_file)):
+            print(f"{name:<14} skipped (needs {filename} and {os.path.basename(onnx_file)})")
+            continue
+
+        shape = INPUT_SHAPES[name]
+        runners = {
+            "native": cold_start(lambda: native_runner(name, loader(native_file)), shape),
+            "onnx": cold_start(
+                lambda: OnnxModel(onnx_file, args.intra_op, args.inter_op).predict, shape
+            ),
+        }
+
+        x_check = rng.random((4,) + shape, dtype=np.float32)
+        diff = np.abs(runners["native"][0](x_check) - runners["onnx"][0](x_check)).max()
+
+        for backend, (run, cold) in runners.items():
+            lat = [latency_ms(run, rng.random((b,) + shape, dtype=np.float32), args.iters)
+                   for b in args.batch]
+            print(f"{name:<14} {backend:<7} {cold:>9.2f}s "
+                  + " ".join(f"{ms:>7.2f}ms" for ms in lat)
+                  + (f" {diff:>11.2e}" if backend == "onnx" else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Per-image X-ray preprocessing benchmark for utils/image_pipeline.py.
+
+Compares the previous path (two conversions from a full-size BGR decode,
+float64 division, and NumPy -> PIL -> Tensor for the detector) with the
+shared pipeline, on synthetic PNGs. Reports median/p95 latency, peak
+traced allocations and the largest difference between the outputs.
+
+    python benchmarks/bench_xray_preprocess.py --size 2048 --iters 50 --batch 8
+
+--images DIR runs a parity check on real files instead (recursively, any
+mix of X-rays and other photos): the classifier input must match the old
+path exactly, and when the detector weights are present every image's
+NON_XRAY probability and X-ray/not-X-ray decision is compared.
+
+    python benchmarks/bench_xray_preprocess.py --images "data/chest x-ray/test"
+
+Allocation numbers come from tracemalloc, which sees NumPy and PIL
+buffers but not OpenCV's internal ones; torch tensors are not traced.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.image_pipeline import decode_image, prepare_xray, prepare_xray_batch
+
+
+# -----------------------------
+# Previous path (baseline)
+# -----------------------------
+def legacy_transforms():
+    try:
+        from torchvision import transforms
+    except ImportError:
+        return None
+    return transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ])
+
+def legacy_preprocess(data, tfms):
+    img_bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    det = None
+    if tfms is not None:
+        det = tfms(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)).numpy()
+    img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    resized = cv2.resize(img_gray, (224, 224)) / 255.0
+    cls = np.expand_dims(resized, -1).astype(np.float32)
+    return cls, det
+
+def shared_preprocess(data, detector):
+    return prepare_xray(decode_image(data), detector=detector)
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+def synthetic_png(size, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size]
+    img = (127 + 80 * np.sin(x / 37.0) * np.cos(y / 53.0) + rng.normal(0, 12, (size, size)))
+    ok, buf = cv2.imencode(".png", np.clip(img, 0, 255).astype(np.uint8))
+    return buf.tobytes()
+
+def measure(fn, iters):
+    fn()  # warm-up
+    times = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        "median_ms": statistics.median(times) * 1000.0,
+        "p95_ms": times[int(0.95 * (len(times) - 1))] * 1000.0,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+# -----------------------------
+# Parity on real images
+# -----------------------------
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+
+def list_images(root):
+    return sorted(
+        os.path.join(d, f) for d, _, files in os.walk(root) for f in files
+        if f.lower().endswith(IMAGE_EXTS)
+    )
+
+def parity_check(root, limit=None):
+    """Returns False if any classifier input differs or a detector decision flips."""
+    from utils.model_registry import registry
+    from utils.xray_inference import NON_XRAY_IDX, NON_XRAY_THRESHOLD, detector_fn_from
+
+    tfms = legacy_transforms()
+    if tfms is None:
+        print("torchvision not installed: checking the classifier input only")
+    detector = registry["xray_detector"] if tfms is not None else None
+    detect = detector_fn_from(detector) if detector is not None else None
+    if tfms is not None and detect is None:
+        print("Detector weights not found: comparing detector inputs only")
+
+    paths = list_images(root)[:limit]
+    cls_diff, det_diff, prob_diff, flips = 0.0, [], [], []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        old_cls, old_det = legacy_preprocess(data, tfms)
+        new_cls, new_det = shared_preprocess(data, tfms is not None)
+        cls_diff = max(cls_diff, float(np.abs(old_cls - new_cls).max()))
+        if tfms is None:
+            continue
+        det_diff.append(float(np.abs(old_det - new_det).max()))
+        if detect is not None:
+            old_p, new_p = detect(np.stack([old_det, new_det]).astype(np.float32))[:, NON_XRAY_IDX]
+            prob_diff.append(abs(float(old_p) - float(new_p)))
+            if (old_p >= NON_XRAY_THRESHOLD) != (new_p >= NON_XRAY_THRESHOLD):
+                flips.append((path, float(old_p), float(new_p)))
+
+    print(f"{len(paths)} images under {root}")
+    print(f"max |diff| classifier: {cls_diff:.2e} ({'identical' if cls_diff == 0 else 'DIFFERS'})")
+    if det_diff:
+        print(f"detector input |diff|: median {statistics.median(det_diff):.4f}, "
+              f"max {max(det_diff):.4f} (normalized units)")
+    if prob_diff:
+        print(f"P(NON_XRAY) |diff|: median {statistics.median(prob_diff):.2e}, max {max(prob_diff):.2e}; "
+              f"{len(flips)} decision(s) flipped at threshold {NON_XRAY_THRESHOLD}")
+        for path, old_p, new_p in flips:
+            print(f"  {path}: {old_p:.3f} -> {new_p:.3f}")
+    return cls_diff == 0 and not flips
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=2048, help="synthetic image side in pixels")
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--images", help="folder of real images for the parity check")
+    parser.add_argument("--limit", type=int, default=None, help="max images for --images")
+    args = parser.parse_args()
+
+    if args.images:
+        sys.exit(0 if parity_check(args.images, args.limit) else 1)
+
+    data = synthetic_png(args.size)
+    tfms = legacy_transforms()
+    detector = tfms is not None
+    if not detector:
+        print("torchvision not installed: comparing the classifier input only")
+
+    rows = [
+        ("legacy", measure(lambda: legacy_preprocess(data, tfms), args.iters)),
+        ("shared", measure(lambda: shared_preprocess(data, detector), args.iters)),
+    ]
+
+    batch_data = [synthetic_png(args.size, seed=i) for i in range(args.batch)]
+    per_image = measure(
+        lambda: prepare_xray_batch([decode_image(d) for d in batch_data], detector=detector),
+        max(1, args.iters // args.batch),
+    )
+    rows.append((f"batch{args.batch}", {k: v / args.batch if k != "peak_mb" else v
+                                        for k, v in per_image.items()}))
+
+    print(f"{args.size}x{args.size} grayscale PNG, {args.iters} iterations")
+    print(f"{'path':<8} {'median':>9} {'p95':>9} {'peak alloc':>11}")
+    for name, r in rows:
+        print(f"{name:<8} {r['median_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['peak_mb']:>9.2f}MB")
+
+    old_cls, old_det = legacy_preprocess(data, tfms)
+    new_cls, new_det = shared_preprocess(data, detector)
+    print(f"max |diff| classifier: {np.abs(old_cls - new_cls).max():.4f}")
+    if detector:
+        print(f"max |diff| detector:   {np.abs(old_det - new_det).max():.4f} (normalized units)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,230 @@
+"""
+Evaluate the chest X-ray classifier on a held-out folder.
+
+Streams the test set (NORMAL/ and PNEUMONIA/ sub-folders) in batches from
+the memory-mapped dataset store (src/preprocessing.py compile), runs each
+model once per batch and derives every metric from the cached scores:
+log loss, accuracy, ROC AUC, confusion matrix, classification report and
+calibration (reliability bins + ECE). Per-batch latency and throughput
+are recorded too. Writes metrics.json and PNG plots to --out-dir; a
+second artefact (--compare) is scored on the same batches side by side.
+
+    python models/evaluate_chest_model.py --data "data/chest x-ray/test"
+    python models/evaluate_chest_model.py --model models/chest_xray_model.h5 \\
+        --compare models/chest_xray_model.int8.onnx --out-dir reports/xray_eval
+"""
+import argparse
+import json
 import os
+import sys
+import time
+
 import numpy as np
-import tensorflow as tf
-from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-from src.preprocessing import load_images_from_folder, split_data
-
-# === Load data again for evaluation ===
-data_path = "data/chest x-ray/train/"   # path to your X-ray dataset
-images, labels = load_images_from_folder(data_path)
-X_train, X_test, y_train, y_test = split_data(images, labels)
-
-# Reshape for CNN
-X_test = np.expand_dims(X_test, axis=-1)
-
-# === Load trained model ===
-model_path = "models/chest_xray_model.h5"
-if not os.path.exists(model_path):
-    raise FileNotFoundError(f"Model file not found at {model_path}")
-
-model = tf.keras.models.load_model(model_path)
-
-# === Evaluate the model ===
-test_loss, test_acc = model.evaluate(X_test, tf.keras.utils.to_categorical(y_test))
-print(f"✅ Test Accuracy: {test_acc:.4f}")
-print(f"✅ Test Loss: {test_loss:.4f}")
-
-# === Predictions ===
-predictions = model.predict(X_test)
-pred_labels = np.argmax(predictions, axis=1)
-true_labels = np.argmax(tf.keras.utils.to_categorical(y_test), axis=1)
-
-# === Print metrics ===
-print("\nClassification Report:")
-print(classification_report(true_labels, pred_labels))
-
-# === Confusion Matrix ===
-cm = confusion_matrix(true_labels, pred_labels)
-plt.imshow(cm, cmap='Blues')
-plt.title('Confusion Matrix')
-plt.xlabel('Predicted Labels')
-plt.ylabel('True Labels')
-plt.colorbar()
-plt.show()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from src.preprocessing import load_compiled
+from utils.model_registry import MODELS_DIR, XRAY_MODEL_FILES, load_onnx
+from utils.xray_inference import classifier_fn_from
+
+POSITIVE_LABEL = "PNEUMONIA"
+CLASS_NAMES = ["NORMAL", "PNEUMONIA"]
+DEFAULT_MODEL = os.path.join(MODELS_DIR, XRAY_MODEL_FILES["xray"][0])
+
+
+# -----------------------------
+# Inference (once per model)
+# -----------------------------
+def load_artefact(path):
+    """Keras .h5 or ONNX (fp32 / int8) file -> batch scorer."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model file not found at {path}")
+    model = load_onnx(path) if path.endswith(".onnx") else XRAY_MODEL_FILES["xray"][1](path)
+    return classifier_fn_from(model)
+
+def score_dataset(dataset, scorers, batch_size):
+    """
+    One pass over the dataset; every model sees each batch as it streams by.
+    Returns (labels, {name: scores}, {name: per-batch seconds}).
+    """
+    labels, scores = [], {name: [] for name in scorers}
+    batch_seconds = {name: [] for name in scorers}
+
+    for x, y in dataset.batches(batch_size):
+        x = x[..., np.newaxis]
+        for name, score in scorers.items():
+            t0 = time.perf_counter()
+            scores[name].append(np.asarray(score(x), dtype=np.float64))
+            batch_seconds[name].append(time.perf_counter() - t0)
+        labels.append((y == POSITIVE_LABEL).astype(int))
+        done = sum(len(l) for l in labels)
+        print(f"\r{done}/{len(dataset)} images", end="", flush=True)
+    print()
+
+    return (np.concatenate(labels),
+            {name: np.concatenate(s) for name, s in scores.items()},
+            batch_seconds)
+
+
+# -----------------------------
+# Metrics (from cached scores)
+# -----------------------------
+def calibration(labels, scores, bins=10):
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    idx = np.clip(np.digitize(scores, edges[1:-1]), 0, bins - 1)
+    rows, ece = [], 0.0
+    for b in range(bins):
+        mask = idx == b
+        if not mask.any():
+            continue
+        conf, acc = float(scores[mask].mean()), float(labels[mask].mean())
+        ece += mask.mean() * abs(conf - acc)
+        rows.append({"bin": [float(edges[b]), float(edges[b + 1])], "count": int(mask.sum()),
+                     "mean_score": conf, "positive_rate": acc})
+    return rows, float(ece)
+
+def compute_metrics(labels, scores, batch_seconds, batch_size, threshold=0.5):
+    from sklearn.metrics import classification_report, confusion_matrix, log_loss, roc_auc_score
+
+    preds = (scores > threshold).astype(int)
+    bins, ece = calibration(labels, scores)
+    per_batch_ms = np.array(batch_seconds) * 1000.0
+    both_classes = len(set(labels)) > 1
+
+    return {
+        "images": int(len(labels)),
+        "threshold": threshold,
+        "loss": float(log_loss(labels, np.clip(scores, 1e-7, 1 - 1e-7), labels=[0, 1])),
+        "accuracy": float((preds == labels).mean()),
+        "auc": float(roc_auc_score(labels, scores)) if both_classes else None,
+        "confusion_matrix": confusion_matrix(labels, preds, labels=[0, 1]).tolist(),
+        "report": classification_report(labels, preds, labels=[0, 1], target_names=CLASS_NAMES,
+                                         output_dict=True, zero_division=0),
+        "calibration": {"ece": ece, "bins": bins},
+        "latency": {
+            "batch_size": batch_size,
+            "batch_ms_p50": float(np.percentile(per_batch_ms, 50)),
+            "batch_ms_p95": float(np.percentile(per_batch_ms, 95)),
+            "images_per_sec": float(len(labels) / max(sum(batch_seconds), 1e-9)),
+        },
+    }
+
+
+# -----------------------------
+# Plots (PNG files, no window)
+# -----------------------------
+def save_plots(out_dir, labels, scores, metrics):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import roc_curve
+
+    paths = {}
+
+    fig, axes = plt.subplots(1, len(metrics), figsize=(4.5 * len(metrics), 4), squeeze=False)
+    for ax, (name, m) in zip(axes[0], metrics.items()):
+        cm = np.array(m["confusion_matrix"])
+        ax.imshow(cm, cmap="Blues")
+        for (i, j), v in np.ndenumerate(cm):
+            ax.text(j, i, str(v), ha="center", va="center")
+        ax.set_xticks([0, 1], CLASS_NAMES)
+        ax.set_yticks([0, 1], CLASS_NAMES)
+        ax.set_title(f"Confusion Matrix\n{name}", fontsize=9)
+        ax.set_xlabel("Predicted Labels")
+        ax.set_ylabel("True Labels")
+    paths["confusion_matrix"] = os.path.join(out_dir, "confusion_matrix.png")
+    fig.tight_layout()
+    fig.savefig(paths["confusion_matrix"], dpi=120)
+    plt.close(fig)
+
+    if len(set(labels)) > 1:
+        fig, ax = plt.subplots(figsize=(4.5, 4))
+        for name, s in scores.items():
+            fpr, tpr, _ = roc_curve(labels, s)
+            ax.plot(fpr, tpr, label=f"{name} (AUC {metrics[name]['auc']:.3f})")
+        ax.plot([0, 1], [0, 1], "k--", linewidth=0.8)
+        ax.set_xlabel("False positive rate")
+        ax.set_ylabel("True positive rate")
+        ax.set_title("ROC")
+        ax.legend(fontsize=8)
+        paths["roc"] = os.path.join(out_dir, "roc.png")
+        fig.tight_layout()
+        fig.savefig(paths["roc"], dpi=120)
+        plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=(4.5, 4))
+    for name, m in metrics.items():
+        bins = m["calibration"]["bins"]
+        ax.plot([b["mean_score"] for b in bins], [b["positive_rate"] for b in bins], "o-",
+                label=f"{name} (ECE {m['calibration']['ece']:.3f})")
+    ax.plot([0, 1], [0, 1], "k--", linewidth=0.8)
+    ax.set_xlabel("Mean predicted P(pneumonia)")
+    ax.set_ylabel("Observed pneumonia rate")
+    ax.set_title("Reliability")
+    ax.legend(fontsize=8)
+    paths["calibration"] = os.path.join(out_dir, "calibration.png")
+    fig.tight_layout()
+    fig.savefig(paths["calibration"], dpi=120)
+    plt.close(fig)
+
+    return paths
+
+def print_table(metrics):
+    print(f"{'model':<28} {'loss':>7} {'acc':>7} {'auc':>7} {'ece':>7} {'p50 ms':>8} {'img/s':>8}")
+    for name, m in metrics.items():
+        auc = f"{m['auc']:.4f}" if m["auc"] is not None else "-"
+        print(f"{name:<28} {m['loss']:>7.4f} {m['accuracy']:>7.4f} {auc:>7} "
+              f"{m['calibration']['ece']:>7.4f} {m['latency']['batch_ms_p50']:>8.1f} "
+              f"{m['latency']['images_per_sec']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", default="data/chest x-ray/test", help="folder with NORMAL/ and PNEUMONIA/")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=".h5 or .onnx classifier")
+    parser.add_argument("--compare", help="second artefact scored on the same batches")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--out-dir", default="reports/chest_eval")
+    args = parser.parse_args()
+
+    dataset = load_compiled(args.data)
+    print(f"{len(dataset)} images from {args.data}")
+
+    artefacts = [args.model] + ([args.compare] if args.compare else [])
+    # Keyed by role as well as file, so --compare with the same file (a
+    # determinism check) still gets two entries
+    names = [os.path.basename(artefacts[0])]
+    if args.compare:
+        names = [f"model:{names[0]}", f"compare:{os.path.basename(args.compare)}"]
+    scorers = {name: load_artefact(path) for name, path in zip(names, artefacts)}
+    for score in scorers.values():
+        score(np.zeros((1,) + dataset.shape[1:] + (1,), dtype=np.float32))  # warm-up, not timed
+
+    labels, scores, batch_seconds = score_dataset(dataset, scorers, args.batch_size)
+    metrics = {
+        name: compute_metrics(labels, scores[name], batch_seconds[name], args.batch_size, args.threshold)
+        for name in scorers
+    }
+    print_table(metrics)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    plots = save_plots(args.out_dir, labels, scores, metrics)
+    comparison = None
+    if len(scores) > 1:
+        a, b = names
+        comparison = {
+            "agreement": float(((scores[a] > args.threshold) == (scores[b] > args.threshold)).mean()),
+            "max_score_diff": float(np.abs(scores[a] - scores[b]).max()),
+        }
+        print(f"Agreement {comparison['agreement']:.4f}, max |score diff| {comparison['max_score_diff']:.2e}")
+
+    out = os.path.join(args.out_dir, "metrics.json")
+    with open(out, "w") as f:
+        json.dump({"data": args.data, "models": dict(zip(names, artefacts)),
+                   "metrics": metrics, "comparison": comparison, "plots": plots}, f, indent=2)
+    print(f"Saved {out} and {len(plots)} plot(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Check that fused X-ray inference matches the two-model cascade.
+
+Runs the ResNet detector and the Keras classifier on every image of a
+held-out folder (sub-folders NORMAL/ and PNEUMONIA/), then replays the
+fused decision for each confidence threshold and reports accuracy,
+agreement with the cascade and the share of Keras calls saved.
+
+    python models/evaluate_fused_xray.py --data "data/chest x-ray/test" \\
+        --thresholds 0.8 0.9 0.95 --out fused_eval.json
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.image_pipeline import decode_image, prepare_xray_batch
+from utils.model_registry import registry
+from utils.xray_inference import (
+    NON_XRAY_IDX, NON_XRAY_THRESHOLD,
+    classifier_fn_from, detector_fn_from, fused_pneumonia_prob,
+)
+
+CLASSES = ["NORMAL", "PNEUMONIA"]
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+
+
+def list_images(data_dir):
+    paths, labels = [], []
+    for label, name in enumerate(CLASSES):
+        folder = os.path.join(data_dir, name)
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"Missing class folder: {folder}")
+        for fname in sorted(os.listdir(folder)):
+            if fname.lower().endswith(IMAGE_EXTS):
+                paths.append(os.path.join(folder, fname))
+                labels.append(label)
+    return paths, np.array(labels)
+
+def run_models(paths, batch_size):
+    """Detector softmax rows and Keras pneumonia probabilities for every image."""
+    detector = registry["xray_detector"]
+    classifier = registry["xray"]
+    if detector is None or classifier is None:
+        raise RuntimeError("Both models/xray_detector_best.pth and models/chest_xray_model.h5 are required")
+    detect, classify = detector_fn_from(detector), classifier_fn_from(classifier)
+
+    det_probs, cls_probs = [], []
+    for start in range(0, len(paths), batch_size):
+        images = []
+        for path in paths[start:start + batch_size]:
+            with open(path, "rb") as f:
+                img = decode_image(f.read())
+            if img is None:
+                raise ValueError(f"Cannot decode {path}")
+            images.append(img)
+        cls_batch, det_batch = prepare_xray_batch(images)
+        det_probs.append(detect(det_batch))
+        cls_probs.append(classify(cls_batch))
+        print(f"\r{min(start + batch_size, len(paths))}/{len(paths)} images", end="", flush=True)
+    print()
+    return np.concatenate(det_probs), np.concatenate(cls_probs)
+
+def evaluate(labels, det_probs, cls_probs, thresholds):
+    cascade_pred = (cls_probs > 0.5).astype(int)
+    fused = fused_pneumonia_prob(det_probs)
+    is_xray = det_probs[:, NON_XRAY_IDX] < NON_XRAY_THRESHOLD
+
+    rows = [{
+        "mode": "cascade",
+        "threshold": None,
+        "accuracy": float((cascade_pred == labels).mean()),
+        "agreement": 1.0,
+        "keras_calls_saved": 0.0,
+    }]
+    for t in thresholds:
+        confident = (np.maximum(fused, 1.0 - fused) >= t) & is_xray
+        probs = np.where(confident, fused, cls_probs)
+        pred = (probs > 0.5).astype(int)
+        rows.append({
+            "mode": "fused",
+            "threshold": t,
+            "accuracy": float((pred == labels).mean()),
+            "agreement": float((pred == cascade_pred).mean()),
+            "keras_calls_saved": float(confident.mean()),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", required=True, help="folder with NORMAL/ and PNEUMONIA/ sub-folders")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 0.95, 0.99])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--out", help="optional JSON report path")
+    args = parser.parse_args()
+
+    paths, labels = list_images(args.data)
+    print(f"{len(paths)} images ({int((labels == 1).sum())} pneumonia)")
+    det_probs, cls_probs = run_models(paths, args.batch_size)
+    rows = evaluate(labels, det_probs, cls_probs, args.thresholds)
+
+    print(f"{'mode':<8} {'threshold':>9} {'accuracy':>9} {'agree':>7} {'saved':>7}")
+    for r in rows:
+        t = "-" if r["threshold"] is None else f"{r['threshold']:.2f}"
+        print(f"{r['mode']:<8} {t:>9} {r['accuracy']:>9.4f} {r['agreement']:>7.4f} "
+              f"{r['keras_calls_saved']:>7.1%}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"data": args.data, "images": len(paths), "results": rows}, f, indent=2)
+        print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Export the X-ray models to ONNX for the ONNX Runtime backend.
+
+Writes models/chest_xray_model.onnx (from the Keras .h5, via tf2onnx) and
+models/xray_detector_best.onnx (from the ResNet18 state dict, via
+torch.onnx), both with a dynamic batch dimension, and checks each export
+against the native model on random inputs.
+
+    python models/export_onnx.py               # both models
+    python models/export_onnx.py --only detector --opset 17
+
+Serve them with LIFELEN_MODEL_BACKEND=onnx. Needs the optional packages
+in requirements-onnx.txt.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model_registry import (
+    MODELS_DIR, XRAY_MODEL_FILES, OnnxModel, load_keras, load_resnet_detector, onnx_path,
+)
+
+XRAY_INPUT = (224, 224, 1)
+DETECTOR_INPUT = (3, 224, 224)
+
+
+def export_keras(src, dst, opset):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = load_keras(src)
+    spec = (tf.TensorSpec((None,) + XRAY_INPUT, tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=dst)
+    return lambda batch: np.asarray(model.predict(batch, verbose=0))
+
+def export_detector(src, dst, opset):
+    import torch
+
+    model = load_resnet_detector(src)
+    dummy = torch.zeros((1,) + DETECTOR_INPUT, dtype=torch.float32)
+    torch.onnx.export(
+        model, dummy, dst,
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+
+    def native(batch):
+        with torch.no_grad():
+            return model(torch.from_numpy(batch)).numpy()
+    return native
+
+EXPORTERS = {
+    "xray": (export_keras, XRAY_INPUT),
+    "detector": (export_detector, DETECTOR_INPUT),
+}
+
+def check_parity(native, dst, input_shape, batch=4, seed=0):
+    x = np.random.default_rng(seed).random((batch,) + input_shape, dtype=np.float32)
+    diff = np.abs(native(x) - OnnxModel(dst).predict(x)).max()
+    return float(diff)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", choices=sorted(EXPORTERS), help="export a single model")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--atol", type=float, default=1e-4, help="max allowed |native - onnx|")
+    args = parser.parse_args()
+
+    names = {"xray": "xray", "detector": "xray_detector"}
+    failed = False
+    for key in [args.only] if args.only else sorted(EXPORTERS):
+        exporter, input_shape = EXPORTERS[key]
+        src = os.path.join(MODELS_DIR, XRAY_MODEL_FILES[names[key]][0])
+        dst = onnx_path(src)
+        if not os.path.exists(src):
+            print(f"{key}: {src} not found, skipped")
+            continue
+
+        native = exporter(src, dst, args.opset)
+        diff = check_parity(native, dst, input_shape)
+        ok = diff <= args.atol
+        failed |= not ok
+        size_mb = os.path.getsize(dst) / (1024 * 1024)
+        print(f"{key}: wrote {os.path.basename(dst)} ({size_mb:.1f} MB), "
+              f"max |diff| {diff:.2e} {'OK' if ok else 'ABOVE TOLERANCE'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
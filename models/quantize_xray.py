@@ -0,0 +1,208 @@
+"""
+INT8 post-training quantization of the X-ray models (ONNX Runtime).
+
+Takes the fp32 ONNX exports from models/export_onnx.py and writes
+*.int8.onnx next to them, either with dynamic quantization (weights only,
+no data needed) or static QDQ quantization calibrated on an image folder.
+With --val-dir it also prints a report comparing model size, process
+RSS, per-image latency and accuracy/AUC for native, fp32 ONNX and INT8.
+
+    python models/quantize_xray.py --mode dynamic
+    python models/quantize_xray.py --mode static --calib-dir "data/chest x-ray/val" \\
+        --val-dir "data/chest x-ray/test" --out quantization_report.json
+
+Serve the results with LIFELEN_MODEL_PRECISION=int8. Needs the optional
+packages in requirements-onnx.txt.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from src.preprocessing import load_images_from_folder
+from utils.image_pipeline import IMAGENET_MEAN, IMAGENET_STD
+from utils.model_registry import (
+    MODELS_DIR, XRAY_MODEL_FILES, OnnxModel, int8_path, load_onnx, onnx_path,
+)
+from utils.xray_inference import classifier_fn_from, detector_fn_from, fused_pneumonia_prob
+
+POSITIVE_LABEL = "PNEUMONIA"
+
+
+# -----------------------------
+# Inputs
+# -----------------------------
+def model_inputs(name, gray):
+    """Model input batch from load_images_from_folder() output (N, H, W) in [0, 1]."""
+    gray = gray.astype(np.float32)
+    if name == "xray":
+        return gray[..., np.newaxis]
+    rgb = np.repeat(gray[:, np.newaxis], 3, axis=1)
+    return (rgb - IMAGENET_MEAN[:, None, None]) / IMAGENET_STD[:, None, None]
+
+def load_folder(folder, limit=None):
+    images, labels = load_images_from_folder(folder)
+    if limit:
+        idx = np.random.default_rng(0).permutation(len(images))[:limit]
+        images, labels = images[idx], labels[idx]
+    return images, (labels == POSITIVE_LABEL).astype(int)
+
+
+# -----------------------------
+# Quantization
+# -----------------------------
+class FolderCalibrationReader:
+    """onnxruntime CalibrationDataReader over a folder of X-rays."""
+
+    def __init__(self, name, input_name, folder, limit, batch_size=8):
+        images, _ = load_folder(folder, limit)
+        batch = model_inputs(name, images)
+        self._batches = iter(
+            {input_name: batch[i:i + batch_size]} for i in range(0, len(batch), batch_size)
+        )
+
+    def get_next(self):
+        return next(self._batches, None)
+
+def quantize(name, mode, calib_dir=None, calib_limit=200):
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    native = os.path.join(MODELS_DIR, XRAY_MODEL_FILES[name][0])
+    src, dst = onnx_path(native), int8_path(native)
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"{src} not found; run models/export_onnx.py first")
+
+    if mode == "dynamic":
+        quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    else:
+        if not calib_dir:
+            raise ValueError("--calib-dir is required for static quantization")
+        reader = FolderCalibrationReader(name, OnnxModel(src).input_name, calib_dir, calib_limit)
+        quantize_static(
+            src, dst, reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    return dst
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def scorer(name, model):
+    """Batch -> pneumonia scores, for native or ONNX models alike."""
+    if name == "xray":
+        return classifier_fn_from(model)
+    detect = detector_fn_from(model)
+    return lambda batch: fused_pneumonia_prob(detect(batch))
+
+def load_variant(name, path):
+    if path.endswith(".onnx"):
+        return load_onnx(path)
+    return XRAY_MODEL_FILES[name][1](path)
+
+# Imports only what serving needs, so RSS reflects runtime + weights
+_RSS_PROBE = """
+import resource, sys
+sys.path.insert(0, sys.argv[3])
+import numpy as np
+from utils.model_registry import XRAY_MODEL_FILES, load_onnx
+from utils.xray_inference import classifier_fn_from, detector_fn_from
+name, path = sys.argv[1], sys.argv[2]
+model = load_onnx(path) if path.endswith(".onnx") else XRAY_MODEL_FILES[name][1](path)
+if name == "xray":
+    classifier_fn_from(model)(np.zeros((1, 224, 224, 1), dtype=np.float32))
+else:
+    detector_fn_from(model)(np.zeros((1, 3, 224, 224), dtype=np.float32))
+# VmHWM starts fresh at exec; ru_maxrss would include the forked parent
+try:
+    with open("/proc/self/status") as f:
+        print(next(int(l.split()[1]) for l in f if l.startswith("VmHWM")) / 1024.0)
+except OSError:
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0)
+"""
+
+def rss_mb(name, path):
+    """Peak RSS (MB) of a fresh interpreter that loads `path` and scores one image."""
+    out = subprocess.run(
+        [sys.executable, "-c", _RSS_PROBE, name, path, ROOT],
+        capture_output=True, text=True, timeout=600,
+    )
+    if out.returncode != 0:
+        print(f"RSS probe failed for {os.path.basename(path)}: {out.stderr.strip()[-200:]}")
+        return None
+    return float(out.stdout.strip().splitlines()[-1])
+
+def evaluate(name, path, images, labels, batch_size=16):
+    from sklearn.metrics import roc_auc_score
+
+    score = scorer(name, load_variant(name, path))
+    x = model_inputs(name, images)
+    score(x[:1])  # warm-up
+    scores, started = [], time.perf_counter()
+    for i in range(0, len(x), batch_size):
+        scores.append(np.asarray(score(x[i:i + batch_size])))
+    per_image_ms = (time.perf_counter() - started) * 1000.0 / len(x)
+    scores = np.concatenate(scores)
+
+    return {
+        "model": name,
+        "variant": "int8" if path.endswith(".int8.onnx") else "onnx" if path.endswith(".onnx") else "native",
+        "size_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+        "rss_mb": rss_mb(name, path),
+        "per_image_ms": round(per_image_ms, 2),
+        "accuracy": round(float(((scores > 0.5).astype(int) == labels).mean()), 4),
+        "auc": round(float(roc_auc_score(labels, scores)), 4) if len(set(labels)) > 1 else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", default=list(XRAY_MODEL_FILES), choices=list(XRAY_MODEL_FILES))
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="dynamic")
+    parser.add_argument("--calib-dir", help="image folder (class sub-folders) for static calibration")
+    parser.add_argument("--calib-limit", type=int, default=200)
+    parser.add_argument("--val-dir", help="image folder (class sub-folders) for the report")
+    parser.add_argument("--val-limit", type=int, default=None)
+    parser.add_argument("--out", help="optional JSON report path")
+    args = parser.parse_args()
+
+    for name in args.models:
+        dst = quantize(name, args.mode, args.calib_dir, args.calib_limit)
+        print(f"{name}: wrote {os.path.basename(dst)} ({args.mode})")
+
+    if not args.val_dir:
+        return
+
+    images, labels = load_folder(args.val_dir, args.val_limit)
+    print(f"Validation: {len(images)} images ({int(labels.sum())} {POSITIVE_LABEL.lower()})")
+
+    rows = []
+    for name in args.models:
+        native = os.path.join(MODELS_DIR, XRAY_MODEL_FILES[name][0])
+        for path in (native, onnx_path(native), int8_path(native)):
+            if os.path.exists(path):
+                rows.append(evaluate(name, path, images, labels))
+
+    print(f"{'model':<14} {'variant':<7} {'size':>8} {'rss':>8} {'ms/img':>7} {'acc':>7} {'auc':>7}")
+    for r in rows:
+        rss = f"{r['rss_mb']:.0f}MB" if r["rss_mb"] is not None else "-"
+        auc = f"{r['auc']:.4f}" if r["auc"] is not None else "-"
+        print(f"{r['model']:<14} {r['variant']:<7} {r['size_mb']:>6.1f}MB {rss:>8} "
+              f"{r['per_image_ms']:>7.2f} {r['accuracy']:>7.4f} {auc:>7}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"mode": args.mode, "val_dir": args.val_dir, "results": rows}, f, indent=2)
+        print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
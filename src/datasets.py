@@ -0,0 +1,245 @@
+import os
+import time
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+IMG_SIZE = (224, 224)
+
+# Same statistics as utils/image_pipeline.py, so training matches serving
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# 🔹 DataLoader defaults (override with env vars)
+DATA_WORKERS = int(os.getenv("LIFELEN_DATA_WORKERS", str(min(8, os.cpu_count() or 1))))
+PREFETCH_FACTOR = int(os.getenv("LIFELEN_DATA_PREFETCH", "4"))
+DATA_SEED = int(os.getenv("LIFELEN_DATA_SEED", "0"))
+
+
+# =====================================================
+# INDEX
+# =====================================================
+def index_image_folder(root):
+    """
+    One pass over root/<class>/<image> without decoding anything.
+    Classes and files are sorted, so the index is the same on every run.
+    """
+    classes = sorted(
+        d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))
+    )
+    paths, labels = [], []
+    for label, name in enumerate(classes):
+        folder = os.path.join(root, name)
+        for fname in sorted(os.listdir(folder)):
+            if fname.lower().endswith(IMAGE_EXTS):
+                paths.append(os.path.join(folder, fname))
+                labels.append(label)
+
+    # numpy arrays instead of lists: workers don't touch per-item refcounts,
+    # so forked pages stay shared
+    return np.array(paths), np.array(labels, dtype=np.int64), classes
+
+
+# =====================================================
+# DATASET
+# =====================================================
+def augment(img, rng):
+    """Small shift/scale/rotation plus brightness/contrast jitter; stays uint8."""
+    h, w = img.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-7, 7), rng.uniform(0.95, 1.05))
+    m[:, 2] += rng.uniform(-0.04, 0.04, 2) * (w, h)
+    img = cv2.warpAffine(img, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+    return cv2.convertScaleAbs(img, alpha=rng.uniform(0.9, 1.1), beta=rng.uniform(-10, 10))
+
+class ImageFolderStream(Dataset):
+    """
+    Decodes one image per __getitem__ instead of holding the dataset in RAM.
+
+    Items are (1, H, W) uint8 grayscale tensors; X-rays carry no colour, and
+    uint8 is 12x smaller than float32 RGB on its way through the worker
+    queues. normalize_batch() turns a batch into model input.
+    """
+
+    def __init__(self, paths, labels, classes, img_size=IMG_SIZE, train=False, seed=DATA_SEED):
+        self.paths = paths
+        self.labels = labels
+        self.classes = classes
+        self.img_size = img_size
+        self.train = train
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, item):
+        # EpochSampler yields (epoch, index); plain samplers yield index
+        epoch, index = item if isinstance(item, tuple) else (0, item)
+        path = str(self.paths[index])
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            # Keep batch shapes intact; a black image is counted as a skip
+            print(f"Warning: could not read {path}")
+            img = np.zeros(self.img_size[::-1], dtype=np.uint8)
+        img = cv2.resize(img, self.img_size, interpolation=cv2.INTER_LINEAR)
+        if self.train:
+            # Fresh every epoch, and the same whichever worker loads the item
+            img = augment(img, np.random.default_rng((self.seed, epoch, index)))
+        return torch.from_numpy(img).unsqueeze(0), int(self.labels[index])
+
+    @classmethod
+    def from_folder(cls, root, **kwargs):
+        paths, labels, classes = index_image_folder(root)
+        return cls(paths, labels, classes, **kwargs)
+
+    def subset(self, indices, train=None):
+        return ImageFolderStream(
+            self.paths[indices], self.labels[indices], self.classes,
+            img_size=self.img_size, train=self.train if train is None else train, seed=self.seed,
+        )
+
+
+class EpochSampler(Sampler):
+    """
+    Yields (epoch, index) so the epoch reaches the dataset even in
+    persistent workers, which keep their own copy of it. Call set_epoch()
+    before each epoch; the shuffle order comes from a generator seeded
+    with (seed, epoch), not from the global torch RNG.
+    """
+
+    def __init__(self, size, shuffle=False, seed=DATA_SEED):
+        self.size = size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def state_dict(self):
+        return {"seed": self.seed, "epoch": self.epoch}
+
+    def load_state_dict(self, state):
+        self.seed, self.epoch = state["seed"], state["epoch"]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        if self.shuffle:
+            g = torch.Generator()
+            g.manual_seed(int(np.random.SeedSequence([self.seed, self.epoch]).generate_state(1)[0]))
+            order = torch.randperm(self.size, generator=g).tolist()
+        else:
+            order = range(self.size)
+        return ((self.epoch, i) for i in order)
+
+
+def _worker_init(_worker_id):
+    # One OpenCV thread per loader worker; the workers are the parallelism
+    cv2.setNumThreads(1)
+
+def normalize_batch(images, device):
+    """uint8 (N, 1, H, W) -> float32 (N, 3, H, W), ImageNet-normalized, on `device`."""
+    images = images.to(device, non_blocking=True).float().div_(255.0)
+    mean = torch.tensor(IMAGENET_MEAN, device=device).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD, device=device).view(1, 3, 1, 1)
+    return (images - mean) / std
+
+def make_loader(dataset, batch_size, shuffle=False, workers=DATA_WORKERS, prefetch=PREFETCH_FACTOR):
+    seed = getattr(dataset, "seed", DATA_SEED)
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        sampler=EpochSampler(len(dataset), shuffle, seed),
+        # Worker base seeds come from here, not the global torch RNG, so
+        # starting (or restarting) workers doesn't shift training randomness
+        generator=torch.Generator().manual_seed(seed),
+        num_workers=workers,
+        pin_memory=torch.cuda.is_available(),
+        prefetch_factor=prefetch if workers > 0 else None,
+        persistent_workers=workers > 0,
+        worker_init_fn=_worker_init if workers > 0 else None,
+        drop_last=False,
+    )
+
+
+# =====================================================
+# ENTRY POINT USED BY training.py
+# =====================================================
+def split_indices(labels, test_size=0.2, seed=42):
+    """Stratified split of dataset indices (nothing is loaded)."""
+    from sklearn.model_selection import train_test_split
+    return train_test_split(
+        np.arange(len(labels)), test_size=test_size, random_state=seed, stratify=labels
+    )
+
+def load_data(data_dir, batch_size, img_size=IMG_SIZE, workers=DATA_WORKERS, val_size=0.2,
+              seed=DATA_SEED):
+    """
+    Streaming train/validation DataLoaders over an image folder, for fit().
+
+    Validation uses data_dir/val when present, otherwise a stratified split
+    held out of data_dir/train (or of data_dir/<class>/ itself). The test
+    folder is never loaded here: it would pick the early-stopping epoch and
+    best.pt, and then no longer be an unbiased final check.
+    Returns (train_loader, val_loader, classes).
+    """
+    train_dir = os.path.join(data_dir, "train")
+    val_dir = os.path.join(data_dir, "val")
+    source_dir = train_dir if os.path.isdir(train_dir) else data_dir
+
+    if os.path.isdir(train_dir) and os.path.isdir(val_dir):
+        train_set = ImageFolderStream.from_folder(train_dir, img_size=img_size, train=True, seed=seed)
+        val_set = ImageFolderStream.from_folder(val_dir, img_size=img_size, seed=seed)
+        if val_set.classes != train_set.classes:
+            raise ValueError(f"Class folders differ: {train_set.classes} vs {val_set.classes}")
+    else:
+        full = ImageFolderStream.from_folder(source_dir, img_size=img_size, seed=seed)
+        train_idx, val_idx = split_indices(full.labels, val_size)
+        train_set, val_set = full.subset(train_idx, train=True), full.subset(val_idx, train=False)
+
+    if not len(train_set):
+        raise FileNotFoundError(f"No images found under {data_dir}")
+    print(f"Indexed {len(train_set)} train / {len(val_set)} validation images, classes: {train_set.classes}")
+
+    return (
+        make_loader(train_set, batch_size, shuffle=True, workers=workers),
+        make_loader(val_set, batch_size, workers=workers),
+        train_set.classes,
+    )
+
+
+# =====================================================
+# THROUGHPUT
+# =====================================================
+class ThroughputMeter:
+    """Images/sec over a run, split into time waiting for data vs computing."""
+
+    def __init__(self):
+        self.images = 0
+        self.data_seconds = 0.0
+        self.started = time.perf_counter()
+        self._mark = self.started
+
+    def data_ready(self):
+        """Call when a batch arrives from the loader."""
+        now = time.perf_counter()
+        self.data_seconds += now - self._mark
+        self._mark = now
+
+    def step(self, n):
+        """Call after the batch has been processed."""
+        self.images += n
+        self._mark = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        elapsed = max(self.elapsed, 1e-9)
+        return (f"{self.images / elapsed:.1f} img/s, "
+                f"{100.0 * self.data_seconds / elapsed:.0f}% waiting on data")
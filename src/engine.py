@@ -0,0 +1,180 @@
+import os
+import random
+import time
+
+import numpy as np
+import torch
+
+from datasets import ThroughputMeter, normalize_batch
+
+
+# =====================================================
+# CHECKPOINTS
+# =====================================================
+def rng_state():
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def save_checkpoint(path, state):
+    """Write to a temp file first, so an interrupted save never clobbers the last good one."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+
+def load_checkpoint(path, device="cpu"):
+    # Our own files; they hold optimizer/RNG state, not just tensors
+    return torch.load(path, map_location=device, weights_only=False)
+
+
+# =====================================================
+# EPOCHS
+# =====================================================
+def _autocast(device, bf16):
+    return torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16)
+
+def train_one_epoch(model, loader, criterion, optimizer, device, accum_steps=1, bf16=False):
+    """
+    One pass over `loader`. Gradients are accumulated over `accum_steps`
+    batches before each optimizer step (effective batch = batch * steps).
+    Returns (mean loss, ThroughputMeter).
+    """
+    model.train()
+    meter = ThroughputMeter()
+    total_loss, seen = 0.0, 0
+    optimizer.zero_grad(set_to_none=True)
+
+    for step, (images, labels) in enumerate(loader, 1):
+        meter.data_ready()
+        images, labels = normalize_batch(images, device), labels.to(device, non_blocking=True)
+
+        with _autocast(device, bf16):
+            loss = criterion(model(images), labels)
+        (loss / accum_steps).backward()
+
+        if step % accum_steps == 0 or step == len(loader):
+            optimizer.step()
+            optimizer.zero_grad(set_to_none=True)
+
+        total_loss += loss.item() * labels.size(0)
+        seen += labels.size(0)
+        meter.step(labels.size(0))
+
+    return total_loss / max(seen, 1), meter
+
+@torch.no_grad()
+def evaluate(model, loader, criterion, device, bf16=False):
+    """Returns (mean loss, accuracy)."""
+    model.eval()
+    total_loss, correct, seen = 0.0, 0, 0
+    for images, labels in loader:
+        images, labels = normalize_batch(images, device), labels.to(device, non_blocking=True)
+        with _autocast(device, bf16):
+            outputs = model(images)
+        total_loss += criterion(outputs.float(), labels).item() * labels.size(0)
+        correct += (outputs.argmax(1) == labels).sum().item()
+        seen += labels.size(0)
+    return total_loss / max(seen, 1), correct / max(seen, 1)
+
+
+# =====================================================
+# TRAINING LOOP
+# =====================================================
+def fit(model, train_loader, val_loader, criterion, optimizer, scheduler=None, *,
+        epochs, device, checkpoint_dir="checkpoints", resume=False,
+        accum_steps=1, bf16=False, patience=None, min_delta=0.0):
+    """
+    Train with per-epoch checkpoints and early stopping on validation loss.
+
+    checkpoint_dir/last.pt holds everything needed to continue (model,
+    optimizer, scheduler, RNG and sampler state, history, early-stopping
+    counters) and is rewritten after every epoch; best.pt holds the
+    weights with the lowest validation loss. With resume=True training continues from
+    last.pt when it exists. Returns the history list.
+    """
+    last_path = os.path.join(checkpoint_dir, "last.pt")
+    best_path = os.path.join(checkpoint_dir, "best.pt")
+
+    start_epoch, best_loss, bad_epochs, history = 0, float("inf"), 0, []
+    if resume and os.path.exists(last_path):
+        ckpt = load_checkpoint(last_path, device)
+        model.load_state_dict(ckpt["model"])
+        optimizer.load_state_dict(ckpt["optimizer"])
+        if scheduler is not None and ckpt.get("scheduler") is not None:
+            scheduler.load_state_dict(ckpt["scheduler"])
+        set_rng_state(ckpt["rng"])
+        if ckpt.get("sampler") is not None and hasattr(train_loader.sampler, "load_state_dict"):
+            train_loader.sampler.load_state_dict(ckpt["sampler"])
+        start_epoch, best_loss = ckpt["epoch"] + 1, ckpt["best_loss"]
+        bad_epochs, history = ckpt["bad_epochs"], ckpt["history"]
+        print(f"Resumed from {last_path} at epoch {start_epoch + 1} (best val loss {best_loss:.4f})")
+    elif resume:
+        print(f"No checkpoint at {last_path}; starting from scratch")
+
+    if bf16 and device.type == "cpu":
+        print("bf16 autocast on CPU")
+
+    for epoch in range(start_epoch, epochs):
+        if patience is not None and bad_epochs >= patience:
+            break
+
+        started = time.perf_counter()
+        # Reshuffles and re-seeds augmentation for this epoch
+        if hasattr(train_loader.sampler, "set_epoch"):
+            train_loader.sampler.set_epoch(epoch)
+        train_loss, meter = train_one_epoch(
+            model, train_loader, criterion, optimizer, device, accum_steps, bf16
+        )
+        val_loss, val_acc = evaluate(model, val_loader, criterion, device, bf16)
+        if scheduler is not None:
+            scheduler.step()
+
+        improved = val_loss < best_loss - min_delta
+        if improved:
+            best_loss, bad_epochs = val_loss, 0
+            save_checkpoint(best_path, {"model": model.state_dict(), "epoch": epoch, "val_loss": val_loss})
+        else:
+            bad_epochs += 1
+
+        epoch_seconds = time.perf_counter() - started
+        history.append({
+            "epoch": epoch + 1,
+            "train_loss": train_loss,
+            "val_loss": val_loss,
+            "val_acc": val_acc,
+            "lr": optimizer.param_groups[0]["lr"],
+            "seconds": round(epoch_seconds, 2),
+            "images_per_sec": round(meter.images / max(meter.elapsed, 1e-9), 1),
+        })
+        save_checkpoint(last_path, {
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict() if scheduler is not None else None,
+            "rng": rng_state(),
+            "sampler": train_loader.sampler.state_dict() if hasattr(train_loader.sampler, "state_dict") else None,
+            "epoch": epoch,
+            "best_loss": best_loss,
+            "bad_epochs": bad_epochs,
+            "history": history,
+        })
+
+        print(f"Epoch [{epoch+1}/{epochs}], Loss: {train_loss:.4f}, Val loss: {val_loss:.4f}, "
+              f"Val acc: {val_acc:.4f}{' *' if improved else ''} | {epoch_seconds:.1f}s, {meter.summary()}")
+
+        if patience is not None and bad_epochs >= patience:
+            print(f"Early stopping: no val loss improvement for {patience} epoch(s)")
+
+    return history
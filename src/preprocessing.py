@@ -1,45 +1,398 @@
+import hashlib
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
-def load_images_from_folder(folder_path, img_size=(224, 224)):
-    """
-    Loads and preprocesses all images from a folder.
-    Converts them to grayscale, resizes, and normalizes.
-    """
-    images = []
-    labels = []
+# Decode threads; cv2.imread/resize release the GIL, so threads scale and
+# can write straight into one preallocated array
+LOAD_WORKERS = int(os.getenv("LIFELEN_LOAD_WORKERS", str(os.cpu_count() or 1)))
+LOAD_CHUNK = 64
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "datasets")
 
-    for label_folder in os.listdir(folder_path):
+
+def list_image_files(folder_path):
+    """(paths, labels) for folder_path/<label>/<image>, sorted so the order is reproducible."""
+    paths, labels = [], []
+    for label_folder in sorted(os.listdir(folder_path)):
         label_path = os.path.join(folder_path, label_folder)
         if not os.path.isdir(label_path):
             continue  # Skip files that aren’t folders
 
-        for img_file in os.listdir(label_path):
-            img_path = os.path.join(label_path, img_file)
-
+        for img_file in sorted(os.listdir(label_path)):
             # ✅ Skip non-image files (fix for .DS_Store and others)
-            if not img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
+            if img_file.lower().endswith(IMAGE_EXTS):
+                paths.append(os.path.join(label_path, img_file))
+                labels.append(label_folder)
+    return paths, labels
+
+def _decode_chunk(paths, out, start, img_size, scale):
+    failed = []
+    for i, img_path in enumerate(paths, start):
+        try:
+            img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                failed.append((i, "unreadable"))
                 continue
+            img = cv2.resize(img, img_size)
+            if scale is None:
+                out[i] = img
+            else:
+                np.multiply(img, scale, out=out[i], casting="unsafe")
+        except Exception as e:
+            failed.append((i, f"{type(e).__name__}: {e}"))
+    return failed
 
-            try:
-                img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                if img is None:
-                    print(f"Warning: could not read {img_path}")
-                    continue
-                img = cv2.resize(img, img_size)
-                img = img / 255.0  # Normalize pixel values (0–1)
-                images.append(img)
-                labels.append(label_folder)
-            except Exception as e:
-                print(f"Error loading image {img_path}: {e}")
+def decode_into(paths, out, img_size=(224, 224), workers=LOAD_WORKERS, chunk=LOAD_CHUNK):
+    """
+    Decode + resize paths[i] into out[i] (grayscale). Float outputs are
+    scaled to [0, 1]. Files are handed out in chunks so each task amortises
+    scheduling; rows are fixed by index, so the result does not depend on
+    the worker count. Returns [(index, reason)] for files that failed.
+    """
+    scale = None if out.dtype == np.uint8 else out.dtype.type(1.0 / 255.0)
+    chunks = [(paths[i:i + chunk], i) for i in range(0, len(paths), chunk)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [_decode_chunk(p, out, i, img_size, scale) for p, i in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda c: _decode_chunk(c[0], out, c[1], img_size, scale), chunks))
+    return sorted(f for r in results for f in r)
+
+def load_images_from_folder(folder_path, img_size=(224, 224), workers=LOAD_WORKERS,
+                            dtype=np.float64, return_summary=False):
+    """
+    Loads and preprocesses all images from a folder.
+    Converts them to grayscale, resizes, and normalizes.
+
+    The output array is allocated once and filled in place by `workers`
+    decode threads (1 = sequential). With return_summary=True a third
+    value describes what was loaded and which files were skipped.
+    """
+    started = time.perf_counter()
+    paths, labels = list_image_files(folder_path)
+    images = np.empty((len(paths), img_size[1], img_size[0]), dtype=dtype)
+    failed = decode_into(paths, images, img_size, workers)
 
-    return np.array(images), np.array(labels)
+    for i, reason in failed:
+        print(f"Warning: could not read {paths[i]} ({reason})")
+    labels = np.array(labels)
+    if failed:
+        # Close the gaps in order; one pass, no second full-size array
+        keep = np.ones(len(paths), dtype=bool)
+        keep[[i for i, _ in failed]] = False
+        kept = np.flatnonzero(keep)
+        for dst, src in enumerate(kept):
+            if dst != src:
+                images[dst] = images[src]
+        images, labels = images[:len(kept)], labels[kept]
+
+    if not return_summary:
+        return images, labels
+    summary = {
+        "files": len(paths),
+        "loaded": len(images),
+        "skipped": [{"path": paths[i], "reason": reason} for i, reason in failed],
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return images, labels, summary
 
 def split_data(X, y, test_size=0.2):
     """
     Split data into train and test sets.
     """
     return train_test_split(X, y, test_size=test_size, random_state=42)
+
+
+# =====================================================
+# COMPILED DATASET (memory-mapped uint8 shards)
+# =====================================================
+# store_dir/
+#   manifest.json        classes, target size, shards, one entry per source file,
+#                        plus the unreadable files ("skipped")
+#   shard-00000.npy      (N, H, W) uint8, opened with mmap_mode="r"
+# Entries are keyed by relative path and carry the file's sha256, so a
+# re-run only decodes files that are new or whose content changed; each
+# run that decodes something appends one shard holding only those images.
+# Rows of changed or removed files are orphaned; a shard is rewritten
+# (under a new file name) once more than STORE_MAX_WASTE of it is orphaned.
+STORE_VERSION = 1
+STORE_MAX_WASTE = float(os.getenv("LIFELEN_STORE_MAX_WASTE", "0.25"))
+
+
+def default_store_dir(folder_path, img_size=(224, 224)):
+    name = os.path.basename(os.path.normpath(folder_path)).replace(" ", "_") or "dataset"
+    parent = os.path.basename(os.path.dirname(os.path.normpath(folder_path))).replace(" ", "_")
+    return os.path.join(DATASET_CACHE_DIR, f"{parent}-{name}-{img_size[0]}x{img_size[1]}")
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _read_manifest(store_dir):
+    path = os.path.join(store_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(store_dir, manifest):
+    tmp = os.path.join(store_dir, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(store_dir, "manifest.json"))
+
+def _write_shard(decoded_path, path, failed):
+    """
+    Move the rows decoded into `decoded_path` to the shard at `path`,
+    leaving out the failed ones. Returns the source row of each shard row.
+    """
+    src = np.load(decoded_path, mmap_mode="r")
+    kept = np.array([i for i in range(len(src)) if i not in failed], dtype=np.int64)
+    if len(kept) == len(src):
+        del src
+        os.replace(decoded_path, path)
+        return kept
+    out = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=src.dtype,
+                                    shape=(len(kept),) + src.shape[1:])
+    for start in range(0, len(kept), LOAD_CHUNK):
+        out[start:start + LOAD_CHUNK] = src[kept[start:start + LOAD_CHUNK]]
+    out.flush()
+    del src, out
+    os.replace(path + ".tmp", path)
+    os.remove(decoded_path)
+    return kept
+
+def _compact_shards(store_dir, manifest, entries, max_waste):
+    """
+    Renumber shards so entries only reference live ones, dropping shards
+    with no live rows and rewriting those that waste more than
+    `max_waste`. Updates `entries` in place; returns (files to delete
+    once the manifest is written, bytes still held by orphaned rows).
+    """
+    live = {}
+    for entry in entries.values():
+        live.setdefault(entry["shard"], set()).add(entry["row"])
+
+    row_bytes = int(np.prod(manifest["img_size"]))
+    shards, remap, obsolete, wasted = [], {}, [], 0
+    for idx, shard in enumerate(manifest["shards"]):
+        rows = sorted(live.get(idx, ()))
+        if not rows:
+            obsolete.append(shard["file"])
+            continue
+        new_rows = {row: row for row in rows}
+        if 1.0 - len(rows) / shard["count"] > max_waste:
+            src = np.load(os.path.join(store_dir, shard["file"]), mmap_mode="r")
+            new_file = f"shard-{manifest['next_shard']:05d}.npy"
+            manifest["next_shard"] += 1
+            out = np.lib.format.open_memmap(os.path.join(store_dir, new_file), mode="w+",
+                                            dtype=src.dtype, shape=(len(rows),) + src.shape[1:])
+            for start in range(0, len(rows), LOAD_CHUNK):
+                out[start:start + LOAD_CHUNK] = src[rows[start:start + LOAD_CHUNK]]
+            out.flush()
+            del src, out
+            obsolete.append(shard["file"])
+            new_rows = {row: i for i, row in enumerate(rows)}
+            shard = {"file": new_file, "count": len(rows)}
+        wasted += (shard["count"] - len(rows)) * row_bytes
+        remap[idx] = (len(shards), new_rows)
+        shards.append(shard)
+
+    for rel, entry in entries.items():
+        new_idx, new_rows = remap[entry["shard"]]
+        entries[rel] = dict(entry, shard=new_idx, row=new_rows[entry["row"]])
+    manifest["shards"] = shards
+    return obsolete, wasted
+
+def compile_dataset(folder_path, store_dir=None, img_size=(224, 224), rebuild=False,
+                    workers=LOAD_WORKERS, max_waste=STORE_MAX_WASTE):
+    """
+    Decode + resize every image under folder_path/<label>/ once and store
+    it as uint8 in memory-mapped shards. Safe to re-run: unchanged files
+    (same size and mtime, or same sha256) are not decoded again, removed
+    files drop out of the manifest. Unreadable files are recorded under
+    "skipped" and only retried once their content changes. Shards whose
+    orphaned fraction exceeds `max_waste` are compacted.
+    """
+    store_dir = store_dir or default_store_dir(folder_path, img_size)
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = None if rebuild else _read_manifest(store_dir)
+    if manifest and (manifest.get("version") != STORE_VERSION
+                     or tuple(manifest["img_size"]) != tuple(img_size)):
+        print(f"{store_dir}: format or image size changed, rebuilding")
+        manifest = None
+    if manifest is None:
+        for fname in os.listdir(store_dir):
+            if fname.startswith("shard-"):
+                os.remove(os.path.join(store_dir, fname))
+        manifest = {"version": STORE_VERSION, "img_size": list(img_size),
+                    "source": os.path.abspath(folder_path), "shards": [], "entries": {}}
+    # File numbers are never reused, so a compacted shard can't clash
+    manifest.setdefault("next_shard", len(manifest["shards"]))
+
+    old_entries = manifest["entries"]
+    old_skipped = manifest.get("skipped", {})
+    by_sha = {e["sha256"]: e for e in old_entries.values()}
+    entries, skipped, todo = {}, {}, []
+    for path, label_folder in zip(*list_image_files(folder_path)):
+        rel = f"{label_folder}/{os.path.basename(path)}"
+        st = os.stat(path)
+        old = old_entries.get(rel) or old_skipped.get(rel)
+        if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+            (skipped if rel in old_skipped else entries)[rel] = old
+            continue
+        sha = _file_sha256(path)
+        known = by_sha.get(sha)
+        if known:  # same bytes already stored (touched, moved or duplicated)
+            entries[rel] = dict(known, label=label_folder, size=st.st_size, mtime=st.st_mtime)
+        elif rel in old_skipped and old_skipped[rel]["sha256"] == sha:
+            skipped[rel] = dict(old_skipped[rel], size=st.st_size, mtime=st.st_mtime)
+        else:
+            todo.append((rel, path, label_folder, sha, st))
+
+    decoded = 0
+    if todo:
+        shard_idx = len(manifest["shards"])
+        shard_file = f"shard-{manifest['next_shard']:05d}.npy"
+        manifest["next_shard"] += 1
+        decoded_path = os.path.join(store_dir, shard_file + ".decode")
+        out = np.lib.format.open_memmap(
+            decoded_path, mode="w+", dtype=np.uint8, shape=(len(todo), img_size[1], img_size[0])
+        )
+        failed = dict(decode_into([t[1] for t in todo], out, img_size, workers))
+        out.flush()
+        del out
+        for i, reason in sorted(failed.items()):
+            rel, path, label_folder, sha, st = todo[i]
+            skipped[rel] = {"label": label_folder, "sha256": sha, "size": st.st_size,
+                            "mtime": st.st_mtime, "reason": reason}
+            print(f"Warning: could not read {rel} ({reason})")
+
+        if len(failed) < len(todo):
+            kept = _write_shard(decoded_path, os.path.join(store_dir, shard_file), failed)
+            for row, i in enumerate(kept):
+                rel, path, label_folder, sha, st = todo[i]
+                entries[rel] = {"label": label_folder, "sha256": sha, "size": st.st_size,
+                                "mtime": st.st_mtime, "shard": shard_idx, "row": row}
+            manifest["shards"].append({"file": shard_file, "count": len(kept)})
+            decoded = len(kept)
+        else:
+            os.remove(decoded_path)
+
+    obsolete, wasted = _compact_shards(store_dir, manifest, entries, max_waste)
+    manifest["entries"] = entries
+    manifest["skipped"] = skipped
+    manifest["classes"] = sorted({e["label"] for e in entries.values()})
+    _write_manifest(store_dir, manifest)
+    # Only after the manifest stops pointing at them
+    for fname in obsolete:
+        os.remove(os.path.join(store_dir, fname))
+
+    return {"store_dir": store_dir, "images": len(entries), "decoded": decoded,
+            "reused": len(entries) - decoded, "skipped": sorted(skipped),
+            "shards": len(manifest["shards"]), "compacted": len(obsolete),
+            "wasted_bytes": wasted}
+
+
+class CompiledImages:
+    """
+    Read side of a compiled dataset. Shards are memory-mapped, so nothing
+    is read until it is indexed: a slice inside one shard is a zero-copy
+    view, other index lists gather rows into a new array.
+    """
+
+    def __init__(self, store_dir):
+        manifest = _read_manifest(store_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No compiled dataset in {store_dir}; run compile_dataset() first")
+        self.store_dir = store_dir
+        self.img_size = tuple(manifest["img_size"])
+        self.classes = manifest["classes"]
+        self.shards = [
+            np.load(os.path.join(store_dir, s["file"]), mmap_mode="r") for s in manifest["shards"]
+        ]
+        items = sorted(manifest["entries"].items())
+        self.files = [rel for rel, _ in items]
+        self.labels = np.array([e["label"] for _, e in items])
+        self.label_ids = np.searchsorted(self.classes, self.labels)
+        self._shard = np.array([e["shard"] for _, e in items], dtype=np.int32)
+        self._row = np.array([e["row"] for _, e in items], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def shape(self):
+        return (len(self), self.img_size[1], self.img_size[0])
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.shards[self._shard[index]][self._row[index]]
+        if isinstance(index, slice):
+            shard, rows = self._shard[index], self._row[index]
+            if len(rows) and (shard == shard[0]).all() and (np.diff(rows) == 1).all():
+                return self.shards[shard[0]][rows[0]:rows[-1] + 1]
+            index = np.arange(len(self))[index]
+        out = np.empty((len(index),) + self.shape[1:], dtype=np.uint8)
+        for i, j in enumerate(index):
+            out[i] = self.shards[self._shard[j]][self._row[j]]
+        return out
+
+    def batches(self, batch_size=64, indices=None, normalize=True):
+        """Yield (images, labels); float32 in [0, 1] like load_images_from_folder()."""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        for start in range(0, len(indices), batch_size):
+            idx = indices[start:start + batch_size]
+            contiguous = len(idx) and (np.diff(idx) == 1).all()
+            x = self[int(idx[0]):int(idx[-1]) + 1] if contiguous else self[idx]
+            if normalize:
+                x = np.multiply(x, np.float32(1.0 / 255.0), dtype=np.float32)
+            yield x, self.labels[idx]
+
+def load_compiled(folder_path=None, store_dir=None, img_size=(224, 224), compile_missing=True):
+    """
+    CompiledImages for folder_path, compiling (or updating) the store first
+    when compile_missing is set. Drop-in for the load_images_from_folder()
+    callers that can work batch by batch.
+    """
+    store_dir = store_dir or default_store_dir(folder_path, img_size)
+    if folder_path and compile_missing:
+        compile_dataset(folder_path, store_dir, img_size)
+    return CompiledImages(store_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile an image folder into a memory-mapped uint8 store")
+    parser.add_argument("command", choices=["compile"])
+    parser.add_argument("folder", help="folder with one sub-folder per label")
+    parser.add_argument("--out", help="store directory (default: <project>/.cache/datasets/<name>-<size>)")
+    parser.add_argument("--size", type=int, nargs=2, default=[224, 224], metavar=("W", "H"))
+    parser.add_argument("--rebuild", action="store_true",
+                        help="ignore the existing manifest and decode everything again "
+                             "(also drops all orphaned rows)")
+    parser.add_argument("--max-waste", type=float, default=STORE_MAX_WASTE,
+                        help="rewrite a shard once this fraction of its rows is orphaned")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS, help="decode threads")
+    args = parser.parse_args()
+
+    result = compile_dataset(args.folder, args.out, tuple(args.size), rebuild=args.rebuild,
+                             workers=args.workers, max_waste=args.max_waste)
+    print(f"{result['store_dir']}: {result['images']} images in {result['shards']} shard(s), "
+          f"{result['decoded']} decoded, {result['reused']} reused, {len(result['skipped'])} skipped, "
+          f"{result['compacted']} shard(s) compacted, {result['wasted_bytes'] / 1e6:.1f} MB orphaned")
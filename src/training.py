@@ -1,45 +1,71 @@
+import argparse
+import os
+
 import torch
 import torch.nn as nn
 import torch.optim as optim
 from torchvision import models
-from preprocessing import load_data
+from datasets import load_data
+from engine import fit, load_checkpoint
 
-# 🔹 Config
+# 🔹 Config (defaults; see --help)
 DATA_DIR = "data"
 EPOCHS = 5
 BATCH_SIZE = 32
 LEARNING_RATE = 0.001
+CHECKPOINT_DIR = "checkpoints"
+OUTPUT_PATH = "models/disease_detector.pt"
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# 🔹 Load data
-train_loader, test_loader, classes = load_data(DATA_DIR, BATCH_SIZE)
 
-# 🔹 Define Model (Transfer Learning - ResNet18)
-model = models.resnet18(weights='IMAGENET1K_V1')
-model.fc = nn.Linear(model.fc.in_features, len(classes))  # output for class count
-model = model.to(DEVICE)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the ResNet18 X-ray classifier")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--accum-steps", type=int, default=1,
+                        help="batches per optimizer step (effective batch = batch-size * accum-steps)")
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast (CPU or GPU)")
+    parser.add_argument("--patience", type=int, default=None, help="early-stopping patience in epochs")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--resume", action="store_true", help="continue from <checkpoint-dir>/last.pt")
+    parser.add_argument("--workers", type=int, default=None, help="DataLoader workers")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # 🔹 Load data (indexed once, decoded per batch by DataLoader workers)
+    loader_kwargs = {} if args.workers is None else {"workers": args.workers}
+    train_loader, val_loader, classes = load_data(args.data_dir, args.batch_size, **loader_kwargs)
 
-# 🔹 Loss & Optimizer
-criterion = nn.CrossEntropyLoss()
-optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    # 🔹 Define Model (Transfer Learning - ResNet18)
+    model = models.resnet18(weights='IMAGENET1K_V1')
+    model.fc = nn.Linear(model.fc.in_features, len(classes))  # output for class count
+    model = model.to(DEVICE)
 
-# 🔹 Training Loop
-for epoch in range(EPOCHS):
-    model.train()
-    running_loss = 0.0
-    for images, labels in train_loader:
-        images, labels = images.to(DEVICE), labels.to(DEVICE)
+    # 🔹 Loss, Optimizer & LR schedule
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+    scheduler = optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs)
 
-        optimizer.zero_grad()
-        outputs = model(images)
-        loss = criterion(outputs, labels)
-        loss.backward()
-        optimizer.step()
+    # 🔹 Training Loop (checkpointed every epoch, resumable)
+    fit(
+        model, train_loader, val_loader, criterion, optimizer, scheduler,
+        epochs=args.epochs, device=DEVICE, checkpoint_dir=args.checkpoint_dir,
+        resume=args.resume, accum_steps=args.accum_steps, bf16=args.bf16,
+        patience=args.patience,
+    )
 
-        running_loss += loss.item()
+    # 🔹 Save Model (best validation weights)
+    best_path = os.path.join(args.checkpoint_dir, "best.pt")
+    if os.path.exists(best_path):
+        model.load_state_dict(load_checkpoint(best_path, DEVICE)["model"])
+    torch.save(model.state_dict(), args.output)
+    print(f"✅ Model training complete and saved to {args.output}!")
 
-    print(f"Epoch [{epoch+1}/{EPOCHS}], Loss: {running_loss/len(train_loader):.4f}")
 
-# 🔹 Save Model
-torch.save(model.state_dict(), "models/disease_detector.pt")
-print("✅ Model training complete and saved!")
+if __name__ == "__main__":
+    main()
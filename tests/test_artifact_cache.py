@@ -0,0 +1,45 @@
+import os
+import time
+
+from utils.artifact_cache import ArtifactCache
+
+
+def build(data):
+    def builder(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return builder
+
+
+def test_same_inputs_build_once(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    a = cache.get_or_build("report", "1", {"x": 1}, build(b"one"))
+    b = cache.get_or_build("report", "1", {"x": 1}, build(b"two"))
+
+    assert a == b
+    assert cache.read_bytes(a) == b"one"
+    assert (cache.builds, cache.hits) == (1, 1)
+    assert cache._key_locks == {}
+
+
+def test_least_recently_used_files_go_over_the_size_cap(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_disk_bytes=250)
+    first = cache.get_or_build("report", "1", {"x": 1}, build(b"a" * 100))
+    second = cache.get_or_build("report", "1", {"x": 2}, build(b"b" * 100))
+    os.utime(second, (time.time() - 60, time.time() - 60))
+    cache.get_or_build("report", "1", {"x": 1}, build(b"a" * 100))  # touches first
+    third = cache.get_or_build("report", "1", {"x": 3}, build(b"c" * 100))
+
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert cache.evictions == 1
+
+
+def test_expired_files_are_deleted(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_age=3600)
+    old = cache.get_or_build("report", "1", {"patient": "A"}, build(b"old"))
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+
+    # Also on startup, without waiting for the next build
+    ArtifactCache(root=str(tmp_path), max_age=3600)
+    assert not os.path.exists(old)
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils.batching import MicroBatcher
+
+
+class RecordingModel:
+    """Doubles its input; rejects negative rows like a scaler rejects bad values."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def __call__(self, inputs):
+        with self.lock:
+            self.batch_sizes.append(len(inputs))
+        if (inputs < 0).any():
+            raise ValueError("negative input")
+        return inputs * 2
+
+
+@pytest.fixture
+def model():
+    return RecordingModel()
+
+
+def test_flushes_when_batch_is_full(model):
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=60_000)
+    try:
+        started = time.perf_counter()
+        futures = [batcher.submit(np.array([float(i)])) for i in range(4)]
+        results = [f.result(timeout=5) for f in futures]
+        assert time.perf_counter() - started < 5
+    finally:
+        batcher.close()
+
+    assert model.batch_sizes == [4]
+    assert [r.tolist() for r in results] == [[0.0], [2.0], [4.0], [6.0]]
+
+
+def test_flushes_partial_batch_at_deadline(model):
+    batcher = MicroBatcher(model, max_batch_size=100, max_wait_ms=50)
+    try:
+        started = time.perf_counter()
+        futures = [batcher.submit(np.array([1.0])) for _ in range(3)]
+        for f in futures:
+            f.result(timeout=5)
+        waited = time.perf_counter() - started
+    finally:
+        batcher.close()
+
+    assert model.batch_sizes == [3]
+    assert 0.04 <= waited < 2
+
+
+def test_error_reaches_only_the_failing_request(model):
+    batcher = MicroBatcher(model, max_batch_size=3, max_wait_ms=60_000)
+    try:
+        good = batcher.submit(np.array([1.0]))
+        bad = batcher.submit(np.array([-1.0]))
+        other = batcher.submit(np.array([3.0]))
+
+        assert good.result(timeout=5).tolist() == [2.0]
+        assert other.result(timeout=5).tolist() == [6.0]
+        with pytest.raises(ValueError, match="negative"):
+            bad.result(timeout=5)
+    finally:
+        batcher.close()
+
+    # One failed batch of 3, then each item alone
+    assert model.batch_sizes == [3, 1, 1, 1]
+
+
+def test_closed_batcher_rejects_new_work(model):
+    batcher = MicroBatcher(model)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.array([1.0]))
@@ -0,0 +1,177 @@
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from utils import database
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A health.db in the original layout (disease/risk/score) with rows in it."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            disease TEXT,
+            risk TEXT,
+            score REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO predictions (disease, risk, score) VALUES (?, ?, ?)",
+        [("Diabetes", "High", 0.8), ("Heart", "Low", 0.2)],
+    )
+    conn.execute("INSERT INTO predictions (disease, risk, score, created_at) VALUES ('X', 'Low', 0.1, NULL)")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "DB_PATH", path)
+    yield path
+    database.close_connection()
+    database._schema_ready.discard(path)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """An empty health.db with the current schema."""
+    path = str(tmp_path / "health.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.create_table()
+    yield path
+    database.close_connection()
+    database._schema_ready.discard(path)
+
+
+def test_create_table_migrates_legacy_db_with_rows(legacy_db):
+    database.create_table()
+
+    assert legacy_db in database._schema_ready
+    assert database.count_predictions() == 3
+    assert database.condition_counts() == [(database.UNKNOWN_CONDITION, 3, 0.0)]
+
+
+def test_new_predictions_after_legacy_migration(legacy_db):
+    database.create_table()
+    database.insert_prediction("alice", "Diabetes", "High", 91.0, "summary")
+    database.insert_prediction("alice", None, "Low", 12.0, "summary")
+
+    assert database.count_predictions() == 5
+    assert database.count_predictions("alice") == 2
+    counts = {c: n for c, n, _ in database.condition_counts("alice")}
+    assert counts == {"Diabetes": 1, database.UNKNOWN_CONDITION: 1}
+
+
+def test_prediction_is_saved_before_its_summary(db):
+    prediction_id = database.insert_prediction("alice", "Diabetes", "High", 91.0, None)
+    assert database.count_predictions("alice") == 1
+
+    database.update_prediction_summary(prediction_id, "Generated later")
+    row = database.get_connection().execute(
+        "SELECT summary FROM predictions WHERE id = ?", (prediction_id,)
+    ).fetchone()
+    assert row[0] == "Generated later"
+
+
+def _in_thread(func):
+    result = []
+    t = threading.Thread(target=lambda: result.append(func()))
+    t.start()
+    t.join()
+    return result[0]
+
+
+def test_connections_are_reused_across_threads(db):
+    # Each Streamlit rerun is a new thread; it should not open a new connection
+    first = _in_thread(lambda: id(database.get_connection()))
+    second = _in_thread(lambda: id(database.get_connection()))
+    assert first == second
+    assert database._pool(db).qsize() == 1
+
+
+def test_pool_is_bounded(db, monkeypatch):
+    pool = queue.Queue(maxsize=2)
+    monkeypatch.setitem(database._pools, db, pool)
+    barrier = threading.Barrier(4)
+    conns = []
+
+    def hold():
+        conns.append(database.get_connection())
+        barrier.wait()  # all four connections in use at once
+
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(c) for c in conns}) == 4
+    assert pool.qsize() == 2
+    closed = 0
+    for conn in conns:
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            closed += 1
+    assert closed == 2
+
+
+def _page_through(username, limit):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = database.fetch_predictions_page(username, limit=limit, cursor=cursor)
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_keyset_pagination_across_tied_timestamps(db, monkeypatch):
+    class FrozenClock:
+        @staticmethod
+        def now():
+            return datetime(2026, 1, 2, 3, 4, 5)
+
+    # Every row gets the same created_at; only the id breaks ties
+    monkeypatch.setattr(database, "datetime", FrozenClock)
+    for i in range(7):
+        database.insert_prediction("alice", "Diabetes", f"r{i}", float(i), None)
+    database.insert_prediction("bob", "Heart", "other", 1.0, None)
+
+    rows, pages = _page_through("alice", limit=3)
+    assert [r[1] for r in rows] == [f"r{i}" for i in reversed(range(7))]
+    assert pages == 3
+
+    rows, _ = _page_through(None, limit=2)
+    assert len(rows) == 8
+
+
+def test_pagination_reaches_legacy_rows_without_timestamp(legacy_db):
+    database.create_table()
+    database.insert_prediction(None, "Diabetes", "new", 50.0, None)
+
+    rows, _ = _page_through(None, limit=1)
+    assert len(rows) == 4
+    assert rows[-1][-1] == ""  # the legacy NULL row, sorted oldest
+
+
+def test_rolling_confidence_uses_calendar_days(db, monkeypatch):
+    days = iter(["2026-01-01", "2026-01-02", "2026-01-20", "2026-01-21"])
+
+    class Clock:
+        @staticmethod
+        def now():
+            return datetime.strptime(next(days), "%Y-%m-%d")
+
+    monkeypatch.setattr(database, "datetime", Clock)
+    for confidence in (10.0, 20.0, 90.0, 70.0):
+        database.insert_prediction("alice", "Diabetes", "r", confidence, None)
+
+    rows = database.daily_confidence("alice", window=7)
+    assert [r[0] for r in rows] == ["2026-01-01", "2026-01-02", "2026-01-20", "2026-01-21"]
+    # The 2026-01-20 average must not reach back over the 18-day gap
+    assert [r[3] for r in rows] == [10.0, 15.0, 90.0, 80.0]
@@ -0,0 +1,33 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.datasets import EpochSampler
+
+
+def indices(sampler):
+    return [i for _, i in sampler]
+
+
+def test_shuffle_is_a_permutation_tagged_with_the_epoch():
+    sampler = EpochSampler(50, shuffle=True, seed=3)
+    sampler.set_epoch(2)
+    pairs = list(sampler)
+    assert {epoch for epoch, _ in pairs} == {2}
+    assert sorted(i for _, i in pairs) == list(range(50))
+
+
+def test_order_depends_only_on_seed_and_epoch():
+    a = EpochSampler(50, shuffle=True, seed=3)
+    b = EpochSampler(50, shuffle=True, seed=3)
+    torch.manual_seed(123)  # the global RNG must not matter
+    a.set_epoch(1)
+    b.load_state_dict({"seed": 3, "epoch": 1})
+
+    assert indices(a) == indices(b)
+    b.set_epoch(2)
+    assert indices(a) != indices(b)
+
+
+def test_unshuffled_order_is_sequential():
+    assert indices(EpochSampler(5)) == [0, 1, 2, 3, 4]
@@ -0,0 +1,72 @@
+import pytest
+
+from utils.lab_parser import parse_lab_values, parse_report_date
+
+
+LIPID_PANEL = """
+LIPID PROFILE
+HDL-Cholesterol : 58 mg/dL
+LDL Cholesterol : 131 mg/dL
+VLDL Cholesterol : 30 mg/dL
+Non-HDL Cholesterol : 154 mg/dL
+Total Cholesterol : 212 mg/dL
+Triglycerides : 150 mg/dL
+"""
+
+
+def values(text):
+    return {k: v["value"] for k, v in parse_lab_values(text).items()}
+
+
+@pytest.mark.parametrize("text", [
+    "HDL-Cholesterol : 58 mg/dL\nTotal Cholesterol : 212 mg/dL",
+    "HDL - Cholesterol 58 mg/dL\nCholesterol, Total 212 mg/dL",
+    "HDLCholesterol: 58\nLDL-Cholesterol: 131\nCholesterol 212 mg/dL",
+    "Cholesterol, Total 212 mg/dL\nHDL Cholesterol 58 mg/dL",
+])
+def test_total_cholesterol_is_not_taken_from_hdl_or_ldl(text):
+    found = values(text)
+    assert found["cholesterol"] == 212.0
+    assert found["hdl"] == 58.0
+
+
+def test_lipid_panel():
+    found = values(LIPID_PANEL)
+    assert found["cholesterol"] == 212.0
+    assert found["hdl"] == 58.0
+    assert found["ldl"] == 131.0
+    assert found["triglycerides"] == 150.0
+
+
+def test_only_hdl_gives_no_total_cholesterol():
+    assert "cholesterol" not in values("HDL-Cholesterol : 58 mg/dL")
+
+
+def test_units_are_converted_to_canonical():
+    found = values("Fasting Glucose: 7.8 mmol/L\nTotal Cholesterol 5.2 mmol/L")
+    assert found["glucose"] == pytest.approx(140.52)
+    assert found["cholesterol"] == pytest.approx(201.08)
+
+
+def test_diabetes_report_layout():
+    text = """
+    Patient Age: 54 years
+    Collection Date: 12/03/2024
+    Fasting Blood Glucose (FBG) : 126 mg/dL   (70 - 100)
+    HbA1c 6.9 %
+    BMI = 31.2 kg/m2
+    Blood Pressure: 138/86 mmHg
+    """
+    found = values(text)
+    assert found["age"] == 54.0
+    assert found["glucose"] == 126.0
+    assert found["hba1c"] == 6.9
+    assert found["bmi"] == 31.2
+    assert (found["systolic_bp"], found["diastolic_bp"]) == (138.0, 86.0)
+    assert parse_report_date(text) == "2024-03-12"
+
+
+def test_implausible_values_are_dropped():
+    # A page number after the label is not a glucose reading
+    assert "glucose" not in values("Glucose page 2")
+    assert "glucose" not in values("Glucose: 9999 mg/dL")
@@ -0,0 +1,90 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.preprocessing import compile_dataset, load_compiled, load_images_from_folder
+
+SIZE = (32, 32)
+
+
+def write_image(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(str(path), np.full((40, 40), value, dtype=np.uint8))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "images"
+    for i in range(4):
+        write_image(root / "NORMAL" / f"n{i}.png", 10 * i)
+        write_image(root / "PNEUMONIA" / f"p{i}.png", 100 + 10 * i)
+    return root
+
+
+def compile_(folder, store, **kwargs):
+    return compile_dataset(str(folder), str(store), SIZE, workers=1, **kwargs)
+
+
+def assert_matches_folder(folder, store):
+    dataset = load_compiled(store_dir=str(store), compile_missing=False)
+    images, labels = load_images_from_folder(str(folder), SIZE, workers=1, dtype=np.uint8)
+    assert np.array_equal(dataset[:], images)
+    assert list(dataset.labels) == list(labels)
+
+
+def test_incremental_compile_decodes_only_changed_files(folder, tmp_path):
+    store = tmp_path / "store"
+    first = compile_(folder, store)
+    assert (first["decoded"], first["reused"]) == (8, 0)
+
+    write_image(folder / "NORMAL" / "n1.png", 250)  # changed content
+    write_image(folder / "NORMAL" / "n9.png", 99)   # new file
+    second = compile_(folder, store, max_waste=1.0)
+
+    assert (second["decoded"], second["reused"]) == (2, 7)
+    assert second["shards"] == 2
+    assert second["wasted_bytes"] == SIZE[0] * SIZE[1]  # the old n1 row
+    assert_matches_folder(folder, store)
+
+    # Nothing changed: nothing decoded
+    assert compile_(folder, store, max_waste=1.0)["decoded"] == 0
+
+
+def test_shards_are_compacted_once_mostly_orphaned(folder, tmp_path):
+    store = tmp_path / "store"
+    compile_(folder, store)
+    for name in ("n0", "n1", "n2"):
+        os.remove(folder / "NORMAL" / f"{name}.png")
+
+    result = compile_(folder, store, max_waste=0.25)
+
+    assert result["compacted"] == 1
+    assert result["wasted_bytes"] == 0
+    manifest = json.loads((store / "manifest.json").read_text())
+    assert [s["count"] for s in manifest["shards"]] == [5]
+    assert sorted(f for f in os.listdir(store) if f.startswith("shard-")) == [manifest["shards"][0]["file"]]
+    assert_matches_folder(folder, store)
+
+    # A later shard never reuses a file name still in the manifest
+    write_image(folder / "NORMAL" / "n7.png", 77)
+    compile_(folder, store)
+    files = [s["file"] for s in json.loads((store / "manifest.json").read_text())["shards"]]
+    assert len(set(files)) == 2
+    assert_matches_folder(folder, store)
+
+
+def test_unreadable_files_are_recorded_not_stored(folder, tmp_path):
+    store = tmp_path / "store"
+    (folder / "NORMAL" / "broken.png").write_bytes(b"not an image")
+
+    first = compile_(folder, store)
+    assert first["skipped"] == ["NORMAL/broken.png"]
+    manifest = json.loads((store / "manifest.json").read_text())
+    assert manifest["shards"][0]["count"] == 8
+    assert "NORMAL/broken.png" in manifest["skipped"]
+
+    assert compile_(folder, store)["decoded"] == 0
+    assert_matches_folder(folder, store)
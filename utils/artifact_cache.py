@@ -0,0 +1,163 @@
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT_DIR = os.path.join(BASE_DIR, ".cache", "artifacts")
+# Reports carry patient names and summaries: files unused for this long are
+# deleted, and the least recently used go first once the cache is over size
+ARTIFACT_MAX_AGE = float(os.getenv("LIFELEN_ARTIFACT_MAX_AGE_HOURS", "24")) * 3600
+ARTIFACT_MAX_BYTES = int(float(os.getenv("LIFELEN_ARTIFACT_MAX_MB", "256")) * 1024 * 1024)
+
+
+# =====================================================
+# CONTENT-ADDRESSED ARTIFACT CACHE
+# =====================================================
+class ArtifactCache:
+    """
+    Generated documents keyed by a hash of (kind, template version, inputs).
+
+    The first request for a key runs `builder(path)` to render the file
+    into the cache; every later request for the same inputs is served
+    from disk (and the bytes from a small in-memory LRU). Bumping the
+    template version changes every key, so stale layouts are never reused.
+
+    Files are evicted after each build: those unused for `max_age` seconds,
+    then the least recently used until the cache fits `max_disk_bytes`.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR, max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=ARTIFACT_MAX_BYTES, max_age=ARTIFACT_MAX_AGE):
+        self.root = root
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self._bytes = OrderedDict()
+        self._bytes_total = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+        if os.path.isdir(root):
+            self.evict()  # drop what earlier runs left past its age
+
+    @staticmethod
+    def make_key(kind, version, payload):
+        blob = json.dumps([kind, version, payload], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _key_lock(self, key):
+        # One lock per key in use; dropped when its last user leaves
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def get_or_build(self, kind, version, payload, builder, suffix=".pdf"):
+        """Return the cached file path for these inputs, rendering it only once."""
+        key = self.make_key(kind, version, payload)
+        path = os.path.join(self.root, kind, f"{key}{suffix}")
+
+        with self._key_lock(key):
+            try:
+                os.utime(path)  # marks it recently used for eviction
+                self.hits += 1
+                return path
+            except FileNotFoundError:
+                pass
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=suffix, prefix=".build-", dir=os.path.dirname(path))
+            os.close(fd)
+            try:
+                builder(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.builds += 1
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete expired files, then least recently used ones over the size cap."""
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.startswith(".build-"):
+                    continue  # still being rendered
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+
+        files.sort()
+        now, total = time.time(), sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if path == keep:
+                continue
+            if now - mtime <= self.max_age and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.evictions += 1
+            with self._lock:
+                data = self._bytes.pop(path, None)
+                if data is not None:
+                    self._bytes_total -= len(data)
+
+    def read_bytes(self, path):
+        """File contents, kept in memory for repeat downloads."""
+        with self._lock:
+            data = self._bytes.get(path)
+            if data is not None:
+                self._bytes.move_to_end(path)
+                return data
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        with self._lock:
+            if path not in self._bytes and len(data) <= self.max_memory_bytes:
+                self._bytes[path] = data
+                self._bytes_total += len(data)
+                while self._bytes_total > self.max_memory_bytes:
+                    _, old = self._bytes.popitem(last=False)
+                    self._bytes_total -= len(old)
+        return data
+
+    @staticmethod
+    def materialize(path, dest):
+        """Copy a cached artifact to `dest` unless an identical file is already there."""
+        if os.path.abspath(path) == os.path.abspath(dest):
+            return dest
+        if os.path.exists(dest) and filecmp.cmp(path, dest, shallow=False):
+            return dest
+        dest_dir = os.path.dirname(dest)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        shutil.copyfile(path, dest)
+        return dest
+
+artifact_cache = ArtifactCache()
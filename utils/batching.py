@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# =====================================================
+# DYNAMIC MICRO-BATCHER
+# =====================================================
+class MicroBatcher:
+    """
+    Collects single inputs from concurrent callers and runs them
+    through `predict_fn` as one stacked batch.
+
+    A batch is flushed as soon as `max_batch_size` items are queued or
+    the oldest queued item has waited `max_wait_ms`, whichever comes
+    first. Each caller gets back only its own row of the output. If a
+    batch fails, its items are retried one by one, so an error reaches
+    only the request that caused it.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=10.0, name="batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._batch_time_total = 0.0
+
+        self._worker = threading.Thread(
+            target=self._run, name=f"{name}-worker", daemon=True
+        )
+        self._worker.start()
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit(self, item) -> Future:
+        """Queue one input (without batch axis) and return a Future for its output row."""
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._queue.append((item, fut, time.perf_counter()))
+            self._cond.notify()
+        return fut
+
+    def predict(self, item, timeout=None):
+        """Blocking helper: submit one input and wait for its result."""
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": batches,
+                "items": items,
+                "queued": len(self._queue),
+                "avg_batch_size": items / batches if batches else 0.0,
+                "avg_batch_fill": items / (batches * self.max_batch_size) if batches else 0.0,
+                "avg_queue_wait_ms": self._queue_wait_total / items * 1000.0 if items else 0.0,
+                "max_queue_wait_ms": self._queue_wait_max * 1000.0,
+                "avg_batch_latency_ms": self._batch_time_total / batches * 1000.0 if batches else 0.0,
+            }
+
+    # -----------------------------
+    # Worker loop
+    # -----------------------------
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            return batch
+
+    def _deliver(self, batch):
+        inputs = np.stack([item for item, _, _ in batch])
+        outputs = self.predict_fn(inputs)
+        if len(outputs) != len(batch):
+            raise ValueError(f"{self.name}: {len(outputs)} outputs for {len(batch)} inputs")
+        for i, (_, fut, _) in enumerate(batch):
+            fut.set_result(outputs[i])
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    for entry in batch:
+                        try:
+                            self._deliver([entry])
+                        except Exception as item_error:
+                            entry[1].set_exception(item_error)
+
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._queue_wait_total += sum(waits)
+                self._queue_wait_max = max(self._queue_wait_max, max(waits))
+                self._batch_time_total += elapsed
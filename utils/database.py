@@ -1,19 +1,144 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
 import bcrypt
 from datetime import datetime
+from functools import wraps
 
 DB_PATH = "health.db"
 
 # =====================================================
 # DB CONNECTION
 # =====================================================
+# Connections come from a small shared pool. A thread keeps the one it
+# took until it ends (Streamlit runs every rerun on a new script thread),
+# then it goes back for the next thread; the WAL/PRAGMA setup runs once
+# per connection, not per rerun. Returns beyond the pool size are closed.
+DB_POOL_SIZE = int(os.getenv("LIFELEN_DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = 5000
+LOCK_RETRIES = 5
+LOCK_RETRY_DELAY = 0.05
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",       # ~20 MB page cache
+    "PRAGMA mmap_size = 268435456",     # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+)
+
+_local = threading.local()
+_pools = {}
+_pools_lock = threading.Lock()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+def _open_connection(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000.0,
+        check_same_thread=False,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _pool(path):
+    with _pools_lock:
+        return _pools.setdefault(path, queue.Queue(maxsize=DB_POOL_SIZE))
+
+class _Lease:
+    """A pooled connection held by one thread; returned when the thread's locals are freed."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self.conn = _pool(path).get_nowait()
+        except queue.Empty:
+            self.conn = _open_connection(path)
+
+    def release(self):
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            conn.rollback()  # never hand over a half-finished transaction
+            _pool(self.path).put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
 def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    lease = getattr(_local, "lease", None)
+    if lease is None or lease.conn is None or lease.path != DB_PATH:
+        if lease is not None:
+            lease.release()
+        lease = _local.lease = _Lease(DB_PATH)
+    return lease.conn
+
+def release_connection():
+    """Hand this thread's connection back to the pool before the thread ends."""
+    lease = getattr(_local, "lease", None)
+    if lease is not None:
+        lease.release()
+
+def close_connection():
+    """Close this thread's connection and the idle pooled ones (scripts, tests, benchmarks)."""
+    lease = getattr(_local, "lease", None)
+    if lease is not None and lease.conn is not None:
+        lease.conn.close()
+        lease.conn = None
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+def _is_lock_error(e):
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+def with_retry(func):
+    """Retry a DB call with backoff when SQLite reports the database is locked."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                get_connection().rollback()
+                if not _is_lock_error(e) or attempt == LOCK_RETRIES - 1:
+                    raise
+                time.sleep(LOCK_RETRY_DELAY * (2 ** attempt))
+    return wrapper
 
 # =====================================================
 # CREATE TABLES
 # =====================================================
 def create_table():
+    """Create the schema once per process (safe to call on every rerun)."""
+    if DB_PATH in _schema_ready:
+        return
+
+    with _schema_lock:
+        if DB_PATH in _schema_ready:
+            return
+        _create_schema()
+        _schema_ready.add(DB_PATH)
+
+@with_retry
+def _create_schema():
     conn = get_connection()
     cursor = conn.cursor()
 
@@ -41,6 +166,49 @@ def create_table():
         )
     """)
 
+    _migrate_predictions(cursor)
+
+    # History queries filter by user and page newest-first on (created_at, id)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_predictions_user_created
+        ON predictions (username, created_at, id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_predictions_created
+        ON predictions (created_at, id)
+    """)
+
+    _create_stats_tables(cursor)
+
+    # AI summary cache (see utils/summary_service.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_cache (
+            cache_key TEXT PRIMARY KEY,
+            summary TEXT,
+            created_at REAL
+        )
+    """)
+
+    # Structured lab values parsed from uploaded reports
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lab_values (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            report_sha TEXT,
+            analyte TEXT,
+            value REAL,
+            unit TEXT,
+            measured_at TEXT,
+            created_at TEXT,
+            UNIQUE (username, report_sha, analyte)
+        )
+    """)
+    # "Latest value per analyte for a user" is a seek on this index
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lab_values_user_analyte
+        ON lab_values (username, analyte, measured_at, id)
+    """)
+
     # Contact messages table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS messages (
@@ -54,17 +222,44 @@ def create_table():
     """)
 
     conn.commit()
-    conn.close()
+
+    cursor.execute("SELECT COUNT(*) FROM prediction_totals")
+    if cursor.fetchone()[0] == 0:
+        rebuild_prediction_stats()
+
+PREDICTION_COLUMNS = {
+    "username": "TEXT",
+    "condition": "TEXT",
+    "result": "TEXT",
+    "confidence": "REAL",
+    "summary": "TEXT",
+    "created_at": "TEXT",
+}
+
+def _migrate_predictions(cursor):
+    """Add any columns missing from an older predictions table."""
+    cursor.execute("PRAGMA table_info(predictions)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, col_type in PREDICTION_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE predictions ADD COLUMN {column} {col_type}")
+    # Legacy rows can lack a timestamp; NULL never compares in the history
+    # keyset ((created_at, id) < (?, ?)), so they'd never be paged to.
+    # '' sorts them oldest.
+    cursor.execute("UPDATE predictions SET created_at = '' WHERE created_at IS NULL")
 
 # =====================================================
 # USER MANAGEMENT
 # =====================================================
 def create_user(username, password, role="user"):
+    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    _insert_user(username, password_hash, role)
+
+@with_retry
+def _insert_user(username, password_hash, role):
     conn = get_connection()
     cursor = conn.cursor()
 
-    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-
     cursor.execute("""
         INSERT OR IGNORE INTO users
         (username, password_hash, role, created_at)
@@ -77,11 +272,19 @@ def create_user(username, password, role="user"):
     ))
 
     conn.commit()
-    conn.close()
 
 def validate_user(username, password):
-    conn = get_connection()
-    cursor = conn.cursor()
+    row = _fetch_user(username)
+
+    if not row:
+        return None
+
+    stored_hash, role = row
+    return role if bcrypt.checkpw(password.encode(), stored_hash) else None
+
+@with_retry
+def _fetch_user(username):
+    cursor = get_connection().cursor()
 
     cursor.execute("""
         SELECT password_hash, role
@@ -89,22 +292,18 @@ def validate_user(username, password):
         WHERE username = ?
     """, (username,))
 
-    row = cursor.fetchone()
-    conn.close()
-
-    if not row:
-        return None
-
-    stored_hash, role = row
-    return role if bcrypt.checkpw(password.encode(), stored_hash) else None
+    return cursor.fetchone()
 
 # =====================================================
 # PREDICTIONS
 # =====================================================
+@with_retry
 def insert_prediction(username, condition, result, confidence, summary):
     conn = get_connection()
     cursor = conn.cursor()
 
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
     cursor.execute("""
         INSERT INTO predictions
         (username, condition, result, confidence, summary, created_at)
@@ -115,15 +314,25 @@ def insert_prediction(username, condition, result, confidence, summary):
         result,
         confidence,
         summary,
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        created_at
     ))
+    _update_prediction_stats(cursor, username, condition, confidence, created_at)
 
     conn.commit()
-    conn.close()
+    _invalidate_recent_activity()
+    return cursor.lastrowid
 
-def fetch_predictions(username=None):
+@with_retry
+def update_prediction_summary(prediction_id, summary):
+    """Attach the AI summary to a prediction saved before it was ready."""
     conn = get_connection()
-    cursor = conn.cursor()
+    conn.execute("UPDATE predictions SET summary = ? WHERE id = ?", (summary, prediction_id))
+    conn.commit()
+    _invalidate_recent_activity()
+
+@with_retry
+def fetch_predictions(username=None):
+    cursor = get_connection().cursor()
 
     if username:
         cursor.execute("""
@@ -139,16 +348,270 @@ def fetch_predictions(username=None):
             ORDER BY created_at DESC
         """)
 
-    rows = cursor.fetchall()
-    conn.close()
+    return cursor.fetchall()
+
+@with_retry
+def fetch_predictions_page(username=None, limit=50, cursor=None):
+    """
+    Keyset-paginated history, newest first.
+
+    `cursor` is the (created_at, id) pair returned by the previous call
+    (None for the first page). Returns (rows, next_cursor); next_cursor is
+    None on the last page. Rows have the same shape as fetch_predictions().
+    """
+    where, params = [], []
+    if username:
+        where.append("username = ?")
+        params.append(username)
+    if cursor is not None:
+        where.append("(created_at, id) < (?, ?)")
+        params.extend(cursor)
+
+    columns = "condition, result, confidence, created_at" if username else \
+        "username, condition, result, confidence, created_at"
+    sql = f"""
+        SELECT id, {columns}
+        FROM predictions
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """
+    params.append(limit + 1)
+
+    rows = get_connection().execute(sql, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = (rows[-1][-1], rows[-1][0]) if has_more else None
+    return [row[1:] for row in rows], next_cursor
+
+@with_retry
+def count_predictions(username=None):
+    row = get_connection().execute(
+        "SELECT COALESCE(SUM(n), 0) FROM prediction_totals WHERE scope = ?",
+        (username or GLOBAL_SCOPE,)
+    ).fetchone()
+    return row[0]
+
+# =====================================================
+# ANALYTICS (incrementally maintained summary tables)
+# =====================================================
+# Every insert_prediction() bumps these counters in the same transaction,
+# once for the user and once for GLOBAL_SCOPE, so dashboards read a few
+# summary rows instead of scanning the predictions table.
+GLOBAL_SCOPE = ""
+HIST_BUCKET_WIDTH = 10
+# Rows from the legacy schema have no condition after _migrate_predictions;
+# the summary tables' primary keys can't hold NULL
+UNKNOWN_CONDITION = "Unknown"
+
+def _create_stats_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prediction_totals (
+            scope TEXT,
+            condition TEXT,
+            n INTEGER NOT NULL DEFAULT 0,
+            conf_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, condition)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prediction_daily (
+            scope TEXT,
+            day TEXT,
+            condition TEXT,
+            n INTEGER NOT NULL DEFAULT 0,
+            conf_sum REAL NOT NULL DEFAULT 0,
+            conf_min REAL,
+            conf_max REAL,
+            PRIMARY KEY (scope, day, condition)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prediction_conf_hist (
+            scope TEXT,
+            bucket INTEGER,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, bucket)
+        ) WITHOUT ROWID
+    """)
+
+def _conf_bucket(confidence):
+    bucket = int((confidence or 0) // HIST_BUCKET_WIDTH)
+    return max(0, min(bucket, 100 // HIST_BUCKET_WIDTH - 1))
+
+def _update_prediction_stats(cursor, username, condition, confidence, created_at):
+    conf = float(confidence or 0)
+    condition = condition or UNKNOWN_CONDITION
+    day = (created_at or "")[:10]
+    bucket = _conf_bucket(conf)
+
+    scopes = (username, GLOBAL_SCOPE) if username else (GLOBAL_SCOPE,)
+    for scope in scopes:
+        cursor.execute("""
+            INSERT INTO prediction_totals (scope, condition, n, conf_sum)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT (scope, condition) DO UPDATE SET
+                n = n + 1,
+                conf_sum = conf_sum + excluded.conf_sum
+        """, (scope, condition, conf))
+        cursor.execute("""
+            INSERT INTO prediction_daily (scope, day, condition, n, conf_sum, conf_min, conf_max)
+            VALUES (?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (scope, day, condition) DO UPDATE SET
+                n = n + 1,
+                conf_sum = conf_sum + excluded.conf_sum,
+                conf_min = MIN(conf_min, excluded.conf_min),
+                conf_max = MAX(conf_max, excluded.conf_max)
+        """, (scope, day, condition, conf, conf, conf))
+        cursor.execute("""
+            INSERT INTO prediction_conf_hist (scope, bucket, n)
+            VALUES (?, ?, 1)
+            ON CONFLICT (scope, bucket) DO UPDATE SET n = n + 1
+        """, (scope, bucket))
+
+@with_retry
+def rebuild_prediction_stats():
+    """Recompute all summary tables from the predictions table (one-off backfill)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    for table in ("prediction_totals", "prediction_daily", "prediction_conf_hist"):
+        cursor.execute(f"DELETE FROM {table}")
+
+    bucket_sql = (
+        f"MAX(0, MIN(CAST(COALESCE(confidence, 0) / {HIST_BUCKET_WIDTH} AS INTEGER), "
+        f"{100 // HIST_BUCKET_WIDTH - 1}))"
+    )
+    # Per-user rows, then the same aggregates under GLOBAL_SCOPE
+    for scope_sql, where in (("username", "WHERE username IS NOT NULL AND username != ''"),
+                             ("?", "")):
+        params = (GLOBAL_SCOPE,) if scope_sql == "?" else ()
+        cursor.execute(f"""
+            INSERT INTO prediction_totals (scope, condition, n, conf_sum)
+            SELECT {scope_sql}, COALESCE(condition, ?), COUNT(*), SUM(COALESCE(confidence, 0))
+            FROM predictions {where}
+            GROUP BY 1, 2
+        """, params + (UNKNOWN_CONDITION,))
+        cursor.execute(f"""
+            INSERT INTO prediction_daily (scope, day, condition, n, conf_sum, conf_min, conf_max)
+            SELECT {scope_sql}, COALESCE(SUBSTR(created_at, 1, 10), ''), COALESCE(condition, ?), COUNT(*),
+                   SUM(COALESCE(confidence, 0)),
+                   MIN(COALESCE(confidence, 0)), MAX(COALESCE(confidence, 0))
+            FROM predictions {where}
+            GROUP BY 1, 2, 3
+        """, params + (UNKNOWN_CONDITION,))
+        cursor.execute(f"""
+            INSERT INTO prediction_conf_hist (scope, bucket, n)
+            SELECT {scope_sql}, {bucket_sql}, COUNT(*)
+            FROM predictions {where}
+            GROUP BY 1, 2
+        """, params)
+
+    conn.commit()
+
+@with_retry
+def condition_counts(username=None):
+    """[(condition, count, avg_confidence)] for one user or the whole platform."""
+    return get_connection().execute("""
+        SELECT condition, n, conf_sum / n
+        FROM prediction_totals
+        WHERE scope = ? AND n > 0
+        ORDER BY n DESC
+    """, (username or GLOBAL_SCOPE,)).fetchall()
+
+@with_retry
+def user_counts(limit=None):
+    """[(username, count)] across all users, busiest first."""
+    sql = """
+        SELECT scope, SUM(n)
+        FROM prediction_totals
+        WHERE scope != ?
+        GROUP BY scope
+        ORDER BY 2 DESC
+    """
+    params = [GLOBAL_SCOPE]
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return get_connection().execute(sql, params).fetchall()
+
+@with_retry
+def daily_confidence(username=None, window=7):
+    """
+    [(day, count, avg_confidence, rolling_avg_confidence)] oldest first;
+    the rolling average is weighted by count over the last `window`
+    calendar days (days without predictions count toward the window).
+    Undated legacy rows are left out.
+    """
+    window = max(1, int(window))
+    return get_connection().execute(f"""
+        SELECT day,
+               SUM(n),
+               SUM(conf_sum) / SUM(n),
+               SUM(SUM(conf_sum)) OVER w / SUM(SUM(n)) OVER w
+        FROM prediction_daily
+        WHERE scope = ? AND day != ''
+        GROUP BY day
+        WINDOW w AS (ORDER BY julianday(day) RANGE BETWEEN {window - 1} PRECEDING AND CURRENT ROW)
+        ORDER BY day
+    """, (username or GLOBAL_SCOPE,)).fetchall()
+
+@with_retry
+def confidence_histogram(username=None):
+    """[(bucket_label, count)] over fixed HIST_BUCKET_WIDTH-percent buckets."""
+    counts = dict(get_connection().execute("""
+        SELECT bucket, n FROM prediction_conf_hist WHERE scope = ?
+    """, (username or GLOBAL_SCOPE,)).fetchall())
+
+    return [
+        (f"{b * HIST_BUCKET_WIDTH}-{(b + 1) * HIST_BUCKET_WIDTH}%", counts.get(b, 0))
+        for b in range(100 // HIST_BUCKET_WIDTH)
+    ]
+
+# =====================================================
+# RECENT ACTIVITY FEED (cached)
+# =====================================================
+# Small newest-first feed for the page footer. Entries expire after
+# RECENT_ACTIVITY_TTL seconds and are dropped immediately when this
+# process inserts a prediction.
+RECENT_ACTIVITY_TTL = 30
+RECENT_ACTIVITY_LIMIT = 10
+
+_recent_cache = {}
+_recent_lock = threading.Lock()
+_predictions_version = 0
+
+def _invalidate_recent_activity():
+    global _predictions_version
+    with _recent_lock:
+        _predictions_version += 1
+        _recent_cache.clear()
+
+def fetch_recent_activity(username=None, limit=RECENT_ACTIVITY_LIMIT, ttl=RECENT_ACTIVITY_TTL):
+    """Latest `limit` predictions for one user (or everyone if username is None)."""
+    key = (DB_PATH, username, limit)
+    now = time.time()
+
+    with _recent_lock:
+        version = _predictions_version
+        hit = _recent_cache.get(key)
+    if hit and now - hit[0] < ttl:
+        return hit[1]
+
+    rows, _ = fetch_predictions_page(username, limit=limit)
+
+    with _recent_lock:
+        if version == _predictions_version:
+            _recent_cache[key] = (now, rows)
     return rows
 
 # =====================================================
 # ADMIN HELPERS
 # =====================================================
+@with_retry
 def fetch_all_users():
-    conn = get_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     cursor.execute("""
         SELECT username, role, created_at
@@ -156,13 +619,11 @@ def fetch_all_users():
         ORDER BY created_at DESC
     """)
 
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return cursor.fetchall()
 
+@with_retry
 def fetch_all_predictions():
-    conn = get_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     cursor.execute("""
         SELECT username, condition, result, confidence, created_at
@@ -170,13 +631,90 @@ def fetch_all_predictions():
         ORDER BY created_at DESC
     """)
 
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return cursor.fetchall()
+
+# =====================================================
+# AI SUMMARY CACHE
+# =====================================================
+@with_retry
+def fetch_cached_summary(cache_key, max_age=None):
+    row = get_connection().execute("""
+        SELECT summary, created_at
+        FROM summary_cache
+        WHERE cache_key = ?
+    """, (cache_key,)).fetchone()
+
+    if not row:
+        return None
+    summary, created_at = row
+    if max_age is not None and time.time() - created_at > max_age:
+        return None
+    return summary
+
+@with_retry
+def store_cached_summary(cache_key, summary):
+    conn = get_connection()
+    conn.execute("""
+        INSERT OR REPLACE INTO summary_cache (cache_key, summary, created_at)
+        VALUES (?, ?, ?)
+    """, (cache_key, summary, time.time()))
+    conn.commit()
+
+# =====================================================
+# LAB VALUES (see utils/lab_parser.py)
+# =====================================================
+@with_retry
+def has_lab_report(username, report_sha):
+    row = get_connection().execute("""
+        SELECT 1 FROM lab_values
+        WHERE username = ? AND report_sha = ?
+        LIMIT 1
+    """, (username, report_sha)).fetchone()
+    return row is not None
+
+@with_retry
+def insert_lab_values(username, report_sha, values, measured_at=None):
+    """Store parsed analytes; re-uploading the same report is a no-op."""
+    conn = get_connection()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    measured_at = measured_at or created_at
+
+    conn.executemany("""
+        INSERT OR IGNORE INTO lab_values
+        (username, report_sha, analyte, value, unit, measured_at, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (username, report_sha, analyte, v["value"], v["unit"], measured_at, created_at)
+        for analyte, v in values.items()
+    ])
+    conn.commit()
+
+@with_retry
+def latest_lab_values(username, analytes=None):
+    """{analyte: (value, unit, measured_at)} with the newest reading of each."""
+    rows = get_connection().execute("""
+        SELECT analyte, value, unit, measured_at
+        FROM (
+            SELECT analyte, value, unit, measured_at,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY analyte ORDER BY measured_at DESC, id DESC
+                   ) AS rn
+            FROM lab_values
+            WHERE username = ?
+        )
+        WHERE rn = 1
+    """, (username,)).fetchall()
+
+    return {
+        analyte: (value, unit, measured_at)
+        for analyte, value, unit, measured_at in rows
+        if analytes is None or analyte in analytes
+    }
 
 # =====================================================
 # CONTACT MESSAGES
 # =====================================================
+@with_retry
 def insert_message(name, email, subject, message):
     conn = get_connection()
     cursor = conn.cursor()
@@ -194,11 +732,10 @@ def insert_message(name, email, subject, message):
     ))
 
     conn.commit()
-    conn.close()
 
+@with_retry
 def fetch_messages():
-    conn = get_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     cursor.execute("""
         SELECT name, email, subject, message, created_at
@@ -206,6 +743,4 @@ def fetch_messages():
         ORDER BY created_at DESC
     """)
 
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return cursor.fetchall()
@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+# =====================================================
+# X-RAY PREPROCESSING
+# =====================================================
+# One decode feeds both models, each with the resize it was trained with:
+#   classifier (Keras)   -> (224, 224, 1) float32 in [0, 1], grayscale, bilinear
+#   detector (ResNet18)  -> (3, 224, 224) float32, ImageNet-normalized RGB, area
+# Outputs are written straight into preallocated float32 arrays, so a
+# batch costs one allocation per model input rather than several
+# temporaries per image.
+XRAY_SIZE = (224, 224)
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+# x_norm = pixel * scale + shift, per RGB channel
+_DET_SCALE = (1.0 / (255.0 * IMAGENET_STD)).astype(np.float32)
+_DET_SHIFT = (-IMAGENET_MEAN / IMAGENET_STD).astype(np.float32)
+
+
+def decode_image(data) -> np.ndarray:
+    """
+    Decode encoded image bytes to uint8 (BGR, or 2-D for grayscale files,
+    which X-rays usually are). Returns None if the bytes are not an image.
+    """
+    buf = np.frombuffer(data, np.uint8)
+    if buf.size == 0:
+        return None
+    img = cv2.imdecode(buf, cv2.IMREAD_ANYCOLOR)
+    if img is not None and img.ndim == 3 and img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+def to_rgb(img: np.ndarray) -> np.ndarray:
+    """Display copy for st.image()."""
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+def downscale(img: np.ndarray, size=XRAY_SIZE, interpolation=cv2.INTER_LINEAR) -> np.ndarray:
+    return cv2.resize(img, size, interpolation=interpolation)
+
+def _write_classifier(img, out, size):
+    # Same order and arithmetic as the original path: gray at full
+    # resolution, bilinear resize (as in training), float64 / 255, then
+    # float32, so the classifier input is bit-identical
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    np.divide(downscale(gray, size), 255.0, out=out[..., 0], dtype=np.float64, casting="unsafe")
+
+def _write_detector(img, out, size):
+    # Area averaging stands in for the antialiased PIL resize the detector
+    # was trained with; plain bilinear aliases on large downscales
+    small = downscale(img, size, cv2.INTER_AREA)
+    for c in range(3):
+        # BGR -> RGB by channel index; grayscale is repeated across channels
+        src = small if small.ndim == 2 else small[..., 2 - c]
+        np.multiply(src, _DET_SCALE[c], out=out[c], casting="unsafe")
+        out[c] += _DET_SHIFT[c]
+
+
+def prepare_xray(img: np.ndarray, classifier=True, detector=True, size=XRAY_SIZE):
+    """
+    (classifier_input, detector_input) for one decoded image, without
+    batch dimension; either may be None if not requested.
+    """
+    cls_batch, det_batch = prepare_xray_batch([img], classifier, detector, size)
+    return (
+        cls_batch[0] if cls_batch is not None else None,
+        det_batch[0] if det_batch is not None else None,
+    )
+
+def prepare_xray_batch(images, classifier=True, detector=True, size=XRAY_SIZE):
+    """
+    Batched inputs: (N, H, W, 1) for the classifier and (N, 3, H, W) for
+    the detector, both float32 and C-contiguous.
+    """
+    n = len(images)
+    w, h = size
+    cls_batch = np.empty((n, h, w, 1), dtype=np.float32) if classifier else None
+    det_batch = np.empty((n, 3, h, w), dtype=np.float32) if detector else None
+
+    for i, img in enumerate(images):
+        if classifier:
+            _write_classifier(img, cls_batch[i], size)
+        if detector:
+            _write_detector(img, det_batch[i], size)
+
+    return cls_batch, det_batch
@@ -0,0 +1,337 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Worker processes; 0 runs jobs inline in the calling thread instead
+INFERENCE_WORKERS = int(os.getenv("LIFELEN_INFERENCE_WORKERS", "1"))
+# How often dead workers are looked for, independent of traffic
+INFERENCE_HEALTH_INTERVAL = float(os.getenv("LIFELEN_INFERENCE_HEALTH_INTERVAL", "1.0"))
+# Inputs up to this size travel through shared memory instead of a pipe
+INFERENCE_SLOT_BYTES = int(float(os.getenv("LIFELEN_INFERENCE_SLOT_MB", "4")) * 1024 * 1024)
+
+
+# =====================================================
+# TASKS (run in a worker process, or inline)
+# =====================================================
+def _task_models_loaded(registry, _x, *names):
+    return all(registry[name] is not None for name in names)
+
+def _task_xray_detect(registry, x):
+    from utils.xray_inference import detector_fn_from
+    model = registry["xray_detector"]
+    return None if model is None else detector_fn_from(model)(x)
+
+def _task_xray_classify(registry, x):
+    from utils.xray_inference import classifier_fn_from
+    model = registry["xray"]
+    if model is None:
+        raise RuntimeError("X-ray model not loaded")
+    return classifier_fn_from(model)(x)
+
+def _task_tabular_proba(registry, x, condition):
+    scaler = registry[f"{condition}_scaler"]
+    model = registry[f"{condition}_model"]
+    if scaler is None or model is None:
+        raise RuntimeError(f"{condition} model/scaler not loaded")
+    return model.predict_proba(scaler.transform(x))
+
+TASKS = {
+    "models_loaded": _task_models_loaded,
+    "xray_detect": _task_xray_detect,
+    "xray_classify": _task_xray_classify,
+    "tabular_proba": _task_tabular_proba,
+}
+
+
+# =====================================================
+# WORKER PROCESS
+# =====================================================
+def _worker_main(worker_id, jobs, results, preload):
+    from utils.model_registry import build_default_registry
+
+    # Each worker owns one registry: models load once per worker
+    registry = build_default_registry()
+    if preload:
+        registry.preload(preload)
+    results.put(("ready", worker_id, True, None, 0.0))
+
+    attached = {}
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, task, arg, extra = job
+        started = time.perf_counter()
+        try:
+            if isinstance(arg, tuple) and arg and arg[0] == "shm":
+                _, shm_name, shape, dtype = arg
+                if shm_name not in attached:
+                    attached[shm_name] = shared_memory.SharedMemory(name=shm_name)
+                arg = np.ndarray(shape, dtype=dtype, buffer=attached[shm_name].buf)
+            out = TASKS[task](registry, arg, *extra)
+            results.put((job_id, worker_id, True, out, time.perf_counter() - started))
+        except Exception as e:
+            results.put((job_id, worker_id, False, f"{type(e).__name__}: {e}", time.perf_counter() - started))
+        finally:
+            arg = None  # drop the shared-memory view before the slot is reused
+
+    for shm in attached.values():
+        shm.close()
+
+
+# =====================================================
+# POOL
+# =====================================================
+class InferencePool:
+    """
+    Local inference workers, decoupled from the Streamlit script thread.
+
+    With `workers > 0`, jobs go to separate processes that each load the
+    models once. Each job is assigned to one worker's own queue when it is
+    submitted, so the parent always knows which jobs a dead worker took
+    with it; array inputs are copied into preallocated shared-memory
+    slots (their count bounds the number of in-flight jobs) and only small
+    results come back through a queue. With `workers == 0` jobs run inline
+    on the caller's thread against the shared registry (same API, but no
+    decoupling), which is meant for debugging and tiny deployments.
+    """
+
+    def __init__(self, workers=INFERENCE_WORKERS, slot_bytes=INFERENCE_SLOT_BYTES,
+                 slots=None, preload=None, registry=None):
+        self.workers = max(0, int(workers))
+        self.slot_bytes = slot_bytes
+        self.preload = preload
+        self._registry = registry
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._latencies = deque(maxlen=500)
+        self._run_times = deque(maxlen=500)
+        self._busy = {}
+        self._ready = set()
+        self._started_at = time.time()
+        self.jobs = 0
+        self.failures = 0
+        self.restarts = 0
+        self._closed = False
+        self._stop = threading.Event()
+        # Each spawned process is a "generation"; jobs are owned by one
+        self._gens = itertools.count()
+        self._worker_gen = {}
+        self._queues = {}
+        self._load = {}
+
+        self._slots = []
+        self._free_slots = queue.Queue()
+        if self.workers:
+            self._ctx = multiprocessing.get_context("spawn")
+            self._results = self._ctx.Queue()
+            for _ in range(slots or 2 * self.workers):
+                self._slots.append(shared_memory.SharedMemory(create=True, size=slot_bytes))
+                self._free_slots.put(len(self._slots) - 1)
+            self._procs = [self._spawn(i) for i in range(self.workers)]
+            self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+            self._collector.start()
+            self._monitor = threading.Thread(target=self._watch, name="inference-monitor", daemon=True)
+            self._monitor.start()
+
+    def _spawn(self, worker_id):
+        # A fresh queue per process: jobs left in a dead worker's queue are
+        # failed, never picked up by its replacement
+        gen = next(self._gens)
+        self._worker_gen[worker_id] = gen
+        self._queues[worker_id] = self._ctx.Queue()
+        self._load[gen] = 0
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._queues[worker_id], self._results, self.preload),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+        self._busy.setdefault(worker_id, 0.0)
+        return proc
+
+    # -----------------------------
+    # Submitting jobs
+    # -----------------------------
+    def submit(self, task, x=None, *extra) -> Future:
+        fut = Future()
+        submitted = time.perf_counter()
+
+        if not self.workers:
+            try:
+                registry = self._registry
+                if registry is None:
+                    from utils.model_registry import registry
+                out = TASKS[task](registry, x, *extra)
+                fut.set_result(out)
+            except Exception as e:
+                fut.set_exception(e)
+            self._record(submitted, time.perf_counter() - submitted, fut.exception() is None)
+            return fut
+
+        slot, arg = None, x
+        if isinstance(x, np.ndarray):
+            x = np.ascontiguousarray(x)
+            if x.nbytes <= self.slot_bytes:
+                slot = self._free_slots.get()  # back-pressure when all slots are in flight
+                buf = self._slots[slot]
+                np.ndarray(x.shape, dtype=x.dtype, buffer=buf.buf)[...] = x
+                arg = ("shm", buf.name, x.shape, x.dtype.str)
+            else:
+                arg = x
+
+        with self._lock:
+            job_id = next(self._ids)
+            # Least loaded live worker; put() under the lock so a restart
+            # can't swap the queue between choosing and enqueueing
+            alive = [i for i, proc in enumerate(self._procs) if proc.is_alive()] or list(self._queues)
+            worker_id = min(alive, key=lambda i: self._load[self._worker_gen[i]])
+            gen = self._worker_gen[worker_id]
+            self._load[gen] += 1
+            self._pending[job_id] = (fut, submitted, slot, gen)
+            self._queues[worker_id].put((job_id, task, arg, extra))
+        return fut
+
+    def run(self, task, x=None, *extra, timeout=120):
+        return self.submit(task, x, *extra).result(timeout=timeout)
+
+    def has_models(self, *names):
+        """True once every named model loads (in a worker, when there are workers)."""
+        try:
+            return bool(self.run("models_loaded", None, *names))
+        except Exception:
+            return False
+
+    # -----------------------------
+    # Results
+    # -----------------------------
+    def _record(self, submitted, run_time, ok, worker_id=None):
+        with self._lock:
+            self.jobs += 1
+            self.failures += not ok
+            self._latencies.append(time.perf_counter() - submitted)
+            self._run_times.append(run_time)
+            if worker_id is not None:
+                self._busy[worker_id] = self._busy.get(worker_id, 0.0) + run_time
+
+    def _collect(self):
+        while not self._closed:
+            try:
+                job_id, worker_id, ok, out, run_time = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            if job_id == "ready":
+                with self._lock:
+                    self._ready.add(worker_id)
+                continue
+            if job_id == "dead":
+                self._fail_orphans(worker_id, out)
+                continue
+
+            with self._lock:
+                fut, submitted, slot, gen = self._pending.pop(job_id, (None, None, None, None))
+                if gen in self._load:
+                    self._load[gen] -= 1
+            if fut is None:
+                continue
+            if slot is not None:
+                self._free_slots.put(slot)
+            self._record(submitted, run_time, ok, worker_id)
+            if ok:
+                fut.set_result(out)
+            else:
+                fut.set_exception(RuntimeError(out))
+
+    def _fail_orphans(self, worker_id, gen):
+        """Fail (not retry) every job still owned by a dead worker generation."""
+        with self._lock:
+            orphans = [job_id for job_id, job in self._pending.items() if job[3] == gen]
+            orphans = [self._pending.pop(job_id) for job_id in orphans]
+            self._load.pop(gen, None)
+        for fut, submitted, slot, _ in orphans:
+            if slot is not None:
+                self._free_slots.put(slot)
+            self._record(submitted, 0.0, False)
+            fut.set_exception(RuntimeError(f"Inference worker {worker_id} exited before finishing this job"))
+
+    def _watch(self):
+        while not self._stop.wait(INFERENCE_HEALTH_INTERVAL):
+            self._check_workers()
+
+    def _check_workers(self):
+        """
+        Restart dead workers. The jobs a dead worker owned (running or
+        still queued for it) are failed, but only after the collector has
+        seen every result the worker sent before dying: the "dead" marker
+        goes through the same results queue, behind those results.
+        """
+        for i, proc in enumerate(self._procs):
+            if self._closed or proc.is_alive():
+                continue
+            print(f"Inference worker {i} exited ({proc.exitcode}); restarting")
+            with self._lock:
+                self._ready.discard(i)
+                self.restarts += 1
+                dead_gen, dead_jobs = self._worker_gen[i], self._queues[i]
+                self._procs[i] = self._spawn(i)
+            # Nobody reads the old queue any more; don't block exit flushing it
+            dead_jobs.cancel_join_thread()
+            dead_jobs.close()
+            self._results.put(("dead", i, False, dead_gen, 0.0))
+
+    # -----------------------------
+    # Monitoring
+    # -----------------------------
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            run_times = list(self._run_times)
+            uptime = max(time.time() - self._started_at, 1e-9)
+
+            def pct(xs, q):
+                return round(xs[int(q * (len(xs) - 1))] * 1000.0, 2) if xs else None
+
+            return {
+                "mode": "processes" if self.workers else "inline",
+                "workers": self.workers,
+                "workers_ready": len(self._ready),
+                "queue_depth": len(self._pending),
+                "free_slots": self._free_slots.qsize() if self.workers else None,
+                "jobs": self.jobs,
+                "failures": self.failures,
+                "restarts": self.restarts,
+                "latency_ms_p50": pct(latencies, 0.50),
+                "latency_ms_p95": pct(latencies, 0.95),
+                "run_ms_avg": round(sum(run_times) / len(run_times) * 1000.0, 2) if run_times else None,
+                "utilisation": {
+                    f"worker-{i}": round(busy / uptime, 4) for i, busy in sorted(self._busy.items())
+                },
+            }
+
+    def close(self):
+        if not self.workers or self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        for jobs in self._queues.values():
+            jobs.put(None)
+        for proc in self._procs:
+            proc.join(timeout=5)
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+        self._slots = []
@@ -0,0 +1,152 @@
+import re
+from datetime import datetime
+
+# =====================================================
+# ANALYTE GRAMMAR
+# =====================================================
+# Each analyte: label aliases, accepted units with a factor to the
+# canonical unit, and a plausible range (in the canonical unit) used to
+# drop OCR noise such as reference ranges or page numbers.
+#
+#   "analyte": (aliases, canonical unit, {unit: factor}, (low, high))
+ANALYTES = {
+    "glucose": (
+        [r"fasting\s+(?:blood\s+|plasma\s+)?glucose", r"(?:blood\s+|plasma\s+)?glucose",
+         r"\bFBS\b", r"\bFBG\b", r"blood\s+sugar"],
+        "mg/dL", {"mg/dl": 1.0, "mmol/l": 18.016}, (20, 800),
+    ),
+    "hba1c": (
+        [r"hb\s*a1c", r"a1c", r"glycated\s+ha?emoglobin", r"glycosylated\s+ha?emoglobin"],
+        "%", {"%": 1.0}, (3, 20),
+    ),
+    "cholesterol": (
+        [r"total\s+cholesterol", r"cholesterol(?:,?\s*total)?"],
+        "mg/dL", {"mg/dl": 1.0, "mmol/l": 38.67}, (50, 1000),
+    ),
+    "hdl": (
+        [r"\bhdl(?:[\s-]*cholesterol)?(?:[\s-]*c)?\b"],
+        "mg/dL", {"mg/dl": 1.0, "mmol/l": 38.67}, (5, 200),
+    ),
+    "ldl": (
+        [r"\bldl(?:[\s-]*cholesterol)?(?:[\s-]*c)?\b"],
+        "mg/dL", {"mg/dl": 1.0, "mmol/l": 38.67}, (10, 500),
+    ),
+    "triglycerides": (
+        [r"triglycerides?", r"\bTG\b"],
+        "mg/dL", {"mg/dl": 1.0, "mmol/l": 88.57}, (10, 5000),
+    ),
+    "insulin": (
+        [r"(?:fasting\s+)?insulin"],
+        "uU/mL", {"uu/ml": 1.0, "µu/ml": 1.0, "μu/ml": 1.0, "miu/l": 1.0, "pmol/l": 1 / 6.0}, (0.5, 900),
+    ),
+    "bmi": (
+        [r"\bBMI\b", r"body\s+mass\s+index"],
+        "kg/m2", {"kg/m2": 1.0, "kg/m²": 1.0}, (10, 80),
+    ),
+    "heart_rate": (
+        [r"heart\s+rate", r"pulse(?:\s+rate)?", r"\bHR\b"],
+        "bpm", {"bpm": 1.0, "/min": 1.0, "beats/min": 1.0}, (25, 250),
+    ),
+    "age": (
+        [r"\bage\b"],
+        "years", {"years": 1.0, "yrs": 1.0, "y": 1.0}, (1, 120),
+    ),
+}
+
+_NUMBER = r"(\d{1,4}(?:[.,]\d{1,3})?)"
+_UNIT = r"(mg/dl|mmol/l|%|[uµμ]u/ml|miu/l|pmol/l|kg/m2|kg/m²|bpm|beats/min|/min|years|yrs|y)?"
+# label, optional ":"/"-"/"=" or "(...)" qualifier, value, optional unit
+_SEPARATOR = r"[^\S\n]*(?:\([^)\n]{0,20}\))?[^\S\n]*[:=\-]?[^\S\n]*"
+
+PATTERNS = [
+    (name, re.compile(
+        r"(?:" + "|".join(aliases) + r")" + _SEPARATOR + _NUMBER + r"[^\S\n]*" + _UNIT,
+        re.IGNORECASE,
+    ))
+    for name, (aliases, _, _, _) in ANALYTES.items()
+]
+
+# A match directly preceded by one of these belongs to another analyte
+# ("HDL-Cholesterol" is not total cholesterol, "non-HDL" is not HDL)
+EXCLUDED_PREFIXES = {
+    "cholesterol": re.compile(r"(?:\b(?:non[\s-]*)?hdl|\bv?ldl)[\s-]*$", re.IGNORECASE),
+    "hdl": re.compile(r"\bnon[\s-]*$", re.IGNORECASE),
+}
+
+BP_PATTERN = re.compile(
+    r"(?:blood\s+pressure|\bBP\b)" + _SEPARATOR + r"(\d{2,3})\s*/\s*(\d{2,3})\s*(?:mm\s*hg)?",
+    re.IGNORECASE,
+)
+
+DATE_PATTERNS = [
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), ("y", "m", "d")),
+    (re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b"), ("d", "m", "y")),
+]
+DATE_LABEL = re.compile(r"(?:report|collect(?:ed|ion)|sample|test)?\s*date", re.IGNORECASE)
+
+
+# =====================================================
+# PARSING
+# =====================================================
+def _to_float(text):
+    return float(text.replace(",", "."))
+
+def parse_lab_values(text: str):
+    """
+    Structured analytes found in report text.
+
+    Returns a dict analyte -> {"value", "unit", "raw"} with values in the
+    canonical unit. The first plausible match for each analyte wins;
+    blood pressure is split into "systolic_bp" / "diastolic_bp".
+    """
+    values = {}
+
+    for name, pattern in PATTERNS:
+        _, unit, factors, (low, high) = ANALYTES[name]
+        excluded = EXCLUDED_PREFIXES.get(name)
+        for match in pattern.finditer(text):
+            if excluded and excluded.search(text[max(0, match.start() - 12):match.start()]):
+                continue
+            found_unit = (match.group(2) or "").lower()
+            factor = factors.get(found_unit, 1.0 if not found_unit else None)
+            if factor is None:
+                continue
+            value = round(_to_float(match.group(1)) * factor, 2)
+            if low <= value <= high:
+                values[name] = {"value": value, "unit": unit, "raw": match.group(0).strip()}
+                break
+
+    match = BP_PATTERN.search(text)
+    if match:
+        systolic, diastolic = int(match.group(1)), int(match.group(2))
+        if 60 <= systolic <= 260 and 30 <= diastolic <= 160 and diastolic < systolic:
+            raw = match.group(0).strip()
+            values["systolic_bp"] = {"value": float(systolic), "unit": "mmHg", "raw": raw}
+            values["diastolic_bp"] = {"value": float(diastolic), "unit": "mmHg", "raw": raw}
+
+    return values
+
+def parse_report_date(text: str):
+    """Report date as "YYYY-MM-DD" (prefers a labelled date), or None."""
+    candidates = []
+    for pattern, order in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            parts = dict(zip(order, (int(g) for g in match.groups())))
+            try:
+                day = datetime(parts["y"], parts["m"], parts["d"])
+            except ValueError:
+                continue
+            labelled = DATE_LABEL.search(text[max(0, match.start() - 30):match.start()]) is not None
+            candidates.append((not labelled, match.start(), day))
+    if not candidates:
+        return None
+    return min(candidates)[2].strftime("%Y-%m-%d")
+
+def describe_lab_values(values) -> str:
+    """Short one-line description, e.g. "Glucose 142 mg/dL, HbA1c 6.8 %"."""
+    names = {"hba1c": "HbA1c", "bmi": "BMI", "hdl": "HDL", "ldl": "LDL",
+             "systolic_bp": "Systolic BP", "diastolic_bp": "Diastolic BP"}
+    return ", ".join(
+        f"{names.get(k, k.replace('_', ' ').title())} {v['value']:g} {v['unit']}"
+        for k, v in sorted(values.items())
+    )
@@ -0,0 +1,131 @@
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+import types
+
+# module name -> {"seconds": float, "already_loaded": bool, "loaded_at": float}
+_IMPORT_TIMES = {}
+_LAZY_MODULES = {}
+_lock = threading.RLock()
+
+
+# =====================================================
+# DEFERRED IMPORTS
+# =====================================================
+class LazyModule(types.ModuleType):
+    """
+    Placeholder that imports the real module on first attribute access.
+
+    `torch = lazy_import("torch")` at module top costs nothing; the import
+    (and its timing, for the diagnostics report) happens the first time a
+    page actually touches `torch.something`.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = timed_import(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "deferred"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a module proxy; the real import runs on first use."""
+    if name not in _LAZY_MODULES:
+        _LAZY_MODULES[name] = LazyModule(name)
+    return _LAZY_MODULES[name]
+
+
+def timed_import(name):
+    """Import `name` now and record how long it took."""
+    already_loaded = name in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+
+    if name not in _IMPORT_TIMES:
+        _IMPORT_TIMES[name] = {
+            "seconds": elapsed,
+            "already_loaded": already_loaded,
+            "loaded_at": time.time(),
+        }
+    return module
+
+
+# =====================================================
+# DIAGNOSTICS
+# =====================================================
+def import_report():
+    """Per-module import cost observed in this process (deferred modules included)."""
+    rows = []
+    for name in sorted(set(_LAZY_MODULES) | set(_IMPORT_TIMES)):
+        info = _IMPORT_TIMES.get(name)
+        rows.append({
+            "module": name,
+            "loaded": info is not None,
+            "import_ms": round(info["seconds"] * 1000.0, 1) if info else None,
+            "already_loaded": info["already_loaded"] if info else None,
+        })
+    return sorted(rows, key=lambda r: -(r["import_ms"] or 0))
+
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile_cold_imports(modules, top=25, timeout=120):
+    """
+    Import each module in a fresh interpreter with `python -X importtime`
+    and return the top entries by cumulative time (microseconds).
+    """
+    rows = []
+    for name in modules:
+        try:
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {name}"],
+                capture_output=True, text=True, timeout=timeout,
+            )
+        except Exception as e:
+            rows.append({"requested": name, "module": name, "self_us": None,
+                         "cumulative_us": None, "depth": 0, "error": str(e)})
+            continue
+
+        if proc.returncode != 0:
+            err = proc.stderr.strip().splitlines()[-1:] or ["import failed"]
+            rows.append({"requested": name, "module": name, "self_us": None,
+                         "cumulative_us": None, "depth": 0, "error": err[0]})
+            continue
+
+        entries = []
+        for line in proc.stderr.splitlines():
+            m = _IMPORTTIME_LINE.match(line)
+            if m:
+                entries.append({
+                    "requested": name,
+                    "module": m.group(4),
+                    "self_us": int(m.group(1)),
+                    "cumulative_us": int(m.group(2)),
+                    "depth": (len(m.group(3)) - 1) // 2,
+                    "error": None,
+                })
+        entries.sort(key=lambda r: -r["cumulative_us"])
+        rows.extend(entries[:top])
+    return rows
@@ -0,0 +1,407 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from utils.lazy_imports import timed_import
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+XRAY_DETECTOR_CLASSES = ["NORMAL", "PNEUMONIA", "NON_XRAY"]
+
+
+# =====================================================
+# LOADERS
+# =====================================================
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+# -----------------------------
+# Thread configuration
+# -----------------------------
+# Several Streamlit sessions share one process; left alone, TF and torch
+# each size their pools to every core and oversubscribe. 0 keeps the
+# framework default.
+TORCH_THREADS = int(os.getenv("LIFELEN_TORCH_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.getenv("LIFELEN_TORCH_INTEROP_THREADS", "0"))
+TF_INTRA_OP_THREADS = int(os.getenv("LIFELEN_TF_INTRA_OP_THREADS", "0"))
+TF_INTER_OP_THREADS = int(os.getenv("LIFELEN_TF_INTER_OP_THREADS", "0"))
+
+_threads_configured = set()
+
+def configure_threads(framework, module):
+    """Apply the thread settings once per process, before the first model runs."""
+    if framework in _threads_configured:
+        return
+    _threads_configured.add(framework)
+    try:
+        if framework == "torch":
+            if TORCH_THREADS:
+                module.set_num_threads(TORCH_THREADS)
+            if TORCH_INTEROP_THREADS:
+                module.set_num_interop_threads(TORCH_INTEROP_THREADS)
+        elif framework == "tensorflow":
+            if TF_INTRA_OP_THREADS:
+                module.config.threading.set_intra_op_parallelism_threads(TF_INTRA_OP_THREADS)
+            if TF_INTER_OP_THREADS:
+                module.config.threading.set_inter_op_parallelism_threads(TF_INTER_OP_THREADS)
+    except RuntimeError as e:
+        # Raised once the runtime has already started its pools
+        print(f"{framework} thread settings not applied: {e}")
+
+def load_keras(path):
+    tf = timed_import("tensorflow")
+    configure_threads("tensorflow", tf)
+    return tf.keras.models.load_model(path)
+
+def load_resnet_detector(path):
+    torch = timed_import("torch")
+    configure_threads("torch", torch)
+    models = timed_import("torchvision.models")
+
+    model = models.resnet18(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, len(XRAY_DETECTOR_CLASSES))
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    model.eval()
+    return model
+
+# -----------------------------
+# ONNX Runtime backend
+# -----------------------------
+ORT_INTRA_OP_THREADS = int(os.getenv("LIFELEN_ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.getenv("LIFELEN_ORT_INTER_OP_THREADS", "0"))
+
+class OnnxModel:
+    """
+    ONNX Runtime session with the Keras-style `predict(batch)` the app
+    already uses; returns the first output as a NumPy array.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, path, intra_op_threads=ORT_INTRA_OP_THREADS,
+                 inter_op_threads=ORT_INTER_OP_THREADS):
+        ort = timed_import("onnxruntime")
+        options = ort.SessionOptions()
+        # 0 lets ONNX Runtime pick (one thread per physical core)
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+    def __call__(self, batch):
+        return self.predict(batch)
+
+def load_onnx(path):
+    return OnnxModel(path)
+
+# -----------------------------
+# Warm-up
+# -----------------------------
+# The first call pays for graph construction and allocator growth, so
+# heavy models run a few synthetic inferences right after loading.
+WARMUP_RUNS = int(os.getenv("LIFELEN_WARMUP_RUNS", "2"))
+WARMUP_BATCH_SIZES = [int(b) for b in os.getenv("LIFELEN_WARMUP_BATCH_SIZES", "1").split(",") if b.strip()]
+
+def warmup_model(model, input_shape, runs=WARMUP_RUNS, batch_sizes=None):
+    """Run `runs` zero-input inferences per batch size; returns seconds spent."""
+    started = time.perf_counter()
+    for batch_size in batch_sizes or WARMUP_BATCH_SIZES:
+        x = np.zeros((batch_size,) + tuple(input_shape), dtype=np.float32)
+        for _ in range(runs):
+            if hasattr(model, "predict"):
+                model.predict(x, verbose=0)
+            else:
+                torch = timed_import("torch")
+                with torch.no_grad():
+                    model(torch.from_numpy(x))
+    return time.perf_counter() - started
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# =====================================================
+# REGISTRY
+# =====================================================
+class _Entry:
+    def __init__(self, name, path, loader, heavy, input_shape=None):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.heavy = heavy
+        self.input_shape = input_shape
+        self.lock = threading.Lock()
+
+        self.model = None
+        self.loaded = False
+        self.error = None
+        self.mtime_ns = None
+        self.sha256 = None
+        self.size_bytes = 0
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.warmed = False
+        self.last_used = 0.0
+        self.last_checked = 0.0
+        self.loads = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide, lazily populated model cache.
+
+    Models are loaded on first `get()`, reloaded when the file on disk
+    changes (mtime first, then content hash), and heavy models are evicted
+    least-recently-used first once their on-disk size exceeds
+    `memory_budget_mb` (0 disables eviction).
+
+    Supports `registry["name"]` so it can stand in for the old dicts;
+    a model that fails to load is returned as None.
+    """
+
+    def __init__(self, memory_budget_mb=0, check_interval=2.0):
+        self.memory_budget = int(float(memory_budget_mb) * 1024 * 1024)
+        self.check_interval = float(check_interval)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, loader, heavy=False, input_shape=None):
+        """`input_shape` (without batch) enables warm-up after each load."""
+        self._entries[name] = _Entry(name, path, loader, heavy, input_shape)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def keys(self):
+        return list(self._entries)
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def get(self, name):
+        entry = self._entries[name]
+        entry.last_used = time.time()
+
+        if entry.loaded and not self._needs_check(entry):
+            return entry.model
+
+        with entry.lock:
+            if not entry.loaded or self._changed_on_disk(entry):
+                self._load(entry)
+
+        if entry.heavy and entry.model is not None:
+            self._enforce_budget(keep=name)
+
+        return entry.model
+
+    def _needs_check(self, entry):
+        now = time.time()
+        if now - entry.last_checked < self.check_interval:
+            return False
+        entry.last_checked = now
+        return True
+
+    def _changed_on_disk(self, entry):
+        if not entry.loaded:
+            return True
+        try:
+            mtime_ns = os.stat(entry.path).st_mtime_ns
+        except OSError:
+            return entry.mtime_ns is not None
+        if mtime_ns == entry.mtime_ns:
+            return False
+        if entry.sha256 is None:
+            return True
+
+        # mtime moved (touch, copy, checkout) — only reload on new content
+        try:
+            digest = file_sha256(entry.path)
+        except OSError:
+            return True
+        if digest == entry.sha256:
+            entry.mtime_ns = mtime_ns
+            return False
+        return True
+
+    def _load(self, entry):
+        started = time.perf_counter()
+        try:
+            stat = os.stat(entry.path)
+            entry.mtime_ns = stat.st_mtime_ns
+            entry.size_bytes = stat.st_size
+            entry.sha256 = file_sha256(entry.path)
+        except OSError:
+            entry.mtime_ns = None
+            entry.sha256 = None
+
+        # A failed load is remembered until the file changes on disk
+        entry.warmed = False
+        try:
+            entry.model = entry.loader(entry.path)
+            entry.error = None
+            entry.loads += 1
+            print(f"Loaded {entry.name} from {os.path.basename(entry.path)}")
+        except Exception as e:
+            entry.model = None
+            entry.error = str(e)
+            print(f"{entry.name} load failed: {e}")
+        entry.loaded = True
+        entry.load_seconds = time.perf_counter() - started
+
+        if entry.model is not None and entry.input_shape is not None and WARMUP_RUNS > 0:
+            try:
+                entry.warmup_seconds = warmup_model(entry.model, entry.input_shape)
+            except Exception as e:
+                print(f"{entry.name} warm-up failed: {e}")
+        entry.warmed = entry.model is not None
+        entry.last_checked = time.time()
+
+    # -----------------------------
+    # Eviction
+    # -----------------------------
+    def _enforce_budget(self, keep=None):
+        if self.memory_budget <= 0:
+            return
+
+        with self._lock:
+            resident = [
+                e for e in self._entries.values()
+                if e.heavy and e.model is not None
+            ]
+            total = sum(e.size_bytes for e in resident)
+
+            for e in sorted(resident, key=lambda e: e.last_used):
+                if total <= self.memory_budget:
+                    break
+                if e.name == keep:
+                    continue
+                total -= e.size_bytes
+                self.evict(e.name)
+
+    def evict(self, name):
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.model is not None:
+                print(f"Evicted {name} from model registry")
+            entry.model = None
+            entry.loaded = False
+            entry.warmed = False
+
+    def reload(self, name):
+        entry = self._entries[name]
+        with entry.lock:
+            self._load(entry)
+        return entry.model
+
+    def preload(self, names=None):
+        for name in names or self.keys():
+            self.get(name)
+
+    def ready(self, names=None):
+        """True once every named model has loaded (and warmed up) successfully."""
+        return all(
+            self._entries[name].warmed and self._entries[name].model is not None
+            for name in names or self.keys()
+        )
+
+    def status(self):
+        return [
+            {
+                "name": e.name,
+                "file": os.path.basename(e.path),
+                "heavy": e.heavy,
+                "loaded": e.model is not None,
+                "size_mb": round(e.size_bytes / (1024 * 1024), 2),
+                "load_seconds": round(e.load_seconds, 3),
+                "warmup_seconds": round(e.warmup_seconds, 3),
+                "loads": e.loads,
+                "last_used": e.last_used,
+                "error": e.error,
+            }
+            for e in self._entries.values()
+        ]
+
+
+# =====================================================
+# DEFAULT (SHARED) REGISTRY
+# =====================================================
+# "native" serves the .h5/.pth files with TensorFlow/PyTorch, "onnx" the
+# exported .onnx files (see models/export_onnx.py) with ONNX Runtime.
+MODEL_BACKEND = os.getenv("LIFELEN_MODEL_BACKEND", "native")
+# "int8" serves the quantized exports (models/quantize_xray.py) with
+# ONNX Runtime, whatever the backend setting
+MODEL_PRECISION = os.getenv("LIFELEN_MODEL_PRECISION", "fp32")
+
+XRAY_MODEL_FILES = {
+    # name: (native file, native loader)
+    "xray": ("chest_xray_model.h5", load_keras),
+    "xray_detector": ("xray_detector_best.pth", load_resnet_detector),
+}
+XRAY_INPUT_SHAPES = {
+    "xray": (224, 224, 1),
+    "xray_detector": (3, 224, 224),
+}
+
+def onnx_path(native_path):
+    return os.path.splitext(native_path)[0] + ".onnx"
+
+def int8_path(native_path):
+    return os.path.splitext(native_path)[0] + ".int8.onnx"
+
+def register_xray_models(reg, backend=MODEL_BACKEND, precision=MODEL_PRECISION):
+    if backend not in ("native", "onnx"):
+        raise ValueError(f"Unknown model backend: {backend}")
+    if precision not in ("fp32", "int8"):
+        raise ValueError(f"Unknown model precision: {precision}")
+
+    for name, (filename, loader) in XRAY_MODEL_FILES.items():
+        path = os.path.join(MODELS_DIR, filename)
+        candidates = []
+        if precision == "int8":
+            candidates.append(int8_path(path))
+        if backend == "onnx" or precision == "int8":
+            candidates.append(onnx_path(path))
+
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                path, loader = candidate, load_onnx
+                break
+        else:
+            if candidates:
+                print(f"{name}: no {precision} ONNX export next to {filename}, using the native model")
+        reg.register(name, path, loader, heavy=True, input_shape=XRAY_INPUT_SHAPES[name])
+
+def build_default_registry(backend=MODEL_BACKEND, precision=MODEL_PRECISION):
+    reg = ModelRegistry(
+        memory_budget_mb=os.getenv("LIFELEN_MODEL_MEMORY_MB", "0"),
+        check_interval=os.getenv("LIFELEN_MODEL_CHECK_SECONDS", "2"),
+    )
+
+    register_xray_models(reg, backend, precision)
+
+    for condition in ("diabetes", "heart", "cancer"):
+        reg.register(f"{condition}_model", os.path.join(MODELS_DIR, f"{condition}_model.pkl"), load_pickle)
+        reg.register(f"{condition}_scaler", os.path.join(MODELS_DIR, f"{condition}_scaler.pkl"), load_pickle)
+
+    return reg
+
+registry = build_default_registry()
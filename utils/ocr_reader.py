@@ -0,0 +1,204 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.lazy_imports import timed_import
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OCR_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "ocr")
+
+# Bump when extraction logic changes so cached results are not reused
+OCR_VERSION = "1"
+# Pages with fewer characters than this in their text layer are OCR'd
+MIN_TEXT_CHARS = 20
+OCR_DPI = int(os.getenv("LIFELEN_OCR_DPI", "200"))
+OCR_WORKERS = int(os.getenv("LIFELEN_OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+# =====================================================
+# WORKER SIDE (runs in the process pool)
+# =====================================================
+# Each worker keeps the last opened PDF so consecutive pages of the same
+# document are not re-parsed.
+_worker_pdf = {"path": None, "pdf": None}
+
+def _open_pdf(path):
+    if _worker_pdf["path"] != path:
+        if _worker_pdf["pdf"] is not None:
+            _worker_pdf["pdf"].close()
+        pdfplumber = timed_import("pdfplumber")
+        _worker_pdf["pdf"] = pdfplumber.open(path)
+        _worker_pdf["path"] = path
+    return _worker_pdf["pdf"]
+
+def _ocr_image(image, lang):
+    pytesseract = timed_import("pytesseract")
+    return pytesseract.image_to_string(image, lang=lang)
+
+def _pdf_page_task(path, index, lang, dpi):
+    """Text layer if the page has one, otherwise OCR of the rendered page."""
+    page = _open_pdf(path).pages[index]
+    text = page.extract_text() or ""
+    if len(text.strip()) >= MIN_TEXT_CHARS:
+        return index, text, "text"
+    image = page.to_image(resolution=dpi).original
+    return index, _ocr_image(image, lang), "ocr"
+
+def _image_task(path, index, lang, dpi):
+    Image = timed_import("PIL.Image")
+    with Image.open(path) as img:
+        img.seek(index)
+        return index, _ocr_image(img.convert("RGB"), lang), "ocr"
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+class OcrPipeline:
+    """
+    Page-parallel text extraction for uploaded reports.
+
+    `iter_pages()` yields one dict per page as soon as it completes
+    (not necessarily in page order), so the UI can show partial text.
+    Finished documents are cached by content hash in memory and under
+    .cache/ocr, so re-uploading the same file is instant.
+    """
+
+    def __init__(self, workers=OCR_WORKERS, cache_dir=OCR_CACHE_DIR, max_memory_entries=32):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Cache
+    # -----------------------------
+    @staticmethod
+    def digest(data, lang):
+        return hashlib.sha256(f"{OCR_VERSION}:{lang}:".encode("utf-8") + data).hexdigest()
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def cached(self, digest):
+        with self._lock:
+            pages = self._memory.get(digest)
+            if pages is not None:
+                self._memory.move_to_end(digest)
+                return pages
+        try:
+            with open(self._cache_path(digest), "r", encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(digest, pages)
+        return pages
+
+    def _remember(self, digest, pages):
+        with self._lock:
+            self._memory[digest] = pages
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, digest, pages):
+        self._remember(digest, pages)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".json", dir=self.cache_dir)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": OCR_VERSION, "pages": pages}, f)
+            os.replace(tmp_path, self._cache_path(digest))
+        except OSError as e:
+            print(f"OCR cache write failed: {e}")
+
+    # -----------------------------
+    # Execution
+    # -----------------------------
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: the Streamlit/Flask parent is multi-threaded
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    @staticmethod
+    def _page_count(path, is_pdf):
+        if is_pdf:
+            pdfplumber = timed_import("pdfplumber")
+            with pdfplumber.open(path) as pdf:
+                return len(pdf.pages)
+        Image = timed_import("PIL.Image")
+        with Image.open(path) as img:
+            return getattr(img, "n_frames", 1)
+
+    def iter_pages(self, data, is_pdf, lang="eng", dpi=OCR_DPI):
+        """
+        Yield {"index", "count", "text", "method", "cached"} per page.
+        `method` is "text" (PDF text layer) or "ocr".
+        """
+        digest = self.digest(data, lang)
+        pages = self.cached(digest)
+        if pages is not None:
+            for page in pages:
+                yield dict(page, count=len(pages), cached=True)
+            return
+
+        # Workers read the document from a private temp file, not pickled bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".pdf" if is_pdf else ".img", dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        futures = []
+        try:
+            count = self._page_count(path, is_pdf)
+            task = _pdf_page_task if is_pdf else _image_task
+            results = [None] * count
+
+            if self.workers <= 0 or count == 1:
+                done = (task(path, i, lang, dpi) for i in range(count))
+            else:
+                pool = self._get_pool()
+                futures = [pool.submit(task, path, i, lang, dpi) for i in range(count)]
+                done = (f.result() for f in as_completed(futures))
+
+            for index, text, method in done:
+                page = {"index": index, "text": text, "method": method}
+                results[index] = page
+                yield dict(page, count=count, cached=False)
+
+            self._store(digest, results)
+        finally:
+            # Also reached when the caller stops early (e.g. a Streamlit rerun)
+            for f in futures:
+                f.cancel()
+            if os.path.exists(path):
+                os.remove(path)
+
+    def extract_text(self, data, is_pdf, lang="eng"):
+        """Whole document text in page order (blocking)."""
+        pages = sorted(self.iter_pages(data, is_pdf, lang), key=lambda p: p["index"])
+        return join_pages(pages)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+def join_pages(pages):
+    return "\n".join(p["text"].rstrip("\n") for p in pages if p["text"].strip())
+
+ocr_pipeline = OcrPipeline()
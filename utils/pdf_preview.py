@@ -0,0 +1,72 @@
+import hashlib
+import io
+import threading
+
+from utils.artifact_cache import artifact_cache
+from utils.lazy_imports import timed_import
+
+# Bump when the thumbnail rendering changes so cached PNGs are rebuilt
+PREVIEW_VERSION = "1"
+THUMB_WIDTH = 360
+PREVIEW_PAGES = 4
+
+_page_counts = {}
+_lock = threading.Lock()
+
+
+# =====================================================
+# PDF THUMBNAILS
+# =====================================================
+def document_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def pdf_page_count(data: bytes, digest=None) -> int:
+    digest = digest or document_digest(data)
+    with _lock:
+        count = _page_counts.get(digest)
+    if count is None:
+        pdfplumber = timed_import("pdfplumber")
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            count = len(pdf.pages)
+        with _lock:
+            _page_counts[digest] = count
+    return count
+
+def pdf_thumbnails(data: bytes, start=0, count=PREVIEW_PAGES, width=THUMB_WIDTH,
+                   digest=None, cache=artifact_cache):
+    """
+    PNG thumbnail paths for pages [start, start + count).
+
+    Thumbnails are content-addressed in the artifact cache, so each page
+    is rendered once per file and width; the PDF is only parsed when at
+    least one requested page is missing.
+    """
+    digest = digest or document_digest(data)
+    stop = min(start + count, pdf_page_count(data, digest))
+    opened = {}
+
+    def open_pdf():
+        if "pdf" not in opened:
+            pdfplumber = timed_import("pdfplumber")
+            opened["pdf"] = pdfplumber.open(io.BytesIO(data))
+        return opened["pdf"]
+
+    def builder(index):
+        def build(path):
+            page = open_pdf().pages[index]
+            image = page.to_image(width=width).original.convert("RGB")
+            image.save(path, format="PNG", optimize=True)
+        return build
+
+    try:
+        return [
+            cache.get_or_build(
+                "pdf_thumb", PREVIEW_VERSION,
+                {"sha256": digest, "page": index, "width": width},
+                builder(index), suffix=".png",
+            )
+            for index in range(start, stop)
+        ]
+    finally:
+        if "pdf" in opened:
+            opened["pdf"].close()
@@ -0,0 +1,214 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+def stub_backend(condition: str, label: str, confidence: float) -> str:
+    """Deterministic local backend for tests and offline development."""
+    return (
+        f"Condition: {condition}\n"
+        f"Result: {label} ({confidence:.1f}% confidence).\n"
+        "[stub summary] Please consult a qualified doctor for interpretation."
+    )
+
+def openai_backend(client, prompt_fn, model="gpt-4o-mini"):
+    """Wrap an OpenAI client; `prompt_fn(condition, label, confidence)` builds the prompt."""
+    def generate(condition, label, confidence):
+        res = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt_fn(condition, label, confidence)}]
+        )
+        return res.choices[0].message.content.strip()
+    return generate
+
+
+class SqliteSummaryStore:
+    """Persist summaries in the app database (see utils/database.py)."""
+
+    def __init__(self):
+        from utils.database import create_table
+        create_table()
+
+    def get(self, key, max_age):
+        from utils.database import fetch_cached_summary
+        return fetch_cached_summary(key, max_age)
+
+    def put(self, key, text):
+        from utils.database import store_cached_summary
+        store_cached_summary(key, text)
+
+
+# =====================================================
+# SUMMARY SERVICE
+# =====================================================
+class SummaryService:
+    """
+    Cached, coalesced, asynchronous AI summaries.
+
+    Summaries depend only on (condition, label, confidence), so confidence
+    is rounded to `bucket` percent and the triple is used as the cache key.
+    Results live in an in-memory LRU with a TTL and, if `store` is given,
+    in a persistent store (`store.get(key, max_age)` / `store.put(key, text)`).
+    Concurrent requests for the same key share one backend call.
+    """
+
+    def __init__(self, backend, name="default", bucket=1.0, max_entries=512,
+                 ttl=24 * 3600, store=None, max_workers=4):
+        self.backend = backend
+        self.name = name
+        self.bucket = float(bucket)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._errors = {}
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"summary-{name}")
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    # -----------------------------
+    # Keys
+    # -----------------------------
+    def bucketed(self, confidence):
+        confidence = float(confidence)
+        if self.bucket <= 0:
+            return confidence
+        return round(round(confidence / self.bucket) * self.bucket, 4)
+
+    def key(self, condition, label, confidence):
+        return (self.name, condition, label, self.bucketed(confidence))
+
+    @staticmethod
+    def key_id(key):
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+    # -----------------------------
+    # Cache
+    # -----------------------------
+    def _cache_get(self, key):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                return None
+            stored_at, text = hit
+            if time.time() - stored_at > self.ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return text
+
+    def _cache_put(self, key, text):
+        with self._lock:
+            self._cache[key] = (time.time(), text)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def cached(self, condition, label, confidence):
+        """Summary text if already cached in memory, else None (never blocks)."""
+        return self._cache_get(self.key(condition, label, confidence))
+
+    # -----------------------------
+    # Generation
+    # -----------------------------
+    def submit(self, condition, label, confidence) -> Future:
+        """Return a Future for the summary; cached and in-flight keys are reused."""
+        key = self.key(condition, label, confidence)
+
+        text = self._cache_get(key)
+        if text is not None:
+            self.hits += 1
+            fut = Future()
+            fut.set_result(text)
+            return fut
+
+        with self._lock:
+            self._ids[self.key_id(key)] = key
+            self._ids.move_to_end(self.key_id(key))
+            while len(self._ids) > 4 * self.max_entries:
+                self._ids.popitem(last=False)
+
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut
+            fut = Future()
+            self._inflight[key] = fut
+            self._errors.pop(key, None)
+            self.misses += 1
+
+        self._executor.submit(self._generate, key, fut)
+        return fut
+
+    def get(self, condition, label, confidence, timeout=None) -> str:
+        return self.submit(condition, label, confidence).result(timeout=timeout)
+
+    def _generate(self, key, fut):
+        _, condition, label, confidence = key
+        store_key = self.key_id(key)
+        try:
+            text = None
+            if self.store is not None:
+                text = self.store.get(store_key, self.ttl)
+            if text is None:
+                text = self.backend(condition, label, confidence)
+                if self.store is not None:
+                    self.store.put(store_key, text)
+            self._cache_put(key, text)
+            fut.set_result(text)
+        except Exception as e:
+            self.failures += 1
+            with self._lock:
+                self._errors[key] = str(e)
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    # -----------------------------
+    # Lookup by id (for polling APIs)
+    # -----------------------------
+    def lookup(self, summary_id):
+        """
+        (status, text) for an id returned by key_id():
+        "ok", "pending", "error" or "unknown".
+        """
+        with self._lock:
+            key = self._ids.get(summary_id)
+            fut = self._inflight.get(key) if key else None
+        if key is None:
+            return "unknown", None
+        if fut is not None and not fut.done():
+            return "pending", None
+        text = self._cache_get(key)
+        if text is not None:
+            return "ok", text
+        with self._lock:
+            error = self._errors.get(key)
+        if error is not None:
+            return "error", error
+        return "unknown", None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "cached": len(self._cache),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+            }
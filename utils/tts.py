@@ -0,0 +1,166 @@
+import io
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils.lazy_imports import timed_import
+
+
+# =====================================================
+# ENGINES
+# =====================================================
+# An engine is `fn(text, lang) -> (audio_bytes, mime_type)` and works
+# entirely in memory, so concurrent sessions never share a file.
+def gtts_engine(text, lang="en"):
+    """Google TTS (needs network)."""
+    gtts = timed_import("gtts")
+    buf = io.BytesIO()
+    gtts.gTTS(text, lang=lang).write_to_fp(buf)
+    return buf.getvalue(), "audio/mp3"
+
+def espeak_engine(text, lang="en"):
+    """Offline synthesis with espeak-ng / espeak (WAV written to stdout)."""
+    binary = shutil.which("espeak-ng") or shutil.which("espeak")
+    if binary is None:
+        raise RuntimeError("espeak-ng is not installed")
+    out = subprocess.run(
+        [binary, "-v", lang, "--stdout", text],
+        capture_output=True, timeout=30, check=True,
+    )
+    return out.stdout, "audio/wav"
+
+def fallback_engine(*engines):
+    """Try each engine in turn; the first one that succeeds wins."""
+    def synthesize(text, lang="en"):
+        errors = []
+        for engine in engines:
+            try:
+                return engine(text, lang)
+            except Exception as e:
+                errors.append(f"{engine.__name__}: {e}")
+        raise RuntimeError("; ".join(errors) or "no TTS engine configured")
+    synthesize.__name__ = "+".join(e.__name__ for e in engines)
+    return synthesize
+
+ENGINES = {
+    "gtts": gtts_engine,
+    "espeak": espeak_engine,
+    "auto": fallback_engine(gtts_engine, espeak_engine),
+}
+
+
+# =====================================================
+# CACHED, BACKGROUND TTS
+# =====================================================
+class TTSService:
+    """
+    Text-to-speech with a byte-budgeted LRU keyed by (text, language).
+
+    `submit()` returns a Future, so callers can render the page first and
+    attach the audio once it is ready. Identical phrases that are already
+    being synthesized share one engine call.
+    """
+
+    def __init__(self, engine, max_bytes=16 * 1024 * 1024, max_workers=2):
+        self.engine = engine
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    @staticmethod
+    def key(text, lang):
+        return (" ".join(text.split()), lang)
+
+    def cached(self, text, lang="en"):
+        """(audio_bytes, mime) if cached, else None (never blocks)."""
+        key = self.key(text, lang)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+            return hit
+
+    def _store(self, key, audio):
+        size = len(audio[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = audio
+            self._cache_bytes += size
+            while self._cache_bytes > self.max_bytes:
+                _, (old, _) = self._cache.popitem(last=False)
+                self._cache_bytes -= len(old)
+
+    def submit(self, text, lang="en") -> Future:
+        key = self.key(text, lang)
+
+        hit = self.cached(text, lang)
+        if hit is not None:
+            self.hits += 1
+            fut = Future()
+            fut.set_result(hit)
+            return fut
+
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = Future()
+            self._inflight[key] = fut
+            self.misses += 1
+
+        self._executor.submit(self._synthesize, key, fut)
+        return fut
+
+    def synthesize(self, text, lang="en", timeout=None):
+        return self.submit(text, lang).result(timeout=timeout)
+
+    def _synthesize(self, key, fut):
+        text, lang = key
+        try:
+            audio = self.engine(text, lang)
+            self._store(key, audio)
+            fut.set_result(audio)
+        except Exception as e:
+            self.failures += 1
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "engine": getattr(self.engine, "__name__", str(self.engine)),
+                "cached": len(self._cache),
+                "cached_mb": round(self._cache_bytes / (1024 * 1024), 2),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+            }
+
+
+def build_tts_service():
+    """LIFELEN_TTS_ENGINE picks gtts / espeak / auto (default: gTTS, then espeak)."""
+    name = os.getenv("LIFELEN_TTS_ENGINE", "auto")
+    engine = ENGINES.get(name)
+    if engine is None:
+        print(f"Unknown TTS engine {name!r}, using auto")
+        engine = ENGINES["auto"]
+    return TTSService(
+        engine,
+        max_bytes=int(float(os.getenv("LIFELEN_TTS_CACHE_MB", "16")) * 1024 * 1024),
+    )
@@ -0,0 +1,184 @@
+import os
+import threading
+
+import numpy as np
+
+from utils.lazy_imports import timed_import
+from utils.model_registry import XRAY_DETECTOR_CLASSES
+
+NORMAL_IDX = XRAY_DETECTOR_CLASSES.index("NORMAL")
+PNEUMONIA_IDX = XRAY_DETECTOR_CLASSES.index("PNEUMONIA")
+NON_XRAY_IDX = XRAY_DETECTOR_CLASSES.index("NON_XRAY")
+
+# "cascade": detector validates, Keras model always classifies (original behaviour)
+# "fused":   detector also classifies; Keras only runs in the uncertainty band
+XRAY_MODE = os.getenv("LIFELEN_XRAY_MODE", "cascade")
+FUSED_CONFIDENCE = float(os.getenv("LIFELEN_XRAY_FUSED_CONFIDENCE", "0.90"))
+NON_XRAY_THRESHOLD = 0.75
+
+
+# =====================================================
+# MODEL CALLS
+# =====================================================
+def _softmax(logits):
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+def detector_fn_from(model):
+    """(N, 3, H, W) float32 -> (N, 3) softmax probabilities."""
+    if getattr(model, "backend", None) == "onnx":
+        return lambda batch: _softmax(model.predict(batch))
+
+    def run(batch):
+        torch = timed_import("torch")
+        with torch.no_grad():
+            logits = model(torch.from_numpy(np.ascontiguousarray(batch)))
+            return torch.softmax(logits, dim=1).cpu().numpy()
+    return run
+
+def classifier_fn_from(model):
+    """(N, H, W, 1) float32 -> (N,) pneumonia probabilities."""
+    def run(batch):
+        return np.asarray(model.predict(batch, verbose=0))[:, 0]
+    return run
+
+def fused_pneumonia_prob(det_probs):
+    """P(PNEUMONIA | chest X-ray) from detector softmax rows."""
+    det_probs = np.atleast_2d(det_probs)
+    xray_mass = det_probs[:, NORMAL_IDX] + det_probs[:, PNEUMONIA_IDX]
+    return det_probs[:, PNEUMONIA_IDX] / np.maximum(xray_mass, 1e-7)
+
+
+# =====================================================
+# TWO-STAGE INFERENCE
+# =====================================================
+class XrayInference:
+    """
+    X-ray validation + classification with an optional fused fast path.
+
+    The ResNet detector already separates NORMAL and PNEUMONIA. In
+    "fused" mode its (renormalized) answer is used directly when it is at
+    least `confidence` sure, and only the remaining images are escalated
+    to the Keras classifier, as one batch. stats() reports how many
+    second-stage calls were saved.
+    """
+
+    def __init__(self, detector_fn, classifier_fn, mode=XRAY_MODE,
+                 confidence=FUSED_CONFIDENCE, non_xray_threshold=NON_XRAY_THRESHOLD):
+        if mode not in ("cascade", "fused"):
+            raise ValueError(f"Unknown X-ray inference mode: {mode}")
+        self.detector_fn = detector_fn
+        self.classifier_fn = classifier_fn
+        self.mode = mode
+        self.confidence = float(confidence)
+        self.non_xray_threshold = float(non_xray_threshold)
+
+        self._lock = threading.Lock()
+        self.images = 0
+        self.rejected = 0
+        self.detector_only = 0
+        self.escalated = 0
+
+    def detect(self, det_batch):
+        """Detector softmax rows, or None when no detector is available."""
+        if self.detector_fn is None:
+            return None
+        return self.detector_fn(det_batch)
+
+    def is_xray(self, det_probs):
+        """(is_xray, confidence, label) for one detector row (fail-open without one)."""
+        if det_probs is None:
+            return True, 0.0, "UNKNOWN"
+        non_xray = float(det_probs[NON_XRAY_IDX])
+        if non_xray >= self.non_xray_threshold:
+            return False, non_xray, "NON_XRAY"
+        return True, 1.0 - non_xray, "XRAY"
+
+    def classify(self, cls_batch, det_probs=None):
+        """
+        Pneumonia probabilities for a batch, plus the stage that produced
+        each one ("detector" or "classifier").
+        """
+        n = len(cls_batch)
+        probs = np.empty(n, dtype=np.float32)
+        stages = ["classifier"] * n
+        escalate = np.ones(n, dtype=bool)
+
+        if self.mode == "fused" and det_probs is not None:
+            fused = fused_pneumonia_prob(det_probs)
+            confident = np.maximum(fused, 1.0 - fused) >= self.confidence
+            # Images the detector doubts are X-rays always get the full classifier
+            confident &= np.atleast_2d(det_probs)[:, NON_XRAY_IDX] < self.non_xray_threshold
+            probs[confident] = fused[confident]
+            escalate = ~confident
+            for i in np.flatnonzero(confident):
+                stages[i] = "detector"
+
+        if escalate.any():
+            probs[escalate] = self.classifier_fn(cls_batch[escalate])
+
+        with self._lock:
+            self.images += n
+            self.detector_only += n - int(escalate.sum())
+            self.escalated += int(escalate.sum())
+        return probs, stages
+
+    def predict_batch(self, cls_batch, det_batch):
+        """
+        One dict per image: is_xray, xray_confidence, pneumonia_prob
+        (None for rejected images) and stage.
+        """
+        det_probs = self.detect(det_batch) if det_batch is not None else None
+        checks = [self.is_xray(det_probs[i] if det_probs is not None else None)
+                  for i in range(len(cls_batch))]
+        keep = np.array([ok for ok, _, _ in checks], dtype=bool)
+
+        results = [
+            {"is_xray": ok, "xray_confidence": conf, "pneumonia_prob": None, "stage": "detector"}
+            for ok, conf, _ in checks
+        ]
+        with self._lock:
+            self.rejected += int((~keep).sum())
+
+        if keep.any():
+            probs, stages = self.classify(
+                cls_batch[keep], det_probs[keep] if det_probs is not None else None
+            )
+            for j, i in enumerate(np.flatnonzero(keep)):
+                results[i]["pneumonia_prob"] = float(probs[j])
+                results[i]["stage"] = stages[j]
+        return results
+
+    def stats(self):
+        with self._lock:
+            classified = self.detector_only + self.escalated
+            return {
+                "mode": self.mode,
+                "confidence": self.confidence,
+                "images": self.images + self.rejected,
+                "rejected": self.rejected,
+                "detector_only": self.detector_only,
+                "escalated": self.escalated,
+                "classifier_calls_saved": round(self.detector_only / classified, 4) if classified else 0.0,
+            }
+
+
+def build_xray_inference(registry, classifier_fn=None, detector_fn=None, **kwargs):
+    """
+    Engine over the shared registry; models are fetched lazily per call.
+    `classifier_fn` / `detector_fn` override the model calls (e.g. with a
+    micro-batcher or an inference worker pool).
+    """
+    def detector(batch):
+        model = registry["xray_detector"]
+        if model is None:
+            return None  # validation fails open, as before
+        return detector_fn_from(model)(batch)
+
+    def classifier(batch):
+        model = registry["xray"]
+        if model is None:
+            raise RuntimeError("X-ray model not loaded")
+        return classifier_fn_from(model)(batch)
+
+    return XrayInference(detector_fn or detector, classifier_fn or classifier, **kwargs)